@@ -1,42 +1,566 @@
 import requests
-from urllib.parse import urlparse, urljoin, urlunparse
+from urllib.parse import urlparse, urljoin, urlunparse, parse_qsl, urlencode
 from urllib.robotparser import RobotFileParser
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 import csv
 import os
+import sys
+import io
+import gzip
 import json
+import copy
+import uuid
+import base64
+import atexit
 import re
-from datetime import datetime
+import xml.etree.ElementTree as ElementTree
+import html
+import codecs
+import socket
+import asyncio
+import ipaddress
+import math
+from datetime import datetime, timezone
 import urllib.request
 from pathlib import Path
 import urllib3
 import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import multiprocessing
+import sqlite3
+import zlib
+import glob
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed, wait, FIRST_COMPLETED
 import time
-from queue import Queue
+import random
+import hashlib
+from email.utils import parsedate_to_datetime
+from collections import Counter, OrderedDict, deque
+from queue import Queue, Empty
+from fnmatch import fnmatch
+from functools import lru_cache
+
+try:
+    import zstandard  # Optional: zstd output compression
+except ImportError:
+    zstandard = None
+
+try:
+    import aiodns  # Optional: asynchronous DNS resolution for the crawl's DNS cache
+except ImportError:
+    aiodns = None
+
+try:
+    import cchardet as charset_detector  # Optional: fast charset detection
+except ImportError:
+    try:
+        import charset_normalizer as charset_detector  # Installed with requests
+    except ImportError:
+        charset_detector = None
+
+try:
+    import aiohttp  # Optional: asynchronous HLS/DASH manifest probing
+except ImportError:
+    aiohttp = None
+
+try:
+    from lxml import etree  # Optional: streaming href extraction for discovery crawls
+except ImportError:
+    etree = None
+
+try:
+    import pyarrow as pa  # Optional: Parquet export
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 # Disable SSL warnings for problematic sites
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 visited_urls = set()  # unified set for all crawled URLs
+recorded_urls = set()  # URLs already written to the CSV
 json_data = []
 lock = threading.Lock()  # Thread lock for thread-safe operations
 
+# Event log: hot paths report through log_event(), which only enqueues a record; a listener
+# thread prints it (console_level and above) and appends every event as a JSON line to
+# <site folder>/events.jsonl, so page workers never wait on the terminal or the disk
+LOG_SETTINGS = {
+    "console_level": "INFO",  # Per-page details are DEBUG and go only to the event log
+    "event_log": True,  # Write the event log next to the crawl outputs
+    "event_file": "events.jsonl",
+    "event_level": "DEBUG"
+}
+
+# How hard every output writer pushes its data to disk:
+#   "none"     - leave it to the OS
+#   "periodic" - fsync long-lived files (JSON/CSV/WARC/event streams) at most every interval and on close
+#   "record"   - fsync after every record, media file and artifact (safest, slowest)
+DURABILITY_SETTINGS = {
+    "policy": "periodic",
+    "interval": 5.0
+}
+
+synced_at = {}  # path -> time of the last fsync under the periodic policy
+sync_lock = threading.Lock()
+
+def sync_due(path):
+    """Whether the durability policy wants path synced after the write that just happened"""
+    policy = DURABILITY_SETTINGS["policy"]
+    if policy != "periodic":
+        return policy == "record"
+    now = time.monotonic()
+    with sync_lock:
+        # A file's first write only starts its clock, so short-lived files are never synced
+        if now - synced_at.setdefault(path, now) < DURABILITY_SETTINGS["interval"]:
+            return False
+        synced_at[path] = now
+    return True
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    record_stat("fsyncs")
+
+def sync_output(f, path=None):
+    """Apply the durability policy to an open output file after a write. Callers on page
+    worker threads use sync_due() under their lock and fsync after releasing it instead."""
+    if not hasattr(f, "fileno") or not sync_due(path or f.name):
+        return
+    f.flush()
+    os.fsync(f.fileno())
+    record_stat("fsyncs")
+
+def sync_closed(path):
+    """fsync a file its writer just closed (compressed streams write their trailer on close)"""
+    with sync_lock:
+        synced_at.pop(path, None)
+    if DURABILITY_SETTINGS["policy"] == "none" or not os.path.exists(path):
+        return
+    fsync_path(path)
+
+class JsonEventHandler(logging.Handler):
+    """Appends each log record as a JSON event to the current crawl's events.jsonl"""
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.file = None
+
+    def open(self, path):
+        self.close_file()
+        self.path = path
+        # Line-buffered: events reach the OS as they're written by the listener thread
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def close_file(self):
+        if self.file:
+            self.file.close()
+            sync_closed(self.path)
+        self.path = None
+        self.file = None
+
+    def emit(self, record):
+        if self.file is None:
+            return
+        try:
+            event = {
+                "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "event": getattr(record, "event", "message"),
+                "message": record.getMessage(),
+                "thread": record.threadName
+            }
+            event.update(getattr(record, "fields", {}))
+            self.file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            sync_output(self.file, self.path)
+        except Exception:
+            self.handleError(record)
+
+logger = logging.getLogger("crawlanything")
+logger.propagate = False
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(logging.Formatter("%(message)s"))
+event_handler = JsonEventHandler()
+log_queue = None
+log_listener = None
+
+def start_log_listener():
+    global log_queue, log_listener
+    log_queue = Queue()  # Unbounded, so logging never blocks a worker
+    logger.handlers.clear()
+    logger.addHandler(QueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, console_handler, event_handler, respect_handler_level=True)
+    log_listener.start()
+
+def restart_log_after_fork():
+    # A forked shard/worker process inherits the queue but not the listener thread, and
+    # must not write into its parent's events file
+    event_handler.path = None
+    event_handler.file = None
+    start_log_listener()
+    apply_log_levels()
+
+def apply_log_levels():
+    console_handler.setLevel(LOG_SETTINGS["console_level"])
+    event_handler.setLevel(LOG_SETTINGS["event_level"])
+    # Records nobody will output are dropped before they're even queued
+    levels = [console_handler.level] + ([event_handler.level] if event_handler.file else [])
+    logger.setLevel(min(levels))
+
+start_log_listener()
+apply_log_levels()
+if hasattr(os, "register_at_fork"):  # Not available on Windows, where workers are spawned
+    os.register_at_fork(after_in_child=restart_log_after_fork)
+
+def log_event(level, event, message, **fields):
+    """Queue a structured event; message is what the console shows, fields go to the JSON log"""
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event": event, "fields": fields})
+
+def flush_event_log():
+    """Wait until every queued event has been printed and written"""
+    log_listener.stop()
+    log_listener.start()
+
+def start_event_log(folder):
+    flush_event_log()
+    if LOG_SETTINGS["event_log"]:
+        os.makedirs(folder, exist_ok=True)
+        event_handler.open(os.path.join(folder, LOG_SETTINGS["event_file"]))
+    else:
+        event_handler.close_file()
+    apply_log_levels()
+
+def close_event_log():
+    flush_event_log()
+    event_handler.close_file()
+    apply_log_levels()
+
+atexit.register(close_event_log)
+
+# Query-string canonicalization. Parameters matching drop_params are removed; when
+# keep_params is set only matching parameters survive. "sites" holds per-host overrides,
+# e.g. {"shop.example.com": {"keep_params": ["id", "page"]}}
+CANONICAL_RULES = {
+    "keep_params": None,
+    "drop_params": [
+        "utm_*", "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl",
+        "ref_src", "sessionid", "session_id", "sid", "phpsessid", "jsessionid", "aspsessionid*",
+        "cfid", "cftoken"
+    ],
+    "sites": {}
+}
+
+# Crawl scope: exact host match, optionally including subdomains of the start host
+SCOPE_RULES = {
+    "include_subdomains": True
+}
+
+# Crawler-trap heuristics (infinite calendars, repeated path segments, session paths)
+TRAP_RULES = {
+    "max_path_depth": 15,
+    "max_segment_repeats": 3,
+    "max_query_params": 12,
+    # Distinct URLs allowed per pattern, counted only for patterns with at least
+    # min_pattern_variables numeric/id path segments (calendars, /{n}/{n}/{n}), so plain
+    # /article/12345 style sites are never capped. None disables the cap.
+    "max_urls_per_pattern": 5000,
+    "min_pattern_variables": 3,
+    "pattern_cache_size": 100000  # Recently counted URLs remembered so repeats aren't counted twice
+}
+
+url_pattern_counts = {}  # URL pattern -> number of distinct URLs seen
+pattern_verdicts = OrderedDict()  # LRU of counted URL -> trap reason (or None)
+
+SESSION_PATH_PARAM = re.compile(r';(?:jsessionid|phpsessid|sid|sessionid)=[^/]*', re.IGNORECASE)
+
+def configure_canonicalization(host=None, keep_params=None, drop_params=None):
+    """Set global or per-host query parameter rules and reset the normalization cache"""
+    if host:
+        CANONICAL_RULES["sites"][host.lower()] = {"keep_params": keep_params, "drop_params": drop_params}
+    else:
+        CANONICAL_RULES["keep_params"] = keep_params
+        if drop_params is not None:
+            CANONICAL_RULES["drop_params"] = drop_params
+    normalize_url.cache_clear()
+
+def get_site_rules(host):
+    # Look up the most specific per-site rule (exact host, then parent domains)
+    labels = host.split('.')
+    for i in range(len(labels) - 1):
+        rules = CANONICAL_RULES["sites"].get('.'.join(labels[i:]))
+        if rules:
+            return rules
+    return {}
+
+def canonicalize_query(query, host):
+    if not query:
+        return ""
+    site_rules = get_site_rules(host)
+    keep_params = site_rules.get("keep_params") or CANONICAL_RULES["keep_params"]
+    drop_params = CANONICAL_RULES["drop_params"] + (site_rules.get("drop_params") or [])
+    params = []
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        lowered = name.lower()
+        if keep_params is not None and not any(fnmatch(lowered, p.lower()) for p in keep_params):
+            continue
+        if any(fnmatch(lowered, p.lower()) for p in drop_params):
+            continue
+        params.append((name, value))
+    return urlencode(sorted(params))
+
+@lru_cache(maxsize=200000)
 def normalize_url(url):
-    parsed = urlparse(url)
+    parsed = urlparse(url.strip())
     scheme = parsed.scheme.lower()
     netloc = parsed.netloc.lower()
-    path = parsed.path or "/"
+    # Drop default ports so http://host:80/ and http://host/ are the same page
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = SESSION_PATH_PARAM.sub("", parsed.path) or "/"
     if path != "/" and path.endswith("/"):
         path = path.rstrip("/")
-    normalized = urlunparse((scheme, netloc, path, "", "", ""))
+    query = canonicalize_query(parsed.query, parsed.hostname or "")
+    normalized = urlunparse((scheme, netloc, path, "", query, ""))
     return normalized
 
+def scope_root(base_domain):
+    host = base_domain.lower().split('@')[-1].split(':')[0]
+    return host[4:] if host.startswith("www.") else host
+
+def host_in_scope(host, base_domain):
+    root = scope_root(base_domain)
+    host = (host or "").lower()
+    if host == root or host == "www." + root:
+        return True
+    return SCOPE_RULES["include_subdomains"] and host.endswith("." + root)
+
 def is_valid(url, base_domain):
     parsed = urlparse(url)
-    return parsed.scheme in ["http", "https"] and base_domain in parsed.netloc
+    return parsed.scheme in ["http", "https"] and host_in_scope(parsed.hostname, base_domain)
+
+def url_pattern(url):
+    """Collapse numbers and id-like tokens so /2024/01/31 and /2031/12/01 share one pattern.
+    Returns (pattern, number of variable path segments)."""
+    parsed = urlparse(url)
+    segments = []
+    variables = 0
+    for segment in parsed.path.strip('/').split('/'):
+        collapsed = re.sub(r'[0-9a-f]{16,}|[0-9a-f\-]{32,}', '{id}', segment, flags=re.IGNORECASE)
+        collapsed = re.sub(r'\d+', '{n}', collapsed)
+        if collapsed != segment:
+            variables += 1
+        segments.append(collapsed)
+    query_keys = sorted(name for name, _ in parse_qsl(parsed.query, keep_blank_values=True))
+    return f"{parsed.netloc}/{'/'.join(segments)}?{'&'.join(query_keys)}", variables
+
+def is_crawler_trap(url):
+    """Return the reason a URL looks like a crawler trap, or None"""
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split('/') if s]
+    reason = None
+    if len(segments) > TRAP_RULES["max_path_depth"]:
+        reason = "path depth"
+    elif segments and max(segments.count(s) for s in set(segments)) > TRAP_RULES["max_segment_repeats"]:
+        reason = "repeated path segments"
+    elif len(parse_qsl(parsed.query, keep_blank_values=True)) > TRAP_RULES["max_query_params"]:
+        reason = "too many query parameters"
+
+    limit = TRAP_RULES["max_urls_per_pattern"]
+    if reason or not limit:
+        return reason
+    pattern, variables = url_pattern(url)
+    if variables < TRAP_RULES["min_pattern_variables"]:
+        return None
+    with lock:
+        if url in pattern_verdicts:
+            pattern_verdicts.move_to_end(url)
+            return pattern_verdicts[url]
+        count = url_pattern_counts.get(pattern, 0) + 1
+        url_pattern_counts[pattern] = count
+        if count > limit:
+            reason = "URL pattern limit"
+            if count == limit + 1:
+                log_event(logging.WARNING, "trap_pattern_limit",
+                          f"[!] URL pattern limit reached, skipping further URLs like: {pattern}",
+                          pattern=pattern)
+        pattern_verdicts[url] = reason
+        if len(pattern_verdicts) > TRAP_RULES["pattern_cache_size"]:
+            pattern_verdicts.popitem(last=False)
+    return reason
+
+def get_canonical_url(soup, page_url):
+    """Return the normalized <link rel=canonical> target of a page, if any"""
+    link = soup.find("link", rel="canonical", href=True)
+    return canonical_from_href(link["href"] if link else None, page_url)
+
+def canonical_from_href(href, page_url):
+    if not href or not href.strip():
+        return None
+    return normalize_url(urljoin(page_url, href.strip()))
+
+def resolve_canonical(soup, norm_url, base_domain, canonical_href=None):
+    """Mark a page's canonical URL as visited; returns None if that page was already crawled.
+    Pass soup=None with canonical_href when the link was read from a rendered page."""
+    canonical = get_canonical_url(soup, norm_url) if soup is not None else canonical_from_href(canonical_href, norm_url)
+    if not canonical or canonical == norm_url or not is_valid(canonical, base_domain):
+        return norm_url
+    with lock:
+        if canonical in visited_urls:
+            visited_urls.add(norm_url)
+            log_event(logging.INFO, "canonical_skip", f"[!] Skipping {norm_url}: canonical page {canonical} already crawled",
+                      url=norm_url, canonical=canonical)
+            return None
+        visited_urls.add(canonical)
+    return canonical
+
+# Near-duplicate detection (SimHash over the extracted page text)
+DEDUP_SETTINGS = {
+    "enabled": True,
+    "max_distance": 3,  # Hamming distance (bits) at which two pages count as duplicates
+    "max_fingerprints": 50000,  # Recent fingerprints kept in the index
+    "min_tokens": 30,  # Pages with less text are not fingerprinted
+    "expand_duplicate_links": False  # Follow links found on duplicate pages
+}
+
+dedup_stats = {}  # host -> {"pages": n, "duplicates": n}
+
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+def simhash(text):
+    """64-bit SimHash of a text over word 3-shingles; returns None for very short texts"""
+    tokens = re.findall(r'\w+', text.lower())
+    if len(tokens) < DEDUP_SETTINGS["min_tokens"]:
+        return None
+    shingles = Counter(" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2))
+    # Tally shingle weights per (byte position, byte value) instead of per bit, then
+    # spread the at most 8 x 256 tallies over the 64 bits
+    byte_totals = [[0] * 256 for _ in range(8)]
+    total = 0
+    for shingle, count in shingles.items():
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        for position, value in enumerate(digest):
+            byte_totals[position][value] += count
+        total += count
+    ones = [0] * 64
+    for position, totals in enumerate(byte_totals):
+        shift = (7 - position) * 8  # The digest is read big-endian
+        for value, count in enumerate(totals):
+            if count:
+                for bit in BYTE_BITS[value]:
+                    ones[shift + bit] += count
+    fingerprint = 0
+    for bit, count in enumerate(ones):
+        if 2 * count > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+class SimHashIndex:
+    """Index of recent fingerprints split into bands, so a lookup only compares
+    candidates sharing at least one band (exact for distances below the band count)"""
+
+    def __init__(self, max_distance=3, max_entries=50000):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.tables = [{} for _ in range(self.bands)]
+        self.entries = deque()
+
+    def _band_keys(self, fingerprint):
+        keys = []
+        for band in range(self.bands):
+            shift = band * self.band_bits
+            width = 64 - shift if band == self.bands - 1 else self.band_bits
+            keys.append((fingerprint >> shift) & ((1 << width) - 1))
+        return keys
+
+    def find(self, fingerprint):
+        for table, key in zip(self.tables, self._band_keys(fingerprint)):
+            for candidate, url in table.get(key, ()):
+                if bin(candidate ^ fingerprint).count("1") <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        for table, key in zip(self.tables, self._band_keys(fingerprint)):
+            table.setdefault(key, []).append((fingerprint, url))
+        self.entries.append((fingerprint, url))
+        if len(self.entries) > self.max_entries:
+            old = self.entries.popleft()
+            for table, key in zip(self.tables, self._band_keys(old[0])):
+                bucket = table.get(key)
+                if bucket:
+                    bucket.remove(old)
+                    if not bucket:
+                        del table[key]
+
+fingerprint_index = SimHashIndex(DEDUP_SETTINGS["max_distance"], DEDUP_SETTINGS["max_fingerprints"])
+
+def check_near_duplicate(text, url):
+    """Return (URL of an already crawled near-duplicate or None, fingerprint hex)"""
+    if not DEDUP_SETTINGS["enabled"] or text is None:
+        return None, None
+    fingerprint = simhash(text)
+    if fingerprint is None:
+        return None, None
+    host = urlparse(url).netloc
+    with lock:
+        stats = dedup_stats.setdefault(host, {"pages": 0, "duplicates": 0})
+        stats["pages"] += 1
+        original = fingerprint_index.find(fingerprint)
+        if original:
+            stats["duplicates"] += 1
+        else:
+            fingerprint_index.add(fingerprint, url)
+    return original, f"{fingerprint:016x}"
+
+def visible_text(soup):
+    return soup.get_text(separator='\n', strip=True)
+
+def dedup_text(soup):
+    # Visible text when dedup needs it; callers hand it on to extract_metadata so a page's
+    # text is only extracted once
+    return visible_text(soup) if DEDUP_SETTINGS["enabled"] else None
+
+def duplicate_entry(url, source, text):
+    """Return a short record pointing at the canonical page if this page is a near-duplicate"""
+    original, fingerprint = check_near_duplicate(text, url)
+    if not original:
+        return None
+    log_event(logging.INFO, "near_duplicate", f"[!] Near-duplicate of {original}, skipping extraction: {url}",
+              url=url, duplicate_of=original)
+    return {"url": url, "source": source, "duplicate_of": original, "simhash": fingerprint}
+
+def print_dedup_report():
+    if not dedup_stats:
+        return
+    print("[+] Near-duplicate pages per site:")
+    for host, stats in sorted(dedup_stats.items()):
+        ratio = stats["duplicates"] / stats["pages"] if stats["pages"] else 0
+        print(f"    - {host}: {stats['duplicates']}/{stats['pages']} duplicates ({ratio:.1%})")
+
+def reset_crawl_state():
+    """Clear per-site crawl state before starting a new site"""
+    global fingerprint_index
+    with lock:
+        visited_urls.clear()
+        recorded_urls.clear()
+        dead_letters.clear()
+        url_pattern_counts.clear()
+        pattern_verdicts.clear()
+        dedup_stats.clear()
+        fingerprint_index = SimHashIndex(DEDUP_SETTINGS["max_distance"], DEDUP_SETTINGS["max_fingerprints"])
+    with state_lock:
+        crawl_state.clear()
 
 def can_fetch(robot_parser, url):
     try:
@@ -52,7 +576,7 @@ def init_robot_parser(base_url):
     rp = RobotFileParser()
     try:
         # Use requests with better headers and timeout for robots.txt
-        response = requests.get(robots_url, timeout=10, headers={
+        response = fetch_page(robots_url, timeout=10, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept": "text/plain,*/*;q=0.8",
             "Connection": "keep-alive"
@@ -100,20 +624,772 @@ def generate_filename(url, include_timestamp=True):
     else:
         return f"{clean_domain}_{clean_path}"
 
+# Crawl-scoped DNS cache: socket.getaddrinfo is patched while a crawl runs so every
+# requests/urllib3 connection shares cached answers (with TTLs and negative caching)
+DNS_SETTINGS = {
+    "enabled": True,
+    "default_ttl": 300,  # Seconds, for answers without a TTL (system resolver fallback)
+    "min_ttl": 30,
+    "max_ttl": 3600,
+    "negative_ttl": 60,  # How long a failed lookup is remembered
+    "timeout": 5.0,
+    "prefetch_workers": 4
+}
+
+_system_getaddrinfo = socket.getaddrinfo
+
+def is_ip_address(host):
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+class AsyncResolver:
+    """aiodns resolver running on its own event loop thread, usable from any worker thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="dns-resolver", daemon=True)
+        self.thread.start()
+        self.resolver = asyncio.run_coroutine_threadsafe(self._create(), self.loop).result()
+
+    async def _create(self):
+        return aiodns.DNSResolver(loop=self.loop, timeout=DNS_SETTINGS["timeout"])
+
+    async def _query(self, host):
+        answers = await asyncio.gather(self.resolver.query(host, "A"), self.resolver.query(host, "AAAA"),
+                                       return_exceptions=True)
+        records = [r for answer in answers if not isinstance(answer, Exception) for r in answer]
+        if not records:
+            raise socket.gaierror(socket.EAI_NONAME, f"No address records for {host}")
+        return [r.host for r in records], min(r.ttl for r in records)
+
+    def resolve(self, host):
+        """Return (addresses, ttl); blocks the calling thread only"""
+        future = asyncio.run_coroutine_threadsafe(self._query(host), self.loop)
+        return future.result(DNS_SETTINGS["timeout"] * 2)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+class DnsCache:
+    """Host -> addresses cache with per-entry expiry; concurrent misses for a host share one lookup"""
+
+    def __init__(self, resolver=None):
+        self.resolver = resolver
+        self.entries = {}  # host -> (expires_at, addresses or None for a failed lookup)
+        self.pending = {}  # host -> Event for lookups in progress
+        self.lock = threading.Lock()
+        self.prefetcher = ThreadPoolExecutor(max_workers=DNS_SETTINGS["prefetch_workers"],
+                                             thread_name_prefix="dns-prefetch")
+        self.prefetched = set()
+
+    def _resolve(self, host):
+        if self.resolver:
+            try:
+                return self.resolver.resolve(host)
+            except Exception:
+                pass  # Fall back to the system resolver, which also decides negative answers
+        infos = _system_getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        return list(dict.fromkeys(info[4][0] for info in infos)), DNS_SETTINGS["default_ttl"]
+
+    def lookup(self, host):
+        host = host.lower()
+        while True:
+            with self.lock:
+                entry = self.entries.get(host)
+                if entry and entry[0] > time.time():
+                    if entry[1] is None:
+                        record_stat("dns_negative_hits")
+                        raise socket.gaierror(socket.EAI_NONAME, f"Cached lookup failure for {host}")
+                    record_stat("dns_cache_hits")
+                    return entry[1]
+                event = self.pending.get(host)
+                if event is None:
+                    event = self.pending[host] = threading.Event()
+                    break
+            event.wait(DNS_SETTINGS["timeout"] * 2)
+        
+        start = time.time()
+        try:
+            addresses, ttl = self._resolve(host)
+            ttl = min(DNS_SETTINGS["max_ttl"], max(DNS_SETTINGS["min_ttl"], ttl))
+        except socket.gaierror:
+            addresses, ttl = None, DNS_SETTINGS["negative_ttl"]
+            record_stat("dns_failures")
+        except Exception:
+            with self.lock:
+                self.pending.pop(host).set()
+            raise
+        record_stat("dns_lookups")
+        record_stat("dns_lookup_seconds", time.time() - start)
+        with self.lock:
+            self.entries[host] = (time.time() + ttl, addresses)
+            self.pending.pop(host).set()
+        if addresses is None:
+            raise socket.gaierror(socket.EAI_NONAME, f"Lookup failed for {host}")
+        return addresses
+
+    def prefetch(self, host):
+        """Resolve a host in the background the first time it is seen"""
+        host = host.lower()
+        with self.lock:
+            if host in self.prefetched:
+                return
+            self.prefetched.add(host)
+        record_stat("dns_prefetches")
+        self.prefetcher.submit(self._prefetch, host)
+
+    def _prefetch(self, host):
+        try:
+            self.lookup(host)
+        except Exception:
+            pass
+
+    def close(self):
+        self.prefetcher.shutdown(wait=False, cancel_futures=True)
+        if self.resolver:
+            self.resolver.close()
+
+dns_cache = None
+
+def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """Drop-in socket.getaddrinfo that answers from the crawl's DNS cache"""
+    cache = dns_cache
+    if cache is None or not isinstance(host, str) or is_ip_address(host):
+        return _system_getaddrinfo(host, port, family, type, proto, flags)
+    # The cache only holds plain TCP lookups; flags (AI_PASSIVE, AI_CANONNAME, ...), other
+    # socket types/protocols and service names go to the system resolver unchanged
+    if flags or type not in (0, socket.SOCK_STREAM) or proto not in (0, socket.IPPROTO_TCP) or not isinstance(port, int):
+        return _system_getaddrinfo(host, port, family, type, proto, flags)
+    addresses = cache.lookup(host)
+    results = []
+    for address in addresses:
+        address_family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        if family not in (0, socket.AF_UNSPEC, address_family):
+            continue
+        sockaddr = (address, port, 0, 0) if address_family == socket.AF_INET6 else (address, port)
+        results.append((address_family, type or socket.SOCK_STREAM, proto or socket.IPPROTO_TCP, "", sockaddr))
+    # Nothing in the requested family: let the system resolver answer
+    return results or _system_getaddrinfo(host, port, family, type, proto, flags)
+
+def start_dns_cache():
+    global dns_cache
+    if not DNS_SETTINGS["enabled"] or dns_cache is not None:
+        return
+    resolver = None
+    if aiodns is not None:
+        try:
+            resolver = AsyncResolver()
+        except Exception as e:
+            print(f"[!] Async DNS resolver unavailable, using system resolver: {str(e)[:100]}")
+    dns_cache = DnsCache(resolver)
+    socket.getaddrinfo = cached_getaddrinfo
+
+def stop_dns_cache():
+    global dns_cache
+    socket.getaddrinfo = _system_getaddrinfo
+    if dns_cache is not None:
+        dns_cache.close()
+        dns_cache = None
+
+def prefetch_hosts(urls):
+    cache = dns_cache
+    if cache is None:
+        return
+    for url in urls:
+        host = urlparse(url).hostname
+        if host and not is_ip_address(host):
+            cache.prefetch(host)
+
+# Adaptive per-host concurrency (AIMD): a host's limit grows by one after a window of
+# fast, healthy responses and is cut multiplicatively on timeouts, 429s and 5xx
+CONCURRENCY_SETTINGS = {
+    "adaptive": True,
+    "initial_limit": 5,
+    "min_limit": 1,
+    "max_limit": 32,  # Also the thread pool size used by adaptive crawls
+    "target_latency": 3.0,  # Seconds; slower responses stop the additive increase
+    "decrease_factor": 0.5,
+    "max_retry_after": 300,  # Cap on honored Retry-After delays (seconds)
+    "batch_delay": 1.0  # Fixed pause after every pool_size * 2 pages when adaptive is off (seconds)
+}
+
+def parse_retry_after(value):
+    """Return a Retry-After header value in seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+class HostConcurrencyController:
+    """Limits in-flight requests per host and adapts each limit to latency and errors"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.condition = threading.Condition()
+        self.hosts = {}
+
+    def _state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            limit = float(max(self.settings["min_limit"], min(self.settings["max_limit"], self.settings["initial_limit"])))
+            state = {
+                "limit": limit, "peak": limit, "active": 0, "successes": 0, "latency": None,
+                "blocked_until": 0.0, "last_decrease": 0.0, "requests": 0, "errors": 0
+            }
+            self.hosts[host] = state
+        return state
+
+    def acquire(self, host):
+        with self.condition:
+            state = self._state(host)
+            while True:
+                wait = state["blocked_until"] - time.time()
+                if wait <= 0 and state["active"] < int(state["limit"]):
+                    break
+                self.condition.wait(timeout=wait if wait > 0 else 1.0)
+            state["active"] += 1
+
+    def release(self, host, latency=None, status=None, failed=False, retry_after=None):
+        with self.condition:
+            state = self._state(host)
+            state["active"] -= 1
+            state["requests"] += 1
+            now = time.time()
+            if failed or status == 429 or (status and status >= 500):
+                state["errors"] += 1
+                state["successes"] = 0
+                # Back off at most once per round trip so one burst of errors isn't counted many times
+                if now - state["last_decrease"] >= (state["latency"] or 1.0):
+                    state["limit"] = max(self.settings["min_limit"], state["limit"] * self.settings["decrease_factor"])
+                    state["last_decrease"] = now
+                if retry_after is not None:
+                    state["blocked_until"] = max(state["blocked_until"],
+                                                 now + min(retry_after, self.settings["max_retry_after"]))
+            elif latency is not None:
+                state["latency"] = latency if state["latency"] is None else 0.8 * state["latency"] + 0.2 * latency
+                if state["latency"] <= self.settings["target_latency"]:
+                    state["successes"] += 1
+                    if state["successes"] >= int(state["limit"]):
+                        state["limit"] = min(self.settings["max_limit"], state["limit"] + 1)
+                        state["peak"] = max(state["peak"], state["limit"])
+                        state["successes"] = 0
+                else:
+                    state["successes"] = 0
+            self.condition.notify_all()
+
+    def report(self):
+        with self.condition:
+            return {
+                host: {
+                    "limit": int(state["limit"]), "peak": int(state["peak"]), "requests": state["requests"],
+                    "errors": state["errors"], "avg_latency": round(state["latency"] or 0.0, 3)
+                }
+                for host, state in self.hosts.items()
+            }
+
+concurrency = HostConcurrencyController(CONCURRENCY_SETTINGS)
+
+# Retries with jittered exponential backoff, plus a per-host circuit breaker that fails
+# requests fast while a host keeps failing
+RETRY_POLICY = {
+    "max_attempts": 3,
+    "base_delay": 1.0,
+    "max_delay": 30.0,
+    "retry_statuses": [429, 500, 502, 503, 504],
+    "breaker_threshold": 5,  # Consecutive failures that open a host's circuit
+    "breaker_cooldown": 60.0,  # Seconds before a single probe request is let through
+    "max_deferrals": 2  # Times a queued URL is put back while its host's circuit is open
+}
+
+class HostUnavailableError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit breaker is open"""
+
+class CircuitBreaker:
+    """Per-host closed/open/half-open circuit breaker"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def _state(self, host):
+        return self.hosts.setdefault(host, {"failures": 0, "opened_at": None, "probing": False})
+
+    def is_open(self, host):
+        with self.lock:
+            state = self._state(host)
+            return state["opened_at"] is not None and (
+                state["probing"] or time.time() - state["opened_at"] < self.settings["breaker_cooldown"])
+
+    def retry_at(self, host):
+        with self.lock:
+            state = self._state(host)
+            if state["opened_at"] is None:
+                return time.time()
+            return state["opened_at"] + self.settings["breaker_cooldown"]
+
+    def allow(self, host):
+        with self.lock:
+            state = self._state(host)
+            if state["opened_at"] is None:
+                return True
+            if state["probing"] or time.time() - state["opened_at"] < self.settings["breaker_cooldown"]:
+                return False
+            state["probing"] = True  # Half-open: let one request through
+            return True
+
+    def record_success(self, host):
+        with self.lock:
+            state = self._state(host)
+            if state["opened_at"] is not None:
+                log_event(logging.INFO, "circuit_closed", f"[✓] Circuit closed for {host}", host=host)
+            state.update(failures=0, opened_at=None, probing=False)
+
+    def record_failure(self, host):
+        with self.lock:
+            state = self._state(host)
+            state["failures"] += 1
+            if state["probing"] or (state["opened_at"] is None and state["failures"] >= self.settings["breaker_threshold"]):
+                if state["opened_at"] is None:
+                    log_event(logging.WARNING, "circuit_opened",
+                              f"[!] Circuit opened for {host} after {state['failures']} failures",
+                              host=host, failures=state["failures"])
+                state.update(opened_at=time.time(), probing=False)
+
+    def release_probe(self, host):
+        """End a half-open probe that failed for reasons unrelated to the host's health"""
+        with self.lock:
+            self._state(host)["probing"] = False
+
+    def reset(self):
+        with self.lock:
+            self.hosts.clear()
+
+circuit_breaker = CircuitBreaker(RETRY_POLICY)
+
+dead_letters = []  # Failed URLs kept for a later retry pass
+
+def record_dead_letter(url, source, error, attempts=None):
+    with lock:
+        dead_letters.append({
+            "url": url, "source": source, "error": str(error)[:200],
+            "attempts": attempts or RETRY_POLICY["max_attempts"], "failed_at": datetime.now().isoformat()
+        })
+
+def save_dead_letters(folder_path, base_filename):
+    """Write the dead-letter list next to the other outputs; returns its path or None"""
+    with lock:
+        entries = list(dead_letters)
+    if not entries:
+        return None
+    filepath = os.path.join(folder_path, f"{base_filename}_dead_letters.jsonl")
+    with open(filepath, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    print(f"[!] {len(entries)} failed URLs saved for a later retry pass: {filepath}")
+    return filepath
+
+def load_dead_letters(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def backoff_delay(attempt, retry_after=None):
+    # Full jitter: uniform in [0, base * 2^attempt], never shorter than Retry-After
+    delay = random.uniform(0, min(RETRY_POLICY["max_delay"], RETRY_POLICY["base_delay"] * 2 ** attempt))
+    return max(delay, retry_after or 0)
+
+def fetch_page(url, **kwargs):
+    """requests.get with retries for transient failures, guarded by the host's circuit breaker"""
+    host = urlparse(url).netloc
+    attempts = RETRY_POLICY["max_attempts"]
+    for attempt in range(attempts):
+        if not circuit_breaker.allow(host):
+            raise HostUnavailableError(f"Circuit open for {host}")
+        try:
+            response = fetch_once(url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            circuit_breaker.record_failure(host)
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        except Exception:
+            # Not a transient failure (TooManyRedirects, InvalidURL, ...): it says nothing about the
+            # host, but a half-open probe must not stay outstanding or the host is blocked for good
+            circuit_breaker.release_probe(host)
+            raise
+        if response.status_code not in RETRY_POLICY["retry_statuses"]:
+            circuit_breaker.record_success(host)
+            return response
+        circuit_breaker.record_failure(host)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if attempt == attempts - 1 or (retry_after or 0) > RETRY_POLICY["max_delay"]:
+            return response
+        response.close()
+        time.sleep(backoff_delay(attempt, retry_after))
+    return response
+
+def fetch_once(url, **kwargs):
+    """requests.get that waits for a per-host slot and feeds the outcome back to the controller"""
+    if not CONCURRENCY_SETTINGS["adaptive"]:
+        return requests.get(url, **kwargs)
+    host = urlparse(url).netloc
+    concurrency.acquire(host)
+    start = time.time()
+    try:
+        response = requests.get(url, **kwargs)
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        concurrency.release(host, failed=True)
+        raise
+    except Exception:
+        concurrency.release(host)
+        raise
+    concurrency.release(host, latency=time.time() - start, status=response.status_code,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")))
+    return response
+
+# Byte limits per Content-Type ("major/*" entries cover a whole family). Page fetches
+# stream the body and abort once a limit is exceeded instead of loading it all.
+CONTENT_LIMITS = {
+    "text/html": 10 * 1024 * 1024,
+    "application/xhtml+xml": 10 * 1024 * 1024,
+    "text/css": 2 * 1024 * 1024,
+    "image/*": 25 * 1024 * 1024,
+    "video/*": 500 * 1024 * 1024,
+    "default": 5 * 1024 * 1024
+}
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+SNIFF_CONTENT_TYPES = ("", "text/plain", "application/octet-stream")  # Mislabelled HTML is common here
+
+RESOURCE_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.ico', '.bmp', '.pdf', '.css', '.js', '.xml',
+    '.json', '.zip', '.gz', '.rar', '.7z', '.tar', '.mp3', '.mp4', '.webm', '.avi', '.mov', '.mkv',
+    '.m3u8', '.mpd', '.ts', '.woff', '.woff2', '.ttf', '.eot', '.exe', '.dmg', '.apk', '.doc', '.docx',
+    '.xls', '.xlsx', '.ppt', '.pptx'
+}
+
+crawl_stats = Counter()  # Counters reported at the end of a crawl
+stats_lock = threading.Lock()
+
+def record_stat(name, amount=1):
+    with stats_lock:
+        crawl_stats[name] += amount
+
+def print_crawl_stats():
+    with stats_lock:
+        stats = dict(crawl_stats)
+    if not stats:
+        return
+    print("[+] Crawl statistics:")
+    for name, value in sorted(stats.items()):
+        if name.startswith("bytes_"):
+            print(f"    - {name}: {value / (1024 * 1024):.1f} MB")
+        elif isinstance(value, float):
+            print(f"    - {name}: {value:.3f}")
+        else:
+            print(f"    - {name}: {value}")
+
+# Incremental recrawl: per-URL history kept in <site_folder>/crawl_state.json drives
+# which pages are refetched, so a recrawl costs roughly what the site changed
+RECRAWL_SETTINGS = {
+    "track": False,  # Keep fetch history (digests, outlinks) for the state file; set by the site crawl, which saves it
+    "enabled": False,  # Only fetch URLs that are due (set when a previous state file is found)
+    "state_file": "crawl_state.json",
+    "default_interval": 86400,  # Revisit interval for pages without history or sitemap hints
+    "min_interval": 3600,
+    "max_interval": 30 * 86400,
+    "min_observations": 2  # Refetches needed before the estimated change rate replaces changefreq
+}
+
+CHANGEFREQ_INTERVALS = {
+    "always": 0, "hourly": 3600, "daily": 86400, "weekly": 7 * 86400,
+    "monthly": 30 * 86400, "yearly": 365 * 86400, "never": None
+}
+
+crawl_state = {}  # normalized URL -> history (last_fetch, digest, lastmod, changefreq, checks, changes, ...)
+state_lock = threading.Lock()
+
+def load_crawl_state(site_folder):
+    path = os.path.join(site_folder, RECRAWL_SETTINGS["state_file"])
+    with state_lock:
+        crawl_state.clear()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                crawl_state.update(json.load(f).get("urls", {}))
+    return len(crawl_state)
+
+def save_crawl_state(site_folder):
+    path = os.path.join(site_folder, RECRAWL_SETTINGS["state_file"])
+    with state_lock:
+        data = {"saved_at": time.time(), "urls": crawl_state}
+        # Write then rename so an interrupted save never leaves a truncated state file
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+    print(f"[+] Recrawl state for {len(crawl_state)} URLs saved to: {path}")
+
+def parse_lastmod(value):
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def note_sitemap_entry(url, lastmod=None, changefreq=None):
+    if not RECRAWL_SETTINGS["track"]:
+        return
+    with state_lock:
+        entry = crawl_state.setdefault(url, {})
+        if lastmod and parse_lastmod(lastmod):
+            entry["lastmod"] = parse_lastmod(lastmod)
+        if changefreq and changefreq.strip().lower() in CHANGEFREQ_INTERVALS:
+            entry["changefreq"] = changefreq.strip().lower()
+
+def record_fetch(url, body):
+    """Update a URL's history after a successful fetch and count whether it changed"""
+    if not RECRAWL_SETTINGS["track"]:
+        return
+    digest = hashlib.sha1(b" ".join(body.split())).hexdigest()  # Ignore whitespace-only churn
+    now = time.time()
+    with state_lock:
+        entry = crawl_state.setdefault(url, {})
+        if entry.get("last_fetch"):
+            entry["checks"] = entry.get("checks", 0) + 1
+            entry["observed"] = entry.get("observed", 0) + now - entry["last_fetch"]
+            changed = digest != entry.get("digest")
+            entry["changes"] = entry.get("changes", 0) + changed
+            record_stat("recrawl_changed" if changed else "recrawl_unchanged")
+        entry["last_fetch"] = now
+        entry["digest"] = digest
+
+def record_outlinks(url, links):
+    # Stored so pages skipped on a later run can still lead the crawl to their links
+    if not RECRAWL_SETTINGS["track"]:
+        return
+    with state_lock:
+        crawl_state.setdefault(url, {})["outlinks"] = sorted(set(links))
+
+def stored_outlinks(url):
+    with state_lock:
+        return list(crawl_state.get(url, {}).get("outlinks", []))
+
+def revisit_interval(entry):
+    """Seconds until a page is expected to have changed. Uses the Cho & Garcia-Molina
+    estimator -ln((n - X + 0.5) / (n + 0.5)) / I for X changes seen in n checks, falling
+    back to the sitemap changefreq for pages without enough history."""
+    checks = entry.get("checks", 0)
+    if checks >= RECRAWL_SETTINGS["min_observations"]:
+        mean_gap = entry["observed"] / checks
+        rate = -math.log((checks - entry.get("changes", 0) + 0.5) / (checks + 0.5)) / max(mean_gap, 1)
+        interval = 1 / rate if rate > 0 else RECRAWL_SETTINGS["max_interval"]
+    elif entry.get("changefreq") in CHANGEFREQ_INTERVALS:
+        interval = CHANGEFREQ_INTERVALS[entry["changefreq"]]
+        if interval is None:
+            interval = RECRAWL_SETTINGS["max_interval"]
+    else:
+        interval = RECRAWL_SETTINGS["default_interval"]
+    return min(RECRAWL_SETTINGS["max_interval"], max(RECRAWL_SETTINGS["min_interval"], interval))
+
+def recrawl_due(url):
+    """True if a URL should be fetched on this run: new, modified per sitemap, or past its interval"""
+    if not RECRAWL_SETTINGS["enabled"]:
+        return True
+    with state_lock:
+        entry = dict(crawl_state.get(url, {}))
+    if not entry.get("last_fetch"):
+        return True
+    if entry.get("lastmod") and entry["lastmod"] > entry["last_fetch"]:
+        return True
+    if time.time() - entry["last_fetch"] >= revisit_interval(entry):
+        return True
+    record_stat("recrawl_not_due")
+    return False
+
+class SkippedContentError(Exception):
+    """Raised when a response is abandoned because of its type or size"""
+
+    def __init__(self, url, reason, content_type=""):
+        super().__init__(f"{reason} ({content_type or 'unknown type'})")
+        self.url = url
+        self.reason = reason
+        self.content_type = content_type
+
+def has_resource_extension(url):
+    return os.path.splitext(urlparse(url).path)[1].lower() in RESOURCE_EXTENSIONS
+
+def response_content_type(response):
+    return response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+def response_content_length(response):
+    value = response.headers.get("Content-Length", "")
+    return int(value) if value.isdigit() else None
+
+def content_limit(content_type):
+    if content_type in CONTENT_LIMITS:
+        return CONTENT_LIMITS[content_type]
+    return CONTENT_LIMITS.get(content_type.split("/")[0] + "/*", CONTENT_LIMITS["default"])
+
+def looks_like_html(head):
+    head = head.lstrip()[:512].lower()
+    return head.startswith((b"<!doctype html", b"<html", b"<head", b"<body", b"<!--")) or b"<html" in head
+
+def skip_response(response, url, reason, content_type, bytes_read=0):
+    declared = response_content_length(response)
+    response.close()
+    record_stat(f"skipped_{reason.replace('-', '_').replace(' ', '_')}")
+    if declared:
+        record_stat("bytes_avoided", max(0, declared - bytes_read))
+    raise SkippedContentError(url, reason, content_type)
+
+def read_limited(response, url, limit, content_type):
+    """Read a streamed body, aborting as soon as it grows past limit"""
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=65536):
+        size += len(chunk)
+        if size > limit:
+            record_stat("bytes_downloaded", size)
+            skip_response(response, url, "oversized", content_type, size)
+        chunks.append(chunk)
+    record_stat("bytes_downloaded", size)
+    return b"".join(chunks)
+
+# Decoding: trust an explicit HTTP charset, then <meta charset>, and only otherwise run
+# charset detection on a bounded prefix of the body
+DECODING_SETTINGS = {
+    "meta_scan_bytes": 4096,  # Where <meta charset> must appear
+    "detect_bytes": 65536  # Prefix given to the charset detector
+}
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")
+]
+
+HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w\-:.]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w\-:.]+)', re.IGNORECASE)
+
+def known_encoding(name):
+    try:
+        return codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+def detect_encoding(body, content_type=""):
+    """Return (encoding, source) for an HTML body, where source says how it was found"""
+    start = time.perf_counter()
+    encoding, source = None, None
+    for bom, name in BOMS:
+        if body.startswith(bom):
+            encoding, source = name, "bom"
+            break
+    if not encoding:
+        match = HEADER_CHARSET_RE.search(content_type or "")
+        encoding, source = (known_encoding(match.group(1)) if match else None), "header"
+    if not encoding:
+        match = META_CHARSET_RE.search(body[:DECODING_SETTINGS["meta_scan_bytes"]])
+        encoding, source = (known_encoding(match.group(1)) if match else None), "meta"
+    if not encoding and charset_detector is not None:
+        prefix = body[:DECODING_SETTINGS["detect_bytes"]]
+        encoding, source = known_encoding(charset_detector.detect(prefix).get("encoding") or ""), "detected"
+    if not encoding:
+        encoding, source = "utf-8", "default"
+    # ASCII-only detections are usually a UTF-8 page whose first non-ASCII byte is past the prefix
+    if encoding == "ascii":
+        encoding = "utf-8"
+    record_stat(f"encoding_from_{source}")
+    record_stat("encoding_detect_seconds", time.perf_counter() - start)
+    return encoding, source
+
+def decode_body(body, content_type=""):
+    encoding, _ = detect_encoding(body, content_type)
+    return body.decode(encoding, errors="replace"), encoding
+
+def parse_html(body, encoding):
+    """Parse raw bytes with a known encoding so BeautifulSoup skips its own detection"""
+    return BeautifulSoup(body, "html.parser", from_encoding=encoding)
+
+def page_source(response):
+    # Only the artifacts extractor needs the decoded HTML, so don't build it otherwise
+    if "artifacts" not in ACTIVE_EXTRACTORS:
+        return ""
+    # fetch_html already chose the encoding; decode with it instead of letting .text guess again
+    if response.encoding:
+        return response.content.decode(response.encoding, errors="replace")
+    return decode_body(response.content, response.headers.get("Content-Type", ""))[0]
+
+def fetch_html(url, **kwargs):
+    """Stream an HTML page, checking Content-Type and Content-Length before reading the body.
+    Raises SkippedContentError for non-HTML or oversized responses."""
+    response = fetch_page(url, stream=True, **kwargs)
+    if response.status_code != 200:
+        response.close()
+        return response
+    content_type = response_content_type(response)
+    if content_type not in HTML_CONTENT_TYPES and content_type not in SNIFF_CONTENT_TYPES:
+        skip_response(response, url, "non-HTML", content_type)
+    limit = content_limit(content_type if content_type in HTML_CONTENT_TYPES else "text/html")
+    declared = response_content_length(response)
+    if declared and declared > limit:
+        skip_response(response, url, "oversized", content_type)
+    body = read_limited(response, url, limit, content_type)
+    if content_type not in HTML_CONTENT_TYPES and not looks_like_html(body[:1024]):
+        record_stat("skipped_non_HTML")
+        raise SkippedContentError(url, "non-HTML", content_type)
+    response._content = body  # Lets .text/.content work on the already-read body
+    response.encoding, _ = detect_encoding(body, response.headers.get("Content-Type", ""))
+    archive_response(response, body)
+    record_fetch(normalize_url(url), body)
+    return response
+
+def worker_pool_size(max_workers):
+    # Adaptive crawls start as many threads as the ceiling and let the controller gate them
+    return CONCURRENCY_SETTINGS["max_limit"] if CONCURRENCY_SETTINGS["adaptive"] else max_workers
+
+def ask_adaptive_concurrency(max_workers):
+    adaptive_input = input("Adapt concurrency per host automatically? (y/n, default: y): ").strip().lower()
+    CONCURRENCY_SETTINGS["adaptive"] = adaptive_input != 'n'
+    CONCURRENCY_SETTINGS["initial_limit"] = max_workers
+    if CONCURRENCY_SETTINGS["adaptive"]:
+        print(f"[+] Starting at {max_workers} requests per host, adapting up to {CONCURRENCY_SETTINGS['max_limit']}")
+
+def print_concurrency_report():
+    report = concurrency.report()
+    if not report or not CONCURRENCY_SETTINGS["adaptive"]:
+        return
+    print("[+] Settled concurrency per host:")
+    for host, stats in sorted(report.items()):
+        print(f"    - {host}: {stats['limit']} (peak {stats['peak']}), {stats['requests']} requests, "
+              f"{stats['errors']} errors, avg latency {stats['avg_latency']:.2f}s")
+
 def download_media(url, folder_path, media_type="image"):
     """Download image or video from URL"""
     try:
         # Skip data URLs (base64 embedded content)
         if url.startswith('data:'):
-            print(f"[!] Skipping data URL (base64 embedded): {url[:50]}...")
+            log_event(logging.DEBUG, "media_skipped", f"[!] Skipping data URL (base64 embedded): {url[:50]}...",
+                      url=url[:50], reason="data_url")
             return None
             
         # Skip very short or invalid URLs
         if len(url) < 10 or not url.startswith(('http://', 'https://')):
-            print(f"[!] Skipping invalid URL: {url}")
+            log_event(logging.DEBUG, "media_skipped", f"[!] Skipping invalid URL: {url}", url=url, reason="invalid_url")
             return None
         
-        response = requests.get(url, stream=True, timeout=15, headers={
+        response = fetch_page(url, stream=True, timeout=15, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept": "image/*,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
@@ -123,6 +1399,11 @@ def download_media(url, folder_path, media_type="image"):
         }, allow_redirects=True, verify=False)
         
         if response.status_code == 200:
+            media_limit = content_limit(response_content_type(response) or f"{media_type}/*")
+            declared = response_content_length(response)
+            if declared and declared > media_limit:
+                skip_response(response, url, "oversized", response_content_type(response))
+            
             # Get file extension from URL or content type
             parsed_url = urlparse(url)
             filename = os.path.basename(parsed_url.path)
@@ -158,42 +1439,685 @@ def download_media(url, folder_path, media_type="image"):
             
             # Check if file already exists
             if os.path.exists(file_path):
-                print(f"[!] File already exists: {filename}")
+                log_event(logging.DEBUG, "media_exists", f"[!] File already exists: {filename}", url=url, path=file_path)
                 return file_path
             
+            size = 0
             with open(file_path, 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
+                    size += len(chunk)
+                    if size > media_limit:
+                        break
                     f.write(chunk)
-                    f.flush()  # Force write to disk immediately
-                
-            # Ensure file is completely written
-            os.fsync(open(file_path, 'rb').fileno()) if os.path.exists(file_path) else None
+                if size <= media_limit:
+                    sync_output(f, file_path)
+            record_stat("bytes_downloaded", size)
+            if size > media_limit:
+                os.unlink(file_path)
+                skip_response(response, url, "oversized", response_content_type(response), size)
             
-            print(f"[✓] Downloaded {media_type}: {filename}")
+            log_event(logging.DEBUG, "media_downloaded", f"[✓] Downloaded {media_type}: {filename}",
+                      url=url, path=file_path, media_type=media_type, bytes=size)
             return file_path
         else:
-            print(f"[!] HTTP {response.status_code} for {media_type}: {url}")
+            log_event(logging.WARNING, "media_failed", f"[!] HTTP {response.status_code} for {media_type}: {url}",
+                      url=url, media_type=media_type, status=response.status_code)
+            if response.status_code in RETRY_POLICY["retry_statuses"]:
+                record_dead_letter(url, media_type, f"HTTP {response.status_code}")
             
+    except SkippedContentError as e:
+        log_event(logging.WARNING, "media_skipped", f"[!] Skipping {media_type} over the size limit: {url}",
+                  url=url, media_type=media_type, reason="oversized")
     except requests.exceptions.ConnectionError as e:
-        print(f"[!] Connection error for {media_type} {url}: Network issue")
+        log_event(logging.WARNING, "media_failed", f"[!] Connection error for {media_type} {url}: Network issue",
+                  url=url, media_type=media_type, error="connection")
+        record_dead_letter(url, media_type, e)
     except requests.exceptions.Timeout as e:
-        print(f"[!] Timeout downloading {media_type}: {url}")
+        log_event(logging.WARNING, "media_failed", f"[!] Timeout downloading {media_type}: {url}",
+                  url=url, media_type=media_type, error="timeout")
+        record_dead_letter(url, media_type, e)
     except requests.exceptions.RequestException as e:
-        print(f"[!] Request error for {media_type} {url}: {str(e)[:100]}")
+        log_event(logging.WARNING, "media_failed", f"[!] Request error for {media_type} {url}: {str(e)[:100]}",
+                  url=url, media_type=media_type, error=str(e)[:200])
     except Exception as e:
-        print(f"[!] Failed to download {media_type} from {url}: {str(e)[:100]}")
+        log_event(logging.WARNING, "media_failed", f"[!] Failed to download {media_type} from {url}: {str(e)[:100]}",
+                  url=url, media_type=media_type, error=str(e)[:200])
     return None
 
-def init_csv_writer(base_filename, folder_path=None):
+# Output compression for page artifacts, CSV and result files: None, "gzip" or "zstd".
+# With compression enabled results are streamed as JSON Lines instead of a JSON array.
+OUTPUT_SETTINGS = {
+    "compression": None,
+    "compression_level": 6,
+    "writer_queue_size": 1000,
+    "parquet": False,  # Also write results to a columnar .parquet file next to the JSON
+    "parquet_row_group_size": 1000
+}
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+def compressed_path(path):
+    return path + COMPRESSION_SUFFIXES.get(OUTPUT_SETTINGS["compression"], "")
+
+def open_output(path, mode="wb"):
+    """Open an output file for binary writing, compressed according to OUTPUT_SETTINGS"""
+    compression = OUTPUT_SETTINGS["compression"]
+    level = OUTPUT_SETTINGS["compression_level"]
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=level)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=level).stream_writer(open(path, mode), closefd=True)
+    return open(path, mode)
+
+def open_crawl_output(path, mode="rt"):
+    """Open a crawl output file for reading, whether it is gzip, zstd or uncompressed"""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic[:2] == b"\x1f\x8b":
+        stream = gzip.open(path, "rb")
+    elif magic == b"\x28\xb5\x2f\xfd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd output requires the 'zstandard' package")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        stream = io.BufferedReader(stream)
+    else:
+        stream = open(path, "rb")
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="" if path.endswith((".csv", ".csv.gz", ".csv.zst")) else None)
+
+def read_crawl_records(path):
+    """Yield result records from a JSON array or JSON Lines output, compressed or not"""
+    with open_crawl_output(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == "[":
+            for record in json.loads(first + f.read()):
+                yield record
+            return
+        # JSON Lines are streamed so large outputs never have to fit in memory
+        line = first + f.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+
+class OutputWriter:
+    """Background thread that compresses and writes output files so page workers never
+    block on disk. Whole files are written with write_file; append streams stay open
+    until close_stream/close."""
+
+    def __init__(self, max_queue=1000):
+        self.queue = Queue(maxsize=max_queue)
+        self.streams = {}
+        self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self.thread.start()
+
+    def write_file(self, path, data):
+        self.queue.put(("write", path, data))
+
+    def append(self, path, data):
+        self.queue.put(("append", path, data))
+
+    def close_stream(self, path):
+        self.queue.put(("close", path, None))
+
+    def submit(self, func, *args):
+        """Run func(*args) on the writer thread"""
+        self.queue.put(("call", func, args))
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(("stop", None, None))
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            op, path, data = self.queue.get()
+            try:
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                if op == "call":
+                    path(*data)
+                elif op == "write":
+                    with open_output(path, "wb") as f:
+                        f.write(data)
+                        sync_output(f, path)
+                elif op == "append":
+                    if path not in self.streams:
+                        self.streams[path] = open_output(path, "wb")
+                    self.streams[path].write(data)
+                    sync_output(self.streams[path], path)
+                elif op == "close":
+                    stream = self.streams.pop(path, None)
+                    if stream:
+                        stream.close()
+                        sync_closed(path)
+                elif op == "stop":
+                    for stream_path, stream in self.streams.items():
+                        stream.close()
+                        sync_closed(stream_path)
+                    self.streams.clear()
+                    return
+            except Exception as e:
+                log_event(logging.ERROR, "write_failed", f"[!] Error writing {path}: {str(e)[:100]}",
+                          path=path, error=str(e)[:200])
+            finally:
+                self.queue.task_done()
+
+output_writer = None
+output_lock = threading.Lock()  # Separate from lock: writes are queued while lock is held
+
+def get_output_writer():
+    global output_writer
+    with output_lock:
+        if output_writer is None:
+            output_writer = OutputWriter(OUTPUT_SETTINGS["writer_queue_size"])
+        return output_writer
+
+def write_artifact(path, content):
+    """Queue a page artifact for (optionally compressed) writing; returns the final path"""
+    path = compressed_path(path)
+    get_output_writer().write_file(path, content)
+    return path
+
+def flush_outputs():
+    """Wait until every queued artifact, result record and event has been written"""
+    global output_writer
+    with output_lock:
+        writer, output_writer = output_writer, None
+        pending_parquet = list(parquet_writers.values())
+        parquet_writers.clear()
+    if writer:
+        for parquet_writer in pending_parquet:
+            writer.submit(parquet_writer.close)
+        writer.close()
+    close_warc_output()
+    close_search_index()
+    flush_event_log()
+
+atexit.register(flush_outputs)
+
+def _string_list():
+    return pa.list_(pa.string())
+
+def _struct_list(*fields):
+    return pa.list_(pa.struct([
+        (name, pa.bool_() if name in ("controls", "autoplay") else pa.string()) for name in fields
+    ]))
+
+def _stream_probe_type():
+    """One entry of a record's stream_probes list, as built by StreamProber._probe"""
+    return pa.list_(pa.struct([
+        ("url", pa.string()),
+        ("probed_at", pa.string()),
+        ("ok", pa.bool_()),
+        ("pending", pa.bool_()),
+        ("status", pa.int32()),
+        ("error", pa.string()),
+        ("format", pa.string()),
+        ("live", pa.bool_()),
+        ("duration", pa.float64()),
+        ("target_duration", pa.string()),
+        ("segment_count", pa.int32()),
+        ("variants", pa.list_(pa.struct([
+            ("bandwidth", pa.int64()),
+            ("resolution", pa.string()),
+            ("codecs", pa.string()),
+            ("mime_type", pa.string())
+        ]))),
+        ("segments", pa.struct([("checked", pa.int32()), ("reachable", pa.int32())]))
+    ]))
+
+def crawl_record_schema():
+    """Arrow schema for the records produced by extract_metadata and the crawl functions"""
+    return pa.schema([
+        ("url", pa.string()),
+        ("source", pa.string()),
+        ("type", pa.string()),
+        ("content_type", pa.string()),
+        ("error", pa.string()),
+        ("canonical_url", pa.string()),
+        ("duplicate_of", pa.string()),
+        ("simhash", pa.string()),
+        ("title", pa.string()),
+        ("meta_description", pa.string()),
+        ("h1_headings", _string_list()),
+        ("h2_headings", _string_list()),
+        ("h3_headings", _string_list()),
+        ("paragraphs", _string_list()),
+        ("images", _struct_list("url", "alt", "width", "height", "downloaded_path")),
+        ("videos", _struct_list("url", "width", "height", "controls", "autoplay", "downloaded_path")),
+        ("streaming_links", _struct_list("type", "url", "width", "height", "title")),
+        ("streaming_servers", _struct_list("text", "url", "type")),
+        ("live_streams", _struct_list("type", "url")),
+        ("embedded_videos", _struct_list("type", "url", "element")),
+        ("javascript_videos", _struct_list("type", "url")),
+        ("network_streams", _struct_list("type", "url", "method", "resource_type")),
+        ("stream_probes", _stream_probe_type()),
+        ("navigation_items", _string_list()),
+        ("downloaded_images", _string_list()),
+        ("downloaded_videos", _string_list()),
+        ("extra", pa.string())  # JSON object with any fields not covered above
+    ])
+
+def _coerce(value, arrow_type):
+    if value is None:
+        return None
+    if pa.types.is_list(arrow_type):
+        return [_coerce(v, arrow_type.value_type) for v in value] if isinstance(value, list) else None
+    if pa.types.is_struct(arrow_type):
+        if not isinstance(value, dict):
+            return None
+        return {field.name: _coerce(value.get(field.name), field.type) for field in arrow_type}
+    if pa.types.is_boolean(arrow_type):
+        return bool(value)
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        try:
+            return int(value) if pa.types.is_integer(arrow_type) else float(value)
+        except (TypeError, ValueError):
+            return None
+    return value if isinstance(value, str) else json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+def record_to_row(record, schema):
+    row = {}
+    for field in schema:
+        if field.name != "extra":
+            row[field.name] = _coerce(record.get(field.name), field.type)
+    extra = {k: v for k, v in record.items() if k not in schema.names}
+    row["extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+    return row
+
+class ParquetResultWriter:
+    """Buffers crawl records and appends them to a Parquet file one row group at a time"""
+
+    def __init__(self, path, row_group_size=1000):
+        if pa is None:
+            raise RuntimeError("Parquet export requires the 'pyarrow' package")
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = crawl_record_schema()
+        self.rows = []
+        self.writer = None
+        self.count = 0
+
+    def write(self, record):
+        self.rows.append(record_to_row(record, self.schema))
+        if len(self.rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self.rows:
+            return
+        if self.writer is None:
+            codec = {"gzip": "gzip", "zstd": "zstd"}.get(OUTPUT_SETTINGS["compression"], "snappy")
+            self.writer = pq.ParquetWriter(self.path, self.schema, compression=codec)
+        self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self._write_row_group()
+        if self.writer is None:
+            # Still produce a readable (empty) file
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.close()
+
+parquet_writers = {}  # result file path -> ParquetResultWriter
+
+def parquet_path_for(filepath):
+    base = filepath
+    for suffix in list(COMPRESSION_SUFFIXES.values()) + [".jsonl", ".json"]:
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return base + ".parquet"
+
+def queue_parquet_record(filepath, item):
+    with output_lock:
+        parquet_writer = parquet_writers.get(filepath)
+        if parquet_writer is None:
+            parquet_writer = ParquetResultWriter(parquet_path_for(filepath), OUTPUT_SETTINGS["parquet_row_group_size"])
+            parquet_writers[filepath] = parquet_writer
+    get_output_writer().submit(parquet_writer.write, item)
+
+def convert_to_parquet(input_path, output_path=None):
+    """Convert an existing JSON/JSONL crawl output (compressed or not) to Parquet"""
+    output_path = output_path or parquet_path_for(input_path)
+    parquet_writer = ParquetResultWriter(output_path, OUTPUT_SETTINGS["parquet_row_group_size"])
+    for record in read_crawl_records(input_path):
+        parquet_writer.write(record)
+    parquet_writer.close()
+    print(f"[✓] Converted {parquet_writer.count} records to: {output_path}")
+    return output_path
+
+# WARC archive output: request/response records (and rendered snapshots from the dynamic
+# crawl) appended to size-rotated .warc.gz files, one gzip member per record, with a CDX index
+WARC_SETTINGS = {
+    "enabled": False,
+    "max_file_size": 1024 * 1024 * 1024,  # Rotate to a new .warc.gz after this many bytes
+    "queue_size": 500
+}
+
+HOP_BY_HOP_HEADERS = ("content-encoding", "transfer-encoding", "content-length")
+
+def surt_url(url):
+    """SURT-style sort key used in the CDX index (com,example)/path?query)"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not re.fullmatch(r'[\d.]+', host):  # IP addresses are kept as-is
+        host = ",".join(reversed(host.split(".")))
+    key = host + ")" + (parsed.path or "/").lower()
+    if parsed.query:
+        key += "?" + parsed.query
+    return key
+
+def warc_digest(data):
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode("ascii")
+
+def build_warc_record(warc_type, url, block, content_type, extra_headers=None, record_date=None, record_id=None):
+    record_date = record_date or datetime.now(timezone.utc)
+    headers = [
+        ("WARC-Type", warc_type),
+        ("WARC-Record-ID", record_id or f"<urn:uuid:{uuid.uuid4()}>"),
+        ("WARC-Date", record_date.strftime("%Y-%m-%dT%H:%M:%SZ")),
+    ]
+    if url:
+        headers.append(("WARC-Target-URI", url))
+    headers.extend(extra_headers or [])
+    headers.extend([
+        ("WARC-Block-Digest", warc_digest(block)),
+        ("Content-Type", content_type),
+        ("Content-Length", str(len(block))),
+    ])
+    head = "WARC/1.1\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers) + "\r\n"
+    return head.encode("utf-8") + block + b"\r\n\r\n"
+
+def http_response_block(response, body):
+    version = {10: "HTTP/1.0", 11: "HTTP/1.1"}.get(getattr(response.raw, "version", 11), "HTTP/1.1")
+    lines = [f"{version} {response.status_code} {response.reason or ''}".rstrip()]
+    for name, value in response.headers.items():
+        # requests already decoded the body, so record the original transfer headers under a new name
+        if name.lower() in HOP_BY_HOP_HEADERS:
+            lines.append(f"X-Archive-Orig-{name}: {value}")
+        else:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "replace") + body
+
+def http_request_block(request):
+    parsed = urlparse(request.url)
+    target = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+    lines = [f"{request.method} {target} HTTP/1.1", f"Host: {parsed.netloc}"]
+    lines.extend(f"{name}: {value}" for name, value in request.headers.items() if name.lower() != "host")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "replace")
+
+class WarcWriter:
+    """Background thread that gzips WARC records, rotates files by size and maintains a CDX index"""
+
+    def __init__(self, folder, prefix, max_file_size):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        self.serial = 0
+        self.file = None
+        self.filename = None
+        self.records = 0
+        self.cdx = open(os.path.join(folder, f"{prefix}.cdx"), "a", encoding="utf-8")
+        if self.cdx.tell() == 0:
+            self.cdx.write(" CDX N b a m s k r M S V g\n")
+        self.queue = Queue(maxsize=WARC_SETTINGS["queue_size"])
+        self.thread = threading.Thread(target=self._run, name="warc-writer", daemon=True)
+        self.thread.start()
+
+    def archive_response(self, response, body):
+        record_date = datetime.now(timezone.utc)
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+        payload_digest = warc_digest(body)
+        response_record = build_warc_record(
+            "response", response.url, http_response_block(response, body), "application/http; msgtype=response",
+            [("WARC-Payload-Digest", payload_digest)], record_date, response_id)
+        request_record = build_warc_record(
+            "request", response.url, http_request_block(response.request), "application/http; msgtype=request",
+            [("WARC-Concurrent-To", response_id)], record_date)
+        mime = response_content_type(response) or "unk"
+        # Queued together so a response and its request always land in the same file
+        self.queue.put(([response_record, request_record],
+                        (response.url, record_date, mime, str(response.status_code), payload_digest)))
+
+    def archive_snapshot(self, url, html):
+        """Store a browser-rendered DOM snapshot as a resource record"""
+        body = html.encode("utf-8")
+        record_date = datetime.now(timezone.utc)
+        digest = warc_digest(body)
+        record = build_warc_record("resource", url, body, "text/html; charset=utf-8",
+                                   [("WARC-Payload-Digest", digest), ("WARC-Source", "playwright-rendered")], record_date)
+        self.queue.put(([record], (url, record_date, "text/html", "-", digest)))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _open_next_file(self):
+        if self.file:
+            self.file.close()
+            sync_closed(self.file.name)
+        self.serial += 1
+        self.filename = f"{self.prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{self.serial:05d}.warc.gz"
+        self.file = open(os.path.join(self.folder, self.filename), "ab")
+        info = (f"software: CrawlAnything\r\nformat: WARC File Format 1.1\r\n"
+                f"hostname: {self.prefix}\r\n").encode("utf-8")
+        self.file.write(gzip.compress(build_warc_record("warcinfo", None, info, "application/warc-fields")))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            records, cdx_fields = item
+            try:
+                if self.file is None or self.file.tell() >= self.max_file_size:
+                    self._open_next_file()
+                offset = self.file.tell()
+                compressed = gzip.compress(records[0])
+                self.file.write(compressed)
+                for record in records[1:]:
+                    self.file.write(gzip.compress(record))
+                self.records += len(records)
+                if cdx_fields:
+                    url, record_date, mime, status, digest = cdx_fields
+                    self.cdx.write(" ".join([
+                        surt_url(url), record_date.strftime("%Y%m%d%H%M%S"), url.replace(" ", "%20"), mime,
+                        status, digest.split(":", 1)[1], "-", "-", str(len(compressed)), str(offset), self.filename
+                    ]) + "\n")
+                sync_output(self.file)
+                sync_output(self.cdx)
+            except Exception as e:
+                log_event(logging.ERROR, "write_failed", f"[!] Error writing WARC record: {str(e)[:100]}",
+                          path=self.filename, error=str(e)[:200])
+        if self.file:
+            self.file.close()
+            sync_closed(self.file.name)
+        self.cdx.close()
+        sync_closed(self.cdx.name)
+        print(f"[✓] Wrote {self.records} WARC records to: {self.folder}")
+
+warc_writer = None
+
+def start_warc_output(folder, prefix):
+    global warc_writer
+    close_warc_output()
+    if WARC_SETTINGS["enabled"]:
+        warc_writer = WarcWriter(folder, prefix, WARC_SETTINGS["max_file_size"])
+        print(f"[+] WARC archives will be written to: {folder}")
+
+def close_warc_output():
+    global warc_writer
+    writer, warc_writer = warc_writer, None
+    if writer:
+        writer.close()
+
+def archive_response(response, body):
+    writer = warc_writer
+    if writer:
+        writer.archive_response(response, body)
+
+def archive_snapshot(url, html):
+    writer = warc_writer
+    if writer:
+        writer.archive_snapshot(url, html)
+
+def parse_http_block(block):
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("utf-8", "replace").split("\r\n")
+    status_parts = lines[0].split(" ", 2)
+    status = int(status_parts[1]) if len(status_parts) > 1 and status_parts[1].isdigit() else None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, body
+
+def _read_warc_record(stream, max_block=None):
+    line = stream.readline()
+    while line in (b"\r\n", b"\n"):
+        line = stream.readline()
+    if not line:
+        return None
+    headers = {}
+    for line in iter(stream.readline, b"\r\n"):
+        if not line:
+            break
+        name, _, value = line.decode("utf-8", "replace").partition(":")
+        headers[name.strip()] = value.strip()
+    length = int(headers.get("Content-Length", "0"))
+    if max_block is None:
+        block = stream.read(length)
+        stream.read(4)  # Trailing \r\n\r\n
+    else:
+        # Only the HTTP headers are needed: skip the rest of the block without reading it
+        block = stream.read(min(length, max_block))
+        stream.seek(length - len(block) + 4, os.SEEK_CUR)
+    record = {"type": headers.get("WARC-Type"), "url": headers.get("WARC-Target-URI"),
+              "date": headers.get("WARC-Date"), "warc_headers": headers, "status": None,
+              "http_headers": {}, "body": block}
+    if record["type"] == "response" and headers.get("Content-Type", "").startswith("application/http"):
+        record["status"], record["http_headers"], record["body"] = parse_http_block(block)
+    elif record["type"] == "resource":
+        record["http_headers"] = {"content-type": headers.get("Content-Type", "")}
+    return record
+
+def iter_warc_records(path):
+    """Yield the records of a (gzip-per-record or plain) WARC file as dicts"""
+    with open_crawl_output(path, "rb") as stream:
+        while True:
+            record = _read_warc_record(stream)
+            if record is None:
+                break
+            yield record
+
+def scan_warc_records(path, head_size=65536):
+    """Yield (offset, record) for each record of a WARC file; record bodies are cut to head_size bytes"""
+    with open(path, "rb") as f:
+        if f.read(2) != b"\x1f\x8b":
+            f.seek(0)
+            while True:
+                offset = f.tell()
+                record = _read_warc_record(f, max_block=head_size)
+                if record is None:
+                    return
+                yield offset, record
+        # One gzip member per record: decompress each member in chunks, keeping only its head
+        offset = 0
+        while True:
+            f.seek(offset)
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            head, consumed = b"", 0
+            while not decompressor.eof:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                consumed += len(chunk)
+                data = decompressor.decompress(chunk)
+                head += data[:head_size - len(head)]
+            record = _read_warc_record(io.BytesIO(head)) if head else None
+            if record is None:
+                return
+            yield offset, record
+            if not decompressor.eof:
+                return
+            offset += consumed - len(decompressor.unused_data)
+
+def read_warc_record_at(path, offset):
+    """Read the single record starting at a CDX offset without scanning the file"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        gzipped = f.read(2) == b"\x1f\x8b"
+        f.seek(offset)
+        return _read_warc_record(gzip.GzipFile(fileobj=f) if gzipped else f)
+
+def ask_output_options():
+    choice = input("Compress output files? (none/gzip/zstd, default: none): ").strip().lower()
+    if choice in COMPRESSION_SUFFIXES:
+        if choice == "zstd" and zstandard is None:
+            print("[!] zstandard is not installed, falling back to gzip")
+            choice = "gzip"
+        OUTPUT_SETTINGS["compression"] = choice
+        print(f"[+] Output files will be {choice}-compressed")
+    else:
+        OUTPUT_SETTINGS["compression"] = None
+    
+    parquet_input = input("Also export results to Parquet? (y/n, default: n): ").strip().lower()
+    OUTPUT_SETTINGS["parquet"] = parquet_input == 'y' and pa is not None
+    if parquet_input == 'y' and pa is None:
+        print("[!] pyarrow is not installed, skipping Parquet export")
+    
+    warc_input = input("Write WARC archives of fetched pages? (y/n, default: n): ").strip().lower()
+    WARC_SETTINGS["enabled"] = warc_input == 'y'
+    
+    search_input = input("Build a full-text search index of crawled pages? (y/n, default: n): ").strip().lower()
+    SEARCH_SETTINGS["enabled"] = search_input == 'y'
+
+class QueuedTextStream:
+    """File-like wrapper that hands text writes to the background output writer"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, text):
+        get_output_writer().append(self.path, text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        get_output_writer().close_stream(self.path)
+
+def is_stream_output(filepath):
+    return filepath.endswith(".jsonl") or filepath.endswith(tuple(COMPRESSION_SUFFIXES.values()))
+
+def init_csv_writer(base_filename, folder_path=None, header=None):
     if folder_path:
         os.makedirs(folder_path, exist_ok=True)
         filepath = os.path.join(folder_path, f"{base_filename}.csv")
     else:
         os.makedirs("output", exist_ok=True)
         filepath = os.path.join("output", f"{base_filename}.csv")
-    f = open(filepath, "w", newline="", encoding="utf-8")
+    if OUTPUT_SETTINGS["compression"]:
+        filepath = compressed_path(filepath)
+        f = QueuedTextStream(filepath)
+    else:
+        f = open(filepath, "w", newline="", encoding="utf-8")
     writer = csv.writer(f)
-    writer.writerow(["URL"])
+    writer.writerow(header or ["URL"])
     return f, writer, filepath
 
 def init_json_file(base_filename, folder_path=None):
@@ -203,12 +2127,22 @@ def init_json_file(base_filename, folder_path=None):
     else:
         os.makedirs("output", exist_ok=True)
         filepath = os.path.join("output", f"{base_filename}.json")
+    if OUTPUT_SETTINGS["compression"]:
+        # Compressed results are streamed as JSON Lines by the background writer
+        return compressed_path(filepath + "l")
     # Start with empty list in file
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump([], f, indent=2)
     return filepath
 
 def append_json(filepath, item):
+    if SEARCH_TEXT_KEY in item:
+        index_record(item, item.pop(SEARCH_TEXT_KEY))
+    if OUTPUT_SETTINGS["parquet"]:
+        queue_parquet_record(filepath, item)
+    if is_stream_output(filepath):
+        get_output_writer().append(filepath, json.dumps(item, ensure_ascii=False) + "\n")
+        return
     # Read current data
     with lock:  # Thread-safe JSON writing
         try:
@@ -221,104 +2155,738 @@ def append_json(filepath, item):
 
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
-            f.flush()  # Force write to disk immediately
-        
-        # Ensure file is completely written to disk
-        try:
-            with open(filepath, 'r') as f:
-                os.fsync(f.fileno())
-        except:
-            pass
+        due = sync_due(filepath)
+    # The disk sync happens outside the lock so other workers aren't serialized behind it
+    if due:
+        fsync_path(filepath)
 
 def write_url(writer, file, url):
     norm_url = normalize_url(url)
     with lock:  # Thread-safe writing
-        if norm_url not in visited_urls:
-            visited_urls.add(norm_url)
-            writer.writerow([norm_url])
+        visited_urls.add(norm_url)
+        # Fetch paths mark URLs visited before recording them, so the CSV keeps its own set
+        if norm_url in recorded_urls:
+            return
+        recorded_urls.add(norm_url)
+        writer.writerow([norm_url])
+        # Compressed CSVs are QueuedTextStreams, synced by the output writer thread
+        due = hasattr(file, "fileno") and sync_due(file.name)
+        if due:
             file.flush()
-            print(f"[✓] Saved URL: {norm_url}")
+    if due:
+        os.fsync(file.fileno())
+        record_stat("fsyncs")
+    log_event(logging.DEBUG, "url_saved", f"[✓] Saved URL: {norm_url}", url=norm_url)
 
-def extract_metadata(soup, base_url, html_source="", media_folder=None, download_media_flag=False):
-    title = soup.title.string.strip() if soup.title and soup.title.string else ""
-    meta_desc_tag = soup.find("meta", attrs={"name":"description"})
-    meta_desc = meta_desc_tag["content"].strip() if meta_desc_tag and meta_desc_tag.get("content") else ""
-    
-    # Save both HTML source code and text content
-    if html_source:
+# Crawl frontier: URLs are deduplicated when enqueued (not only once fetched), and the
+# queue keeps a bounded number of URLs in memory, spilling the rest to a temp file
+FRONTIER_SETTINGS = {
+    "max_memory": 100000,  # URLs held in memory before new ones spill to disk
+    "refill": 10000  # URLs read back from the spill file at a time
+}
+
+def url_key(url):
+    # A 64-bit hash kept as a Python int costs ~70 bytes per URL with its set slot,
+    # about half of what storing typical URL strings in the seen set would
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+class Frontier:
+    """FIFO URL queue with enqueue-time deduplication and a disk-backed overflow"""
+
+    def __init__(self, max_memory=None):
+        self.max_memory = max_memory or FRONTIER_SETTINGS["max_memory"]
+        self.memory = deque()
+        self.seen = set()
+        self.spill = None
+        self.spill_read = 0
+        self.spilled = 0  # URLs currently waiting in the spill file
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def push(self, url, force=False):
+        """Enqueue url unless it was already enqueued or fetched; force re-queues deferred URLs"""
+        key = url_key(url)
+        with self.lock:
+            if not force:
+                if key in self.seen or url in visited_urls:
+                    self.stats["duplicates_suppressed"] += 1
+                    return False
+                self.seen.add(key)
+                self.stats["enqueued"] += 1
+            if len(self.memory) < self.max_memory and not self.spilled:
+                self.memory.append(url)
+            else:
+                self._spill(url)
+            self.stats["peak_length"] = max(self.stats["peak_length"], len(self.memory) + self.spilled)
+            return True
+
+    def pop(self):
+        with self.lock:
+            if not self.memory and self.spilled:
+                self._refill()
+            return self.memory.popleft() if self.memory else None
+
+    def _spill(self, url):
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.spill.seek(0, os.SEEK_END)
+        self.spill.write(url + "\n")
+        self.spilled += 1
+        self.stats["spilled"] += 1
+
+    def _refill(self):
+        self.spill.seek(self.spill_read)
+        for _ in range(min(FRONTIER_SETTINGS["refill"], self.spilled)):
+            self.memory.append(self.spill.readline().rstrip("\n"))
+            self.spilled -= 1
+        self.spill_read = self.spill.tell()
+        if not self.spilled:
+            # Everything was read back: start the file over
+            self.spill.seek(0)
+            self.spill.truncate()
+            self.spill_read = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.memory) + self.spilled
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    def report(self, label):
+        with self.lock:
+            stats = dict(self.stats)
+        for name in ("enqueued", "duplicates_suppressed", "spilled"):
+            if stats.get(name):
+                record_stat(f"frontier_{name}", stats[name])
+        with stats_lock:
+            crawl_stats["frontier_peak_length"] = max(crawl_stats["frontier_peak_length"], stats.get("peak_length", 0))
+        print(f"[+] {label} frontier: {stats.get('enqueued', 0)} URLs enqueued, "
+              f"{stats.get('duplicates_suppressed', 0)} duplicates suppressed, peak length {stats.get('peak_length', 0)}"
+              + (f", {stats['spilled']} spilled to disk" if stats.get("spilled") else ""))
+
+# Stream probing: HLS/DASH manifests found on pages are fetched once per crawl (cached
+# for a TTL), parsed, and summarized in each record's "stream_probes" field
+STREAM_PROBE_SETTINGS = {
+    "enabled": False,
+    "ttl": 600,  # Seconds a probe result is reused for the same manifest URL
+    "max_concurrency": 8,  # Manifests probed at the same time across the whole crawl
+    "timeout": 10,
+    "max_manifest_bytes": 2 * 1024 * 1024,
+    "segments_checked": 2,  # Segments fetched (1 byte each) to test reachability
+    "max_per_page": 10,
+    "max_variants": 20,  # Variants/representations kept per result
+    "page_wait": 5.0  # Seconds a page waits for all its probes together; unfinished ones are saved as pending
+}
+
+STREAM_FIELDS = ("live_streams", "javascript_videos", "network_streams", "embedded_videos", "videos")
+
+def is_manifest_url(url):
+    return url.startswith(("http://", "https://")) and urlparse(url).path.lower().endswith((".m3u8", ".mpd"))
+
+def manifest_urls(record):
+    """Unique HLS/DASH manifest URLs referenced by a record's stream fields"""
+    urls = []
+    for field in STREAM_FIELDS:
+        for item in record.get(field) or []:
+            url = html.unescape(item.get("url", "")) if isinstance(item, dict) else ""
+            if is_manifest_url(url) and url not in urls:
+                urls.append(url)
+    return urls
+
+def parse_hls_attributes(text):
+    return {key: value.strip('"') for key, value in re.findall(r'([A-Z0-9\-]+)=("[^"]*"|[^,]*)', text)}
+
+def parse_hls(text, base_url):
+    """Parse an M3U8 playlist into its variants (master) or segments (media)"""
+    variants, segments = [], []
+    stream_info = None
+    duration = 0.0
+    target_duration = None
+    for line in (line.strip() for line in text.splitlines()):
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            stream_info = parse_hls_attributes(line.split(":", 1)[1])
+        elif line.startswith("#EXTINF:"):
+            try:
+                duration += float(line[len("#EXTINF:"):].split(",")[0])
+            except ValueError:
+                pass
+        elif line.startswith("#EXT-X-TARGETDURATION:"):
+            target_duration = line.split(":", 1)[1]
+        elif line and not line.startswith("#"):
+            if stream_info is not None:
+                variants.append({
+                    "bandwidth": int(stream_info["BANDWIDTH"]) if stream_info.get("BANDWIDTH", "").isdigit() else None,
+                    "resolution": stream_info.get("RESOLUTION"),
+                    "codecs": stream_info.get("CODECS"),
+                    "url": urljoin(base_url, line)
+                })
+                stream_info = None
+            else:
+                segments.append(urljoin(base_url, line))
+    if variants:
+        return {"type": "master", "variants": variants}
+    live = "#EXT-X-ENDLIST" not in text
+    return {
+        "type": "media", "live": live, "segments": segments, "target_duration": target_duration,
+        "duration": None if live else round(duration, 1)
+    }
+
+def parse_iso_duration(value):
+    match = re.match(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?$', value or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = (float(part or 0) for part in match.groups())
+    return round(days * 86400 + hours * 3600 + minutes * 60 + seconds, 1)
+
+def parse_dash(body, base_url):
+    """Parse an MPD into its representations and the URLs of their first segments"""
+    root = ElementTree.fromstring(body)
+    ns = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    base_element = root.find(ns + "BaseURL")
+    mpd_base = urljoin(base_url, base_element.text.strip()) if base_element is not None and base_element.text else base_url
+    representations, segments = [], []
+    for adaptation in root.iter(ns + "AdaptationSet"):
+        for representation in adaptation.findall(ns + "Representation"):
+            rep_id = representation.get("id", "")
+            bandwidth = representation.get("bandwidth", "")
+            width = representation.get("width") or adaptation.get("width")
+            height = representation.get("height") or adaptation.get("height")
+            representations.append({
+                "bandwidth": int(bandwidth) if bandwidth.isdigit() else None,
+                "resolution": f"{width}x{height}" if width and height else None,
+                "codecs": representation.get("codecs") or adaptation.get("codecs"),
+                "mime_type": representation.get("mimeType") or adaptation.get("mimeType")
+            })
+            template = representation.find(ns + "SegmentTemplate")
+            if template is None:
+                template = adaptation.find(ns + "SegmentTemplate")
+            rep_base = representation.find(ns + "BaseURL")
+            if template is not None and template.get("initialization"):
+                init = template.get("initialization").replace("$RepresentationID$", rep_id).replace("$Bandwidth$", bandwidth)
+                segments.append(urljoin(mpd_base, init))
+            elif rep_base is not None and rep_base.text:
+                segments.append(urljoin(mpd_base, rep_base.text.strip()))
+    return {
+        "live": root.get("type") == "dynamic", "representations": representations, "segments": segments,
+        "duration": parse_iso_duration(root.get("mediaPresentationDuration"))
+    }
+
+class StreamProber:
+    """Probes manifests on a background event loop (aiohttp when installed, otherwise
+    requests in a thread pool). Results are cached per URL and concurrent requests for
+    the same manifest share one probe."""
+
+    def __init__(self):
+        self.cache = {}  # url -> (expires_at, result)
+        self.inflight = {}  # url -> Future
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=STREAM_PROBE_SETTINGS["max_concurrency"],
+                                           thread_name_prefix="stream-probe")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="stream-prober", daemon=True)
+        self.thread.start()
+        self.session = asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    async def _setup(self):
+        self.semaphore = asyncio.Semaphore(STREAM_PROBE_SETTINGS["max_concurrency"])
+        if aiohttp is None:
+            return None
+        return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=STREAM_PROBE_SETTINGS["timeout"]),
+                                     headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"})
+
+    def probe(self, url):
+        """Return a Future with the probe result for url"""
+        with self.lock:
+            entry = self.cache.get(url)
+            if entry and entry[0] > time.time():
+                record_stat("stream_probe_cache_hits")
+                future = Future()
+                future.set_result(entry[1])
+                return future
+            future = self.inflight.get(url)
+            started = future is None
+            if started:
+                future = asyncio.run_coroutine_threadsafe(self._probe(url), self.loop)
+                self.inflight[url] = future
+            else:
+                record_stat("stream_probe_cache_hits")
+        if started:
+            # Outside the lock: a probe that already finished runs _finish right here
+            future.add_done_callback(lambda done, url=url: self._finish(url, done))
+        return future
+
+    def _finish(self, url, future):
+        with self.lock:
+            self.inflight.pop(url, None)
+            if not future.cancelled() and future.exception() is None:
+                self.cache[url] = (time.time() + STREAM_PROBE_SETTINGS["ttl"], future.result())
+
+    async def _get(self, url, range_check=False):
+        """Return (status, body, final URL); range checks only ask for the first byte"""
+        headers = {"Range": "bytes=0-0"} if range_check else {}
+        limit = STREAM_PROBE_SETTINGS["max_manifest_bytes"]
+        if self.session is not None:
+            async with self.session.get(url, headers=headers, ssl=False) as response:
+                body = b""
+                while not range_check and len(body) < limit:
+                    chunk = await response.content.read(limit - len(body))
+                    if not chunk:
+                        break
+                    body += chunk
+                return response.status, body, str(response.url)
+        return await self.loop.run_in_executor(self.executor, self._get_blocking, url, headers, range_check)
+
+    def _get_blocking(self, url, headers, range_check):
+        response = fetch_page(url, headers=headers, timeout=STREAM_PROBE_SETTINGS["timeout"], stream=True, verify=False)
         try:
-            # Use the media_folder as the base folder for all content
-            base_folder = media_folder if media_folder else os.path.join("output", generate_filename(base_url))
-            os.makedirs(base_folder, exist_ok=True)
-            
-            # Create subfolders for different types of content
-            source_folder = os.path.join(base_folder, "source")
-            os.makedirs(source_folder, exist_ok=True)
-            os.makedirs(os.path.join(source_folder, "html"), exist_ok=True)
-            os.makedirs(os.path.join(source_folder, "js"), exist_ok=True)
-            os.makedirs(os.path.join(source_folder, "css"), exist_ok=True)
-            text_folder = os.path.join(base_folder, "text")
-            os.makedirs(text_folder, exist_ok=True)
-            
-            # Generate base filename without timestamp for cleaner structure
-            parsed = urlparse(base_url)
-            page_name = parsed.path.strip('/').replace('/', '_') or "home"
-            base_filename = re.sub(r'[^\w\-_]', '_', page_name)
-            
-            # Save full HTML source code
-            html_file_path = os.path.join(source_folder, "html", f"{base_filename}.html")
-            with open(html_file_path, 'w', encoding='utf-8') as f:
-                f.write(html_source)
-            print(f"[✓] Saved HTML source code to: {html_file_path}")
-            
-            # Extract and save JavaScript code
-            script_count = 0
-            for script in soup.find_all("script"):
-                if script.string:  # Only save scripts with content
-                    script_count += 1
-                    js_file_path = os.path.join(source_folder, "js", f"{base_filename}_script_{script_count}.js")
-                    with open(js_file_path, 'w', encoding='utf-8') as f:
-                        f.write(script.string)
-            if script_count > 0:
-                print(f"[✓] Saved {script_count} JavaScript files")
-                
-            # Extract and save CSS code
-            style_count = 0
-            for style in soup.find_all("style"):
-                if style.string:  # Only save styles with content
-                    style_count += 1
-                    css_file_path = os.path.join(source_folder, "css", f"{base_filename}_style_{style_count}.css")
-                    with open(css_file_path, 'w', encoding='utf-8') as f:
-                        f.write(style.string)
-            
-            # Save external CSS links
-            for link in soup.find_all("link", rel="stylesheet"):
-                href = link.get("href")
-                if href:
-                    style_count += 1
-                    css_file_path = os.path.join(source_folder, "css", f"{base_filename}_external_{style_count}.css")
-                    try:
-                        css_url = urljoin(base_url, href)
-                        css_response = requests.get(css_url, timeout=10)
-                        if css_response.status_code == 200:
-                            with open(css_file_path, 'w', encoding='utf-8') as f:
-                                f.write(css_response.text)
-                    except:
-                        pass
-            if style_count > 0:
-                print(f"[✓] Saved {style_count} CSS files")
-            
-            # Extract and save text content
-            text_content = soup.get_text(separator='\n', strip=True)
-            text_file_path = os.path.join(text_folder, f"{base_filename}.txt")
-            with open(text_file_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
-            print(f"[✓] Saved text content to: {text_file_path}")
-            
+            body = b"" if range_check else response.raw.read(STREAM_PROBE_SETTINGS["max_manifest_bytes"], decode_content=True)
+            return response.status_code, body, response.url
+        finally:
+            response.close()
+
+    async def _check_segments(self, segments):
+        count = STREAM_PROBE_SETTINGS["segments_checked"]
+        # First and last segments: the last one matters most for live streams
+        sample = list(dict.fromkeys(segments[:max(1, count - 1)] + segments[-1:]))[:count]
+        statuses = await asyncio.gather(*(self._get(url, range_check=True) for url in sample), return_exceptions=True)
+        reachable = sum(1 for status in statuses if not isinstance(status, Exception) and status[0] in (200, 206))
+        return {"checked": len(sample), "reachable": reachable}
+
+    async def _probe(self, url):
+        result = {"url": url, "probed_at": datetime.now(timezone.utc).isoformat()}
+        async with self.semaphore:
+            record_stat("stream_probes")
+            try:
+                status, body, final_url = await self._get(url)
+                result["status"] = status
+                if status != 200:
+                    result["ok"] = False
+                    return result
+                segments = []
+                if body.lstrip().startswith(b"#EXTM3U"):
+                    result["format"] = "hls"
+                    playlist = parse_hls(body.decode("utf-8", errors="replace"), final_url)
+                    if playlist["type"] == "master":
+                        variants = playlist["variants"]
+                        result["variants"] = [{k: v for k, v in variant.items() if k != "url"}
+                                              for variant in variants[:STREAM_PROBE_SETTINGS["max_variants"]]]
+                        # Liveness and segments come from the lowest-bandwidth variant's playlist
+                        variant = min(variants, key=lambda v: v["bandwidth"] or 0)
+                        status, body, final_url = await self._get(variant["url"])
+                        playlist = parse_hls(body.decode("utf-8", errors="replace"), final_url) if status == 200 else None
+                    if playlist and playlist["type"] == "media":
+                        result["live"] = playlist["live"]
+                        result["duration"] = playlist["duration"]
+                        result["target_duration"] = playlist["target_duration"]
+                        result["segment_count"] = len(playlist["segments"])
+                        segments = playlist["segments"]
+                elif b"<MPD" in body[:4096]:
+                    result["format"] = "dash"
+                    manifest = parse_dash(body, final_url)
+                    result["live"] = manifest["live"]
+                    result["duration"] = manifest["duration"]
+                    result["variants"] = manifest["representations"][:STREAM_PROBE_SETTINGS["max_variants"]]
+                    segments = manifest["segments"]
+                else:
+                    result["ok"] = False
+                    result["error"] = "Not an HLS or DASH manifest"
+                    return result
+                if segments:
+                    result["segments"] = await self._check_segments(segments)
+                result["ok"] = True
+            except Exception as e:
+                result["ok"] = False
+                result["error"] = str(e)[:100] or type(e).__name__
+        return result
+
+    def close(self):
+        if self.session is not None:
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+stream_prober = None
+stream_prober_lock = threading.Lock()
+
+def get_stream_prober():
+    global stream_prober
+    with stream_prober_lock:
+        if stream_prober is None:
+            stream_prober = StreamProber()
+        return stream_prober
+
+def close_stream_prober():
+    global stream_prober
+    with stream_prober_lock:
+        if stream_prober is not None:
+            stream_prober.close()
+            stream_prober = None
+
+atexit.register(close_stream_prober)
+
+def attach_stream_probes(record):
+    """Probe the record's manifests (deduplicated crawl-wide) and add the results as stream_probes.
+    Called by the crawl functions when a page is fetched, never when records are merged or reprocessed."""
+    if not STREAM_PROBE_SETTINGS["enabled"] or "stream_probes" in record:
+        return
+    urls = manifest_urls(record)[:STREAM_PROBE_SETTINGS["max_per_page"]]
+    if not urls:
+        return
+    prober = get_stream_prober()
+    futures = [(url, prober.probe(url)) for url in urls]
+    # One deadline for the whole page; probes still running keep going and fill the cache
+    # for later pages that reference the same manifest
+    wait([future for _, future in futures], timeout=STREAM_PROBE_SETTINGS["page_wait"])
+    probes = []
+    for url, future in futures:
+        if not future.done():
+            record_stat("stream_probes_pending")
+            probes.append({"url": url, "pending": True})
+            continue
+        try:
+            probes.append(future.result())
         except Exception as e:
-            print(f"[!] Error saving page content: {str(e)[:100]}")
+            probes.append({"url": url, "ok": False, "error": str(e)[:100] or type(e).__name__})
+    record["stream_probes"] = probes
+
+def ask_stream_probes():
+    probe_input = input("Probe HLS/DASH manifests found on pages? (y/n, default: n): ").strip().lower()
+    STREAM_PROBE_SETTINGS["enabled"] = probe_input == 'y'
+    if STREAM_PROBE_SETTINGS["enabled"]:
+        backend = "aiohttp" if aiohttp is not None else "requests"
+        print(f"[+] Probing manifests with {backend}, up to {STREAM_PROBE_SETTINGS['max_concurrency']} at a time")
+
+# Full-text search index: extracted pages are upserted into a SQLite FTS5 table by a
+# background writer as records are saved, so a crawl (or recrawl) keeps its index current
+SEARCH_SETTINGS = {
+    "enabled": False,
+    "index_file": "search_index.db",
+    "batch_size": 200,            # Commit after this many pages...
+    "commit_interval": 2.0,       # ...or after this many seconds, whichever comes first
+    "max_text_chars": 200000,     # Truncate very long page text before indexing
+    "queue_size": 1000,
+    "weights": (10.0, 5.0, 2.0, 1.0)  # bm25 weights for title, headings, paragraphs, body
+}
+
+# Extracted page text travels with the record to append_json under this key and is
+# removed there, so it never reaches the saved outputs
+SEARCH_TEXT_KEY = "_search_text"
+
+SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, crawled_at TEXT NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(title, headings, paragraphs, body,
+                                                   tokenize='unicode61 remove_diacritics 2');
+"""
+
+class SearchIndexWriter:
+    """Background thread that owns the index connection and commits upserts in batches"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.queue = Queue(maxsize=SEARCH_SETTINGS["queue_size"])
+        self.thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self.thread.start()
+
+    def add(self, url, crawled_at, title, headings, paragraphs, body):
+        self.queue.put((url, crawled_at, title, headings, paragraphs, body))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _upsert(self, conn, url, crawled_at, title, headings, paragraphs, body):
+        # FTS5 rows can't be updated by URL cheaply, so each URL keeps a stable rowid in
+        # documents and a recrawl replaces just that row
+        row = conn.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+        if row:
+            doc_id = row[0]
+            conn.execute("DELETE FROM pages WHERE rowid = ?", (doc_id,))
+            conn.execute("UPDATE documents SET crawled_at = ? WHERE id = ?", (crawled_at, doc_id))
+        else:
+            doc_id = conn.execute("INSERT INTO documents (url, crawled_at) VALUES (?, ?)", (url, crawled_at)).lastrowid
+        conn.execute("INSERT INTO pages (rowid, title, headings, paragraphs, body) VALUES (?, ?, ?, ?, ?)",
+                     (doc_id, title, headings, paragraphs, body))
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # SQLite syncs on its own commits, so the durability policy maps onto its sync level
+        synchronous = {"none": "OFF", "periodic": "NORMAL", "record": "FULL"}[DURABILITY_SETTINGS["policy"]]
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.executescript(SEARCH_SCHEMA)
+        pending = 0
+        last_commit = time.time()
+        batch_size = 1 if DURABILITY_SETTINGS["policy"] == "record" else SEARCH_SETTINGS["batch_size"]
+        while True:
+            try:
+                item = self.queue.get(timeout=SEARCH_SETTINGS["commit_interval"])
+            except Empty:
+                item = False
+            if item:
+                try:
+                    self._upsert(conn, *item)
+                    pending += 1
+                    self.count += 1
+                except sqlite3.Error as e:
+                    log_event(logging.ERROR, "index_failed", f"[!] Error indexing {item[0]}: {str(e)[:100]}",
+                              url=item[0], error=str(e)[:200])
+            if pending and (item is None or pending >= batch_size
+                            or self.queue.empty() and time.time() - last_commit >= SEARCH_SETTINGS["commit_interval"]):
+                conn.commit()
+                record_stat("search_index_commits")
+                pending = 0
+                last_commit = time.time()
+            if item is None:
+                break
+        # Merge the index segments written batch by batch so queries stay fast
+        conn.execute("INSERT INTO pages (pages) VALUES ('optimize')")
+        conn.commit()
+        conn.close()
+        print(f"[✓] Indexed {self.count} pages for search in: {self.path}")
+
+search_writer = None
+
+def start_search_index(folder):
+    global search_writer
+    close_search_index()
+    if SEARCH_SETTINGS["enabled"]:
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, SEARCH_SETTINGS["index_file"])
+        search_writer = SearchIndexWriter(path)
+        print(f"[+] Full-text search index: {path}")
+
+def close_search_index():
+    global search_writer
+    writer, search_writer = search_writer, None
+    if writer:
+        writer.close()
+
+def index_record(record, text):
+    """Queue an extracted record (and its page text) for the search index"""
+    writer = search_writer
+    if not writer or not record.get("url"):
+        return
+    headings = [h for key in ("h1_headings", "h2_headings", "h3_headings") for h in record.get(key) or []]
+    writer.add(record["url"], datetime.now(timezone.utc).isoformat(timespec="seconds"),
+               record.get("title") or "", "\n".join(headings), "\n".join(record.get("paragraphs") or []),
+               (text or "")[:SEARCH_SETTINGS["max_text_chars"]])
+    record_stat("search_index_documents")
+
+def fts_query(query):
+    # Plain words become quoted terms (prefix-matched when ending in *), so punctuation
+    # in user input can't break the FTS5 query syntax
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_index(path, query, limit=10):
+    """Return the best matches for query as dicts with url, crawled_at, title, snippet and score"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        weights = ", ".join(str(w) for w in SEARCH_SETTINGS["weights"])
+        sql = (f"SELECT d.url, d.crawled_at, pages.title, snippet(pages, -1, '[', ']', '...', 16), "
+               f"bm25(pages, {weights}) AS score FROM pages JOIN documents d ON d.id = pages.rowid "
+               f"WHERE pages MATCH ? ORDER BY score LIMIT ?")
+        try:
+            rows = conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5 syntax (AND/OR/NEAR, "phrases", column:term), search for the words instead
+            rows = conn.execute(sql, (fts_query(query), limit)).fetchall()
+    finally:
+        conn.close()
+    return [{"url": url, "crawled_at": crawled_at, "title": title, "snippet": snippet, "score": score}
+            for url, crawled_at, title, snippet, score in rows]
+
+def find_search_indexes(path):
+    if os.path.isfile(path):
+        return [path]
+    return sorted(glob.glob(os.path.join(path, "**", SEARCH_SETTINGS["index_file"]), recursive=True))
+
+def search_prompt():
+    path = input("Output folder or search index file: ").strip()
+    indexes = find_search_indexes(path) if path and os.path.exists(path) else []
+    if not indexes:
+        print("Error: No search index found")
+        return
+    print(f"[+] Searching {len(indexes)} index(es), empty query to quit")
+    while True:
+        query = input("Search: ").strip()
+        if not query:
+            break
+        start = time.perf_counter()
+        results = []
+        for index_path in indexes:
+            try:
+                results.extend(search_index(index_path, query))
+            except sqlite3.Error as e:
+                print(f"[!] Error searching {index_path}: {str(e)[:100]}")
+        # Indexes from shards or batch sites are merged by score (lower bm25 is better)
+        results.sort(key=lambda result: result["score"])
+        elapsed = (time.perf_counter() - start) * 1000
+        for rank, result in enumerate(results[:10], 1):
+            print(f"{rank}. {result['title'] or '(untitled)'} - {result['url']} (crawled {result['crawled_at']})")
+            print(f"   {result['snippet']}")
+        print(f"[✓] {len(results[:10])} result(s) in {elapsed:.1f} ms")
+
+# Extractor registry: each record field (or group of fields) is produced by its own
+# extractor function(soup, context) -> dict, so a crawl can run only the ones it needs
+EXTRACTORS = {}
+
+EXTRACTOR_PROFILES = {
+    "full": [
+        "artifacts", "title", "meta_description", "headings", "paragraphs", "images", "videos",
+        "streaming_links", "streaming_servers", "live_streams", "embedded_videos",
+        "javascript_videos", "navigation_items"
+    ],
+    "basic": ["title", "meta_description", "headings"],
+    "media": [
+        "title", "images", "videos", "streaming_links", "streaming_servers", "live_streams",
+        "embedded_videos", "javascript_videos"
+    ]
+}
+
+ACTIVE_EXTRACTORS = list(EXTRACTOR_PROFILES["full"])
+
+def register_extractor(name):
+    """Decorator registering a metadata extractor; custom extractors can be added the same way"""
+    def decorator(func):
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+def select_extractors(spec):
+    """Set the active extractors from a profile name or a comma-separated list of names"""
+    global ACTIVE_EXTRACTORS
+    spec = (spec or "full").strip()
+    if spec in EXTRACTOR_PROFILES:
+        names = EXTRACTOR_PROFILES[spec]
+    else:
+        names = [name.strip() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EXTRACTORS]
+    if unknown or not names:
+        print(f"[!] Unknown extractors {unknown}, using the full profile")
+        names = EXTRACTOR_PROFILES["full"]
+    ACTIVE_EXTRACTORS = list(names)
+    return ACTIVE_EXTRACTORS
+
+def ask_extractors():
+    profiles = "/".join(EXTRACTOR_PROFILES)
+    spec = input(f"Extractor profile ({profiles} or comma-separated extractor names, default: full): ").strip()
+    names = select_extractors(spec)
+    if names != EXTRACTOR_PROFILES["full"]:
+        print(f"[+] Running extractors: {', '.join(names)}")
+
+def page_text(soup, context):
+    # Full visible text, computed once per page and shared between extractors
+    if "page_text" not in context:
+        context["page_text"] = visible_text(soup)
+    return context["page_text"]
+
+def page_artifact_name(url):
+    # Base filename (without timestamp) used for a page's artifacts
+    parsed = urlparse(url)
+    page_name = parsed.path.strip('/').replace('/', '_') or "home"
+    return re.sub(r'[^\w\-_]', '_', page_name)
+
+@register_extractor("artifacts")
+def extract_artifacts(soup, context):
+    # Save both HTML source code and text content
+    html_source = context["html_source"]
+    base_url = context["base_url"]
+    media_folder = context["media_folder"]
+    if not html_source:
+        return {}
+    try:
+        # Use the media_folder as the base folder for all content
+        base_folder = media_folder if media_folder else os.path.join("output", generate_filename(base_url))
+        os.makedirs(base_folder, exist_ok=True)
+        
+        # Create subfolders for different types of content
+        source_folder = os.path.join(base_folder, "source")
+        os.makedirs(source_folder, exist_ok=True)
+        os.makedirs(os.path.join(source_folder, "html"), exist_ok=True)
+        os.makedirs(os.path.join(source_folder, "js"), exist_ok=True)
+        os.makedirs(os.path.join(source_folder, "css"), exist_ok=True)
+        text_folder = os.path.join(base_folder, "text")
+        os.makedirs(text_folder, exist_ok=True)
+        
+        # Generate base filename without timestamp for cleaner structure
+        base_filename = page_artifact_name(base_url)
+        
+        # Save full HTML source code
+        html_file_path = write_artifact(os.path.join(source_folder, "html", f"{base_filename}.html"), html_source)
+        log_event(logging.DEBUG, "artifact_saved", f"[✓] Saved HTML source code to: {html_file_path}",
+                  url=base_url, path=html_file_path)
+        
+        # Extract and save JavaScript code
+        script_count = 0
+        for script in soup.find_all("script"):
+            if script.string:  # Only save scripts with content
+                script_count += 1
+                js_file_path = os.path.join(source_folder, "js", f"{base_filename}_script_{script_count}.js")
+                write_artifact(js_file_path, str(script.string))
+        if script_count > 0:
+            log_event(logging.DEBUG, "artifact_saved", f"[✓] Saved {script_count} JavaScript files",
+                      url=base_url, scripts=script_count)
             
-            # Extract headings but filter out very long ones (likely misused as content)
+        # Extract and save CSS code
+        style_count = 0
+        for style in soup.find_all("style"):
+            if style.string:  # Only save styles with content
+                style_count += 1
+                css_file_path = os.path.join(source_folder, "css", f"{base_filename}_style_{style_count}.css")
+                write_artifact(css_file_path, str(style.string))
+        
+        # Save external CSS links
+        for link in soup.find_all("link", rel="stylesheet"):
+            href = link.get("href")
+            if href:
+                style_count += 1
+                css_file_path = os.path.join(source_folder, "css", f"{base_filename}_external_{style_count}.css")
+                try:
+                    css_url = urljoin(base_url, href)
+                    css_response = fetch_page(css_url, timeout=10, stream=True)
+                    if css_response.status_code == 200:
+                        css_response._content = read_limited(css_response, css_url, CONTENT_LIMITS["text/css"], "text/css")
+                        write_artifact(css_file_path, css_response.text)
+                except:
+                    pass
+        if style_count > 0:
+            log_event(logging.DEBUG, "artifact_saved", f"[✓] Saved {style_count} CSS files", url=base_url, styles=style_count)
+        
+        # Extract and save text content
+        text_content = page_text(soup, context)
+        text_file_path = write_artifact(os.path.join(text_folder, f"{base_filename}.txt"), text_content)
+        log_event(logging.DEBUG, "artifact_saved", f"[✓] Saved text content to: {text_file_path}",
+                  url=base_url, path=text_file_path)
+        
+    except Exception as e:
+        log_event(logging.WARNING, "artifact_failed", f"[!] Error saving page content: {str(e)[:100]}",
+                  url=base_url, error=str(e)[:200])
+    return {}
+
+@register_extractor("title")
+def extract_title(soup, context):
+    return {"title": soup.title.string.strip() if soup.title and soup.title.string else ""}
+
+@register_extractor("meta_description")
+def extract_meta_description(soup, context):
+    meta_desc_tag = soup.find("meta", attrs={"name":"description"})
+    meta_desc = meta_desc_tag["content"].strip() if meta_desc_tag and meta_desc_tag.get("content") else ""
+    return {"meta_description": meta_desc}
+
+@register_extractor("headings")
+def extract_headings(soup, context):
+    # Extract headings but filter out very long ones (likely misused as content)
     h1_tags = []
     for h1 in soup.find_all("h1"):
         text = h1.get_text(strip=True)
@@ -337,18 +2905,45 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
         if text and len(text) <= 100:  # Shorter limit for h3
             h3_tags.append(text)
     
+    return {"h1_headings": h1_tags, "h2_headings": h2_tags, "h3_headings": h3_tags}
+
+@register_extractor("paragraphs")
+def extract_paragraphs(soup, context):
     # Get main content (first few paragraphs)
     paragraphs = []
     for p in soup.find_all("p")[:5]:  # First 5 paragraphs
         text = p.get_text(strip=True)
         if text and len(text) > 20:  # Only meaningful paragraphs
             paragraphs.append(text)
+    return {"paragraphs": paragraphs}
+
+def download_media_items(items, context, media_type):
+    """Download each item's URL when media downloads are on; records downloaded_path on the item"""
+    media_folder = context["media_folder"]
+    if not (context["download_media_flag"] and media_folder):
+        return []
+    prefetch_hosts(item["url"] for item in items)
+    downloaded = []
+    for item in items:
+        log_event(logging.DEBUG, "media_download", f"[+] Attempting to download {media_type}: {item['url']}",
+                  url=item["url"], media_type=media_type)
+        downloaded_path = download_media(item["url"], media_folder, media_type)
+        if downloaded_path:
+            item["downloaded_path"] = downloaded_path
+            downloaded.append(downloaded_path)
+            log_event(logging.INFO, "media_saved", f"[✓] {media_type.capitalize()} saved to: {downloaded_path}",
+                      url=item["url"], path=downloaded_path)
+    return downloaded
+
+@register_extractor("images")
+def extract_images(soup, context):
+    base_url = context["base_url"]
     
     # Get images with download option
     images = []
-    downloaded_images = []
-    print(f"[+] Found {len(soup.find_all('img'))} images on page")
-    for img in soup.find_all("img"):
+    img_tags = soup.find_all("img")
+    log_event(logging.DEBUG, "images_found", f"[+] Found {len(img_tags)} images on page", url=base_url, count=len(img_tags))
+    for img in img_tags:
         img_src = img.get("src")
         img_alt = img.get("alt", "").strip()
         
@@ -362,21 +2957,20 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
                 "height": img.get("height", "")
             }
             images.append(img_info)
-            
-            # Download image if requested
-            if download_media_flag and media_folder:
-                print(f"[+] Attempting to download image: {img_url}")
-                downloaded_path = download_media(img_url, media_folder, "image")
-                if downloaded_path:
-                    img_info["downloaded_path"] = downloaded_path
-                    downloaded_images.append(downloaded_path)
-                    print(f"[✓] Image saved to: {downloaded_path}")
+    
+    # Download images if requested
+    return {"images": images, "downloaded_images": download_media_items(images, context, "image")}
+
+@register_extractor("videos")
+def extract_videos(soup, context):
+    base_url = context["base_url"]
     
     # Get videos with download option
     videos = []
-    downloaded_videos = []
-    print(f"[+] Found {len(soup.find_all('video'))} videos on page")
-    for video in soup.find_all("video"):
+    video_tags = soup.find_all("video")
+    log_event(logging.DEBUG, "videos_found", f"[+] Found {len(video_tags)} videos on page",
+              url=base_url, count=len(video_tags))
+    for video in video_tags:
         video_src = video.get("src")
         if not video_src:
             # Check for source tags inside video
@@ -395,24 +2989,18 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
                 "autoplay": video.get("autoplay") is not None
             }
             videos.append(video_info)
-            
-            # Download video if requested
-            if download_media_flag and media_folder:
-                print(f"[+] Attempting to download video: {video_url}")
-                downloaded_path = download_media(video_url, media_folder, "video")
-                if downloaded_path:
-                    video_info["downloaded_path"] = downloaded_path
-                    downloaded_videos.append(downloaded_path)
-                    print(f"[✓] Video saved to: {downloaded_path}")
-    
-    # Detect streaming links and embedded players
-    streaming_links = []
     
-    # 1. Look for iframe sources (embedded players)
+    # Download videos if requested
+    return {"videos": videos, "downloaded_videos": download_media_items(videos, context, "video")}
+
+@register_extractor("streaming_links")
+def extract_streaming_links(soup, context):
+    # Look for iframe sources (embedded players)
+    streaming_links = []
     for iframe in soup.find_all("iframe"):
         iframe_src = iframe.get("src")
         if iframe_src:
-            iframe_url = urljoin(base_url, iframe_src)
+            iframe_url = urljoin(context["base_url"], iframe_src)
             streaming_links.append({
                 "type": "iframe_embed",
                 "url": iframe_url,
@@ -420,22 +3008,25 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
                 "height": iframe.get("height", ""),
                 "title": iframe.get("title", "")
             })
-    
-    # 2. Look for streaming server links (Server 1, 2, 3, etc.)
+    return {"streaming_links": streaming_links}
+
+# Detect server links by text patterns
+SERVER_PATTERNS = [
+    r'server\s*\d+', r'watch\s*link\s*\d+', r'video\s*\d+',
+    r'stream\s*\d+', r'player\s*\d+', r'link\s*\d+',
+    r'hd\s*link', r'live\s*stream', r'watch\s*now',
+    r'play\s*now', r'stream\s*now'
+]
+
+@register_extractor("streaming_servers")
+def extract_streaming_servers(soup, context):
+    # Look for streaming server links (Server 1, 2, 3, etc.)
     streaming_servers = []
     for link in soup.find_all("a", href=True):
         link_text = link.get_text(strip=True).lower()
-        link_url = urljoin(base_url, link["href"])
-        
-        # Detect server links by text patterns
-        server_patterns = [
-            r'server\s*\d+', r'watch\s*link\s*\d+', r'video\s*\d+',
-            r'stream\s*\d+', r'player\s*\d+', r'link\s*\d+',
-            r'hd\s*link', r'live\s*stream', r'watch\s*now',
-            r'play\s*now', r'stream\s*now'
-        ]
+        link_url = urljoin(context["base_url"], link["href"])
         
-        for pattern in server_patterns:
+        for pattern in SERVER_PATTERNS:
             if re.search(pattern, link_text):
                 streaming_servers.append({
                     "text": link.get_text(strip=True),
@@ -443,60 +3034,71 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
                     "type": "streaming_server"
                 })
                 break
-    
-    # 3. Extract streaming URLs from JavaScript and text content
+    return {"streaming_servers": streaming_servers}
+
+# Look for common streaming formats in page source
+STREAM_PATTERNS = {
+    "m3u8": r'https?://[^\s"\'<>]+\.m3u8[^\s"\'<>]*',
+    "mpd": r'https?://[^\s"\'<>]+\.mpd[^\s"\'<>]*', 
+    "rtmp": r'rtmp://[^\s"\'<>]+',
+    "hls": r'https?://[^\s"\'<>]+/playlist\.m3u8[^\s"\'<>]*',
+    "dash": r'https?://[^\s"\'<>]+manifest\.mpd[^\s"\'<>]*'
+}
+
+@register_extractor("live_streams")
+def extract_live_streams(soup, context):
+    # Extract streaming URLs from JavaScript and text content
     live_streams = []
     page_text = str(soup)
     
-    # Look for common streaming formats in page source
-    stream_patterns = {
-        "m3u8": r'https?://[^\s"\'<>]+\.m3u8[^\s"\'<>]*',
-        "mpd": r'https?://[^\s"\'<>]+\.mpd[^\s"\'<>]*', 
-        "rtmp": r'rtmp://[^\s"\'<>]+',
-        "hls": r'https?://[^\s"\'<>]+/playlist\.m3u8[^\s"\'<>]*',
-        "dash": r'https?://[^\s"\'<>]+manifest\.mpd[^\s"\'<>]*'
-    }
-    
-    for stream_type, pattern in stream_patterns.items():
+    for stream_type, pattern in STREAM_PATTERNS.items():
         matches = re.findall(pattern, page_text, re.IGNORECASE)
         for match in set(matches):  # Remove duplicates
             live_streams.append({
                 "type": stream_type,
                 "url": match.strip('"\'<>')
             })
-    
-    # 4. Look for embedded video URLs in data attributes
+    return {"live_streams": live_streams}
+
+@register_extractor("embedded_videos")
+def extract_embedded_videos(soup, context):
+    # Look for embedded video URLs in data attributes
     embedded_videos = []
     for element in soup.find_all(attrs={"data-src": True}):
         data_src = element.get("data-src")
         if data_src and any(ext in data_src.lower() for ext in ['.mp4', '.webm', '.ogg', '.m3u8', '.mpd']):
             embedded_videos.append({
                 "type": "data_src_video",
-                "url": urljoin(base_url, data_src),
+                "url": urljoin(context["base_url"], data_src),
                 "element": element.name
             })
-    
-    # 5. Look for JavaScript variables containing video URLs
+    return {"embedded_videos": embedded_videos}
+
+# Common JavaScript variable patterns holding video URLs
+JS_VIDEO_PATTERNS = [
+    r'videoUrl\s*[=:]\s*["\']([^"\']+)["\']',
+    r'streamUrl\s*[=:]\s*["\']([^"\']+)["\']',
+    r'playerUrl\s*[=:]\s*["\']([^"\']+)["\']',
+    r'src\s*[=:]\s*["\']([^"\']+\.(?:mp4|m3u8|mpd))["\']'
+]
+
+@register_extractor("javascript_videos")
+def extract_javascript_videos(soup, context):
+    # Look for JavaScript variables containing video URLs
     js_video_urls = []
-    script_tags = soup.find_all("script")
-    for script in script_tags:
+    for script in soup.find_all("script"):
         if script.string:
-            # Look for common variable patterns
-            js_patterns = [
-                r'videoUrl\s*[=:]\s*["\']([^"\']+)["\']',
-                r'streamUrl\s*[=:]\s*["\']([^"\']+)["\']',
-                r'playerUrl\s*[=:]\s*["\']([^"\']+)["\']',
-                r'src\s*[=:]\s*["\']([^"\']+\.(?:mp4|m3u8|mpd))["\']'
-            ]
-            
-            for pattern in js_patterns:
+            for pattern in JS_VIDEO_PATTERNS:
                 matches = re.findall(pattern, script.string, re.IGNORECASE)
                 for match in matches:
                     js_video_urls.append({
                         "type": "javascript_video",
-                        "url": urljoin(base_url, match)
+                        "url": urljoin(context["base_url"], match)
                     })
-    
+    return {"javascript_videos": js_video_urls}
+
+@register_extractor("navigation_items")
+def extract_navigation_items(soup, context):
     # Get navigation/menu items
     nav_items = []
     for nav in soup.find_all(['nav', 'ul']):
@@ -504,26 +3106,252 @@ def extract_metadata(soup, base_url, html_source="", media_folder=None, download
             link_text = link.get_text(strip=True)
             if link_text and len(link_text) <= 50:  # Short navigation items
                 nav_items.append(link_text)
-    
+    return {"navigation_items": list(set(nav_items))[:10]}  # Unique nav items, max 10
+
+def extract_metadata(soup, base_url, html_source="", media_folder=None, download_media_flag=False, extractors=None,
+                     text=None):
+    """Run the selected extractors (ACTIVE_EXTRACTORS by default) and merge their fields"""
+    context = {
+        "base_url": base_url,
+        "html_source": html_source,
+        "media_folder": media_folder,
+        "download_media_flag": download_media_flag
+    }
+    if text is not None:
+        context["page_text"] = text  # Already extracted for the near-duplicate check
+    metadata = {}
+    for name in extractors or ACTIVE_EXTRACTORS:
+        metadata.update(EXTRACTORS[name](soup, context))
+    # Keep download lists at the end of the record, as before the registry existed
+    for key in ("downloaded_images", "downloaded_videos"):
+        if key in metadata:
+            metadata[key] = metadata.pop(key)
+    if SEARCH_SETTINGS["enabled"]:
+        metadata[SEARCH_TEXT_KEY] = page_text(soup, context)
+    return metadata
+
+# In-browser extraction for crawl_dynamic: one script collects the raw DOM facts each
+# extractor needs, so rendered pages aren't serialized and re-parsed in Python. The
+# strings mirror BeautifulSoup's get_text(strip=True), which skips script/style text.
+BROWSER_EXTRACT_SCRIPT = r"""
+({streamPatterns, jsVideoPatterns}) => {
+    const RAW_TEXT = new Set(["script", "style", "template"]);
+    const isRaw = (node) => node.parentElement && RAW_TEXT.has(node.parentElement.localName);
+    const strings = (root) => {
+        const out = [];
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            const text = node.data.trim();
+            if (text && !isRaw(node)) out.push(text);
+        }
+        return out;
+    };
+    const textOf = (el) => strings(el).join("");
+    const attr = (el, name) => el.getAttribute(name);
+    const all = (selector, root = document) => Array.from(root.querySelectorAll(selector));
+
+    const title = document.querySelector("title");
+    const meta = document.querySelector('meta[name="description"]');
+    const canonical = document.querySelector('link[rel~="canonical"][href]');
+
+    // Stream URLs are matched per attribute value / text node, escaped the way the HTML
+    // serializer would, which is where the regexes stop matching anyway
+    const escape = (s) => s.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+    const pieces = [];
+    const walker = document.createTreeWalker(
+        document, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT | NodeFilter.SHOW_COMMENT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        if (node.nodeType === Node.ELEMENT_NODE) {
+            for (const a of node.attributes) pieces.push(escape(a.value));
+        } else if (node.nodeType === Node.TEXT_NODE) {
+            pieces.push(isRaw(node) ? node.data : escape(node.data));
+        } else {
+            pieces.push(node.data + "-->");
+        }
+    }
+    const streams = {};
+    for (const [type, pattern] of Object.entries(streamPatterns)) {
+        const re = new RegExp(pattern, "gi");
+        streams[type] = pieces.flatMap((piece) => piece.match(re) || []);
+    }
+
+    const scriptMatches = [];
+    for (const script of all("script")) {
+        if (script.childNodes.length !== 1 || script.firstChild.nodeType !== Node.TEXT_NODE) continue;
+        for (const pattern of jsVideoPatterns) {
+            for (const m of script.textContent.matchAll(new RegExp(pattern, "gi"))) scriptMatches.push(m[1]);
+        }
+    }
+
+    return {
+        title: title && title.childNodes.length && !title.children.length ? title.textContent : null,
+        meta_description: meta ? attr(meta, "content") : null,
+        canonical: canonical ? attr(canonical, "href") : null,
+        text: strings(document).join("\n"),
+        headings: Object.fromEntries(["h1", "h2", "h3"].map((h) => [h, all(h).map(textOf)])),
+        paragraphs: all("p").slice(0, 5).map(textOf),
+        images: all("img").map((img) => ({
+            src: attr(img, "src"), alt: attr(img, "alt"), width: attr(img, "width"), height: attr(img, "height")
+        })),
+        videos: all("video").map((video) => {
+            const source = video.querySelector("source");
+            return {
+                src: attr(video, "src") || (source && attr(source, "src")), width: attr(video, "width"),
+                height: attr(video, "height"), controls: video.hasAttribute("controls"),
+                autoplay: video.hasAttribute("autoplay")
+            };
+        }),
+        iframes: all("iframe").map((f) => ({
+            src: attr(f, "src"), width: attr(f, "width"), height: attr(f, "height"), title: attr(f, "title")
+        })),
+        links: all("a[href]").map((a) => ({href: attr(a, "href"), text: textOf(a)})),
+        navigation: all("nav, ul").flatMap((nav) => all("a", nav).map(textOf)),
+        data_src: all("[data-src]").map((el) => ({url: attr(el, "data-src"), element: el.localName})),
+        streams: streams,
+        script_videos: scriptMatches
+    };
+}
+"""
+
+# Extractors with an in-page equivalent: function(dom, context) -> the same fields as
+# the BeautifulSoup extractor of that name
+BROWSER_EXTRACTORS = {}
+
+def register_browser_extractor(name):
+    def decorator(func):
+        BROWSER_EXTRACTORS[name] = func
+        return func
+    return decorator
+
+def evaluate_page(page):
+    """Run the extraction script in a rendered page and return its DOM facts"""
+    return page.evaluate(BROWSER_EXTRACT_SCRIPT, {
+        "streamPatterns": STREAM_PATTERNS, "jsVideoPatterns": JS_VIDEO_PATTERNS
+    })
+
+@register_browser_extractor("title")
+def browser_title(dom, context):
+    return {"title": dom["title"].strip() if dom["title"] else ""}
+
+@register_browser_extractor("meta_description")
+def browser_meta_description(dom, context):
+    return {"meta_description": dom["meta_description"].strip() if dom["meta_description"] else ""}
+
+@register_browser_extractor("headings")
+def browser_headings(dom, context):
+    headings = dom["headings"]
     return {
-        "title": title,
-        "meta_description": meta_desc,
-        "h1_headings": h1_tags,
-        "h2_headings": h2_tags, 
-        "h3_headings": h3_tags,
-        "paragraphs": paragraphs,
-        "images": images,
-        "videos": videos,
-        "streaming_links": streaming_links,
-        "streaming_servers": streaming_servers,
-        "live_streams": live_streams,
-        "embedded_videos": embedded_videos,
-        "javascript_videos": js_video_urls,
-        "navigation_items": list(set(nav_items))[:10],  # Unique nav items, max 10
-        "downloaded_images": downloaded_images,
-        "downloaded_videos": downloaded_videos
+        "h1_headings": [text for text in headings["h1"] if text and len(text) <= 200],
+        "h2_headings": [text for text in headings["h2"] if text and len(text) <= 150],
+        "h3_headings": [text for text in headings["h3"] if text and len(text) <= 100]
     }
 
+@register_browser_extractor("paragraphs")
+def browser_paragraphs(dom, context):
+    return {"paragraphs": [text for text in dom["paragraphs"] if text and len(text) > 20]}
+
+@register_browser_extractor("images")
+def browser_images(dom, context):
+    log_event(logging.DEBUG, "images_found", f"[+] Found {len(dom['images'])} images on page",
+              url=context["base_url"], count=len(dom["images"]))
+    images = [{
+        "url": urljoin(context["base_url"], img["src"]),
+        "alt": (img["alt"] or "").strip(),
+        "width": img["width"] or "",
+        "height": img["height"] or ""
+    } for img in dom["images"] if img["src"]]
+    return {"images": images, "downloaded_images": download_media_items(images, context, "image")}
+
+@register_browser_extractor("videos")
+def browser_videos(dom, context):
+    log_event(logging.DEBUG, "videos_found", f"[+] Found {len(dom['videos'])} videos on page",
+              url=context["base_url"], count=len(dom["videos"]))
+    videos = [{
+        "url": urljoin(context["base_url"], video["src"]),
+        "width": video["width"] or "",
+        "height": video["height"] or "",
+        "controls": video["controls"],
+        "autoplay": video["autoplay"]
+    } for video in dom["videos"] if video["src"]]
+    return {"videos": videos, "downloaded_videos": download_media_items(videos, context, "video")}
+
+@register_browser_extractor("streaming_links")
+def browser_streaming_links(dom, context):
+    return {"streaming_links": [{
+        "type": "iframe_embed",
+        "url": urljoin(context["base_url"], iframe["src"]),
+        "width": iframe["width"] or "",
+        "height": iframe["height"] or "",
+        "title": iframe["title"] or ""
+    } for iframe in dom["iframes"] if iframe["src"]]}
+
+@register_browser_extractor("streaming_servers")
+def browser_streaming_servers(dom, context):
+    streaming_servers = []
+    for link in dom["links"]:
+        if any(re.search(pattern, link["text"].lower()) for pattern in SERVER_PATTERNS):
+            streaming_servers.append({
+                "text": link["text"],
+                "url": urljoin(context["base_url"], link["href"]),
+                "type": "streaming_server"
+            })
+    return {"streaming_servers": streaming_servers}
+
+@register_browser_extractor("live_streams")
+def browser_live_streams(dom, context):
+    return {"live_streams": [
+        {"type": stream_type, "url": match.strip('"\'<>')}
+        for stream_type, matches in dom["streams"].items() for match in set(matches)
+    ]}
+
+@register_browser_extractor("embedded_videos")
+def browser_embedded_videos(dom, context):
+    return {"embedded_videos": [{
+        "type": "data_src_video",
+        "url": urljoin(context["base_url"], element["url"]),
+        "element": element["element"]
+    } for element in dom["data_src"]
+        if element["url"] and any(ext in element["url"].lower() for ext in ['.mp4', '.webm', '.ogg', '.m3u8', '.mpd'])]}
+
+@register_browser_extractor("javascript_videos")
+def browser_javascript_videos(dom, context):
+    return {"javascript_videos": [
+        {"type": "javascript_video", "url": urljoin(context["base_url"], match)} for match in dom["script_videos"]
+    ]}
+
+@register_browser_extractor("navigation_items")
+def browser_navigation_items(dom, context):
+    nav_items = [text for text in dom["navigation"] if text and len(text) <= 50]
+    return {"navigation_items": list(set(nav_items))[:10]}
+
+def browser_needs_html(extractors=None):
+    # The serialized page is only needed for WARC snapshots and extractors without an in-page version
+    return WARC_SETTINGS["enabled"] or any(name not in BROWSER_EXTRACTORS for name in extractors or ACTIVE_EXTRACTORS)
+
+def extract_browser_metadata(dom, base_url, html_source="", media_folder=None, download_media_flag=False, extractors=None):
+    """extract_metadata for a rendered page, working from evaluate_page() output"""
+    context = {
+        "base_url": base_url,
+        "html_source": html_source,
+        "media_folder": media_folder,
+        "download_media_flag": download_media_flag,
+        "page_text": dom["text"]
+    }
+    metadata = {}
+    for name in extractors or ACTIVE_EXTRACTORS:
+        if name in BROWSER_EXTRACTORS:
+            metadata.update(BROWSER_EXTRACTORS[name](dom, context))
+        elif html_source:
+            if "soup" not in context:
+                context["soup"] = BeautifulSoup(html_source, "html.parser")
+            metadata.update(EXTRACTORS[name](context["soup"], context))
+    for key in ("downloaded_images", "downloaded_videos"):
+        if key in metadata:
+            metadata[key] = metadata.pop(key)
+    if SEARCH_SETTINGS["enabled"]:
+        metadata[SEARCH_TEXT_KEY] = dom["text"]
+    return metadata
+
 def process_sitemap_url(url_data):
     """Process single sitemap URL for parallel processing"""
     url, robot_parser, media_folder, download_media_flag = url_data
@@ -538,16 +3366,16 @@ def process_sitemap_url(url_data):
     if not is_valid(norm_url, urlparse(url).netloc) or not can_fetch(robot_parser, norm_url):
         return None
     
-    # Skip non-HTML files
-    if any(ext in norm_url.lower() for ext in ['.png', '.jpg', '.jpeg', '.gif', '.pdf', '.css', '.js', '.xml']):
+    # Skip non-HTML files by their path extension (headers are checked again when fetching)
+    if has_resource_extension(norm_url):
         with lock:
             visited_urls.add(norm_url)
         return {"url": norm_url, "type": "resource", "source": "sitemap"}
     
     # Extract full content for HTML pages
     try:
-        print(f"[+] Extracting content from: {norm_url}")
-        page_response = requests.get(norm_url, timeout=20, headers={
+        log_event(logging.DEBUG, "fetch_start", f"[+] Extracting content from: {norm_url}", url=norm_url, source="sitemap")
+        page_response = fetch_html(norm_url, timeout=20, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
@@ -555,50 +3383,94 @@ def process_sitemap_url(url_data):
         }, verify=False)
         
         if page_response.status_code == 200:
-            page_soup = BeautifulSoup(page_response.text, "html.parser")
-            metadata = extract_metadata(page_soup, norm_url, page_response.text, media_folder, download_media_flag)
-            
+            page_soup = parse_html(page_response.content, page_response.encoding)
+            canonical_url = resolve_canonical(page_soup, norm_url, urlparse(norm_url).netloc)
+            if not canonical_url:
+                return None
+            text = dedup_text(page_soup)
+            duplicate = duplicate_entry(norm_url, "sitemap", text)
             with lock:
                 visited_urls.add(norm_url)
+            if duplicate:
+                return duplicate
+            metadata = extract_metadata(page_soup, norm_url, page_source(page_response), media_folder, download_media_flag,
+                                        text=text)
             
             data_entry = {"url": norm_url, "source": "sitemap"}
+            if canonical_url != norm_url:
+                data_entry["canonical_url"] = canonical_url
             data_entry.update(metadata)
-            print(f"[✓] Content extracted from: {norm_url}")
+            attach_stream_probes(data_entry)
+            log_event(logging.INFO, "page_saved", f"[✓] Content extracted from: {norm_url}", url=norm_url, source="sitemap")
             return data_entry
         else:
-            print(f"[!] Failed to load {norm_url}: HTTP {page_response.status_code}")
+            log_event(logging.WARNING, "fetch_failed", f"[!] Failed to load {norm_url}: HTTP {page_response.status_code}",
+                      url=norm_url, status=page_response.status_code)
+            if page_response.status_code in RETRY_POLICY["retry_statuses"]:
+                record_dead_letter(norm_url, "sitemap", f"HTTP {page_response.status_code}")
             with lock:
                 visited_urls.add(norm_url)
             return {"url": norm_url, "source": "sitemap", "error": f"HTTP {page_response.status_code}"}
             
+    except SkippedContentError as e:
+        log_event(logging.INFO, "fetch_skipped",
+                  f"[!] Skipping {e.reason} content ({e.content_type or 'unknown type'}): {norm_url}",
+                  url=norm_url, reason=e.reason, content_type=e.content_type)
+        with lock:
+            visited_urls.add(norm_url)
+        return {"url": norm_url, "type": "resource", "source": "sitemap", "content_type": e.content_type}
     except Exception as e:
-        print(f"[!] Error extracting content from {norm_url}: {str(e)[:100]}")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Error extracting content from {norm_url}: {str(e)[:100]}",
+                  url=norm_url, error=str(e)[:200])
+        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            record_dead_letter(norm_url, "sitemap", e)
         with lock:
             visited_urls.add(norm_url)
         return {"url": norm_url, "source": "sitemap", "error": str(e)[:100]}
 
+def fetch_sitemap_locs(base_url):
+    """Fetch /sitemap.xml and return its <loc> URLs, recording lastmod/changefreq; None if unavailable"""
+    sitemap_url = urljoin(base_url, "/sitemap.xml")
+    response = fetch_page(sitemap_url, timeout=10, headers={
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept": "application/xml,text/xml,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Connection": "keep-alive"
+    }, verify=False)
+    if response.status_code != 200:
+        print(f"[!] sitemap.xml returned {response.status_code} - not available")
+        return None
+    soup = BeautifulSoup(response.content, "xml")
+    locs = [loc.text for loc in soup.find_all("loc")]
+    for entry in soup.find_all("url"):
+        if entry.loc:
+            note_sitemap_entry(normalize_url(entry.loc.text.strip()),
+                               entry.lastmod.text if entry.lastmod else None,
+                               entry.changefreq.text if entry.changefreq else None)
+    return locs
+
 def extract_sitemap(base_url, writer, file, robot_parser, json_path, media_folder=None, download_media_flag=False):
-    print("[+] Checking sitemap.xml...")
+    log_event(logging.INFO, "sitemap_check", "[+] Checking sitemap.xml...", url=base_url)
     urls = []
-    sitemap_url = urljoin(base_url, "/sitemap.xml")
     try:
-        response = requests.get(sitemap_url, timeout=10, headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "application/xml,text/xml,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive"
-        }, verify=False)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, "xml")
-            locs = [loc.text for loc in soup.find_all("loc")]
-            print(f"[+] Found {len(locs)} URLs in sitemap, extracting content in parallel...")
+        locs = fetch_sitemap_locs(base_url)
+        if locs is not None:
+            log_event(logging.INFO, "sitemap_found",
+                      f"[+] Found {len(locs)} URLs in sitemap, extracting content in parallel...",
+                      urls=len(locs))
+            if RECRAWL_SETTINGS["enabled"]:
+                locs = [loc for loc in locs if recrawl_due(normalize_url(loc.strip()))]
+                log_event(logging.INFO, "sitemap_due", f"[+] {len(locs)} sitemap URLs are new or due for recrawl",
+                          urls=len(locs))
+            if not locs:
+                return urls
+            prefetch_hosts(locs)
             
             # Prepare data for parallel processing
             url_data_list = [(url, robot_parser, media_folder, download_media_flag) for url in locs]
             
             # Process URLs in parallel with controlled concurrency
-            max_workers = min(10, len(locs))  # Max 10 parallel workers
+            max_workers = min(worker_pool_size(10), len(locs))  # Max 10 parallel workers unless adaptive
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
                 future_to_url = {executor.submit(process_sitemap_url, url_data): url_data[0] 
                                for url_data in url_data_list}
@@ -610,15 +3482,194 @@ def extract_sitemap(base_url, writer, file, robot_parser, json_path, media_folde
                         append_json(json_path, result)
                         urls.append(result["url"])
                         
-            print(f"[✓] {len(urls)} URLs processed from sitemap in parallel.")
-        else:
-            print(f"[!] sitemap.xml returned {response.status_code} - not available")
+            log_event(logging.INFO, "sitemap_done", f"[✓] {len(urls)} URLs processed from sitemap in parallel.",
+                      urls=len(urls))
     except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-        print("[!] Connection issue with sitemap.xml (site may block or not have sitemap)")
+        log_event(logging.WARNING, "sitemap_failed",
+                  "[!] Connection issue with sitemap.xml (site may block or not have sitemap)",
+                  url=base_url, error="connection")
     except Exception as e:
-        print(f"[!] Error fetching sitemap: {str(e)[:100]}")
+        log_event(logging.WARNING, "sitemap_failed", f"[!] Error fetching sitemap: {str(e)[:100]}",
+                  url=base_url, error=str(e)[:200])
     return urls
 
+# Discovery-only crawling: URL inventory and link graph without building a parse tree,
+# running extractors or saving artifacts
+DISCOVERY_SETTINGS = {
+    "anchor_text": False,  # Add each link's anchor text to the edge list
+    "feed_size": 65536  # Bytes fed to the pull parser at a time
+}
+
+A_TAG_RE = re.compile(rb'<a\b([^>]*)>', re.IGNORECASE)
+HREF_ATTR_RE = re.compile(rb'\shref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+A_END_RE = re.compile(rb'</a\s*>', re.IGNORECASE)
+TAG_RE = re.compile(rb'<[^>]*>')
+
+def iter_hrefs_lxml(body, encoding, anchor_text=False):
+    parser = etree.HTMLPullParser(events=("end",), tag="a", encoding=encoding)
+    size = DISCOVERY_SETTINGS["feed_size"]
+    for start in range(0, len(body), size):
+        parser.feed(body[start:start + size])
+        for _, element in parser.read_events():
+            href = element.get("href")
+            if href is not None:
+                yield href, " ".join("".join(element.itertext()).split()) if anchor_text else None
+    parser.close()
+    for _, element in parser.read_events():
+        href = element.get("href")
+        if href is not None:
+            yield href, " ".join("".join(element.itertext()).split()) if anchor_text else None
+
+def iter_hrefs_regex(body, encoding, anchor_text=False):
+    # Fallback tokenizer when lxml is unavailable: scans <a ...> tags in the raw bytes
+    for match in A_TAG_RE.finditer(body):
+        attr = HREF_ATTR_RE.search(b" " + match.group(1))
+        if not attr:
+            continue
+        href = html.unescape(next(g for g in attr.groups() if g is not None).decode(encoding, errors="replace"))
+        text = None
+        if anchor_text:
+            end = A_END_RE.search(body, match.end())
+            inner = body[match.end():end.start()] if end else b""
+            text = " ".join(html.unescape(TAG_RE.sub(b" ", inner).decode(encoding, errors="replace")).split())
+        yield href, text
+
+def extract_links_fast(body, page_url, encoding="utf-8", anchor_text=False):
+    """Return [(normalized absolute URL, anchor text or None)] for every <a href> in raw HTML bytes"""
+    iterator = iter_hrefs_lxml if etree is not None else iter_hrefs_regex
+    links = []
+    for href, text in iterator(body, encoding or "utf-8", anchor_text):
+        href = href.strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:", "data:")):
+            continue
+        links.append((normalize_url(urljoin(page_url, href)), text))
+    return links
+
+def discover_page(url, robot_parser, anchor_text=False):
+    """Fetch one page for discovery; returns its links, [] for non-HTML URLs or None on failure"""
+    if not can_fetch(robot_parser, url):
+        return None
+    try:
+        res = fetch_html(url, timeout=20, headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5",
+            "Connection": "keep-alive"
+        }, allow_redirects=True, verify=False)
+        if res.status_code != 200:
+            if res.status_code in RETRY_POLICY["retry_statuses"]:
+                record_dead_letter(url, "discovery", f"HTTP {res.status_code}")
+            return None
+        return extract_links_fast(res.content, url, res.encoding, anchor_text)
+    except SkippedContentError:
+        return []
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        record_dead_letter(url, "discovery", e)
+    except Exception as e:
+        log_event(logging.WARNING, "fetch_failed", f"[!] Discovery error at {url}: {str(e)[:100]}",
+                  url=url, error=str(e)[:200])
+    return None
+
+def crawl_discovery(start_url, base_domain, writer, file, edge_writer, robot_parser,
+                    max_workers=10, seeds=(), anchor_text=False):
+    """Breadth-first discovery crawl writing every fetched URL to the CSV and every link to the edge list"""
+    pending = Frontier()
+    pending.push(normalize_url(start_url))
+    for seed in seeds:
+        seed = normalize_url(seed)
+        if is_valid(seed, base_domain):
+            pending.push(seed)
+    pool_size = worker_pool_size(max_workers)
+    pages = edges = 0
+    
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        running = {}
+        while len(pending) or running:
+            # Keep the pool busy instead of waiting for whole batches
+            while len(pending) and len(running) < pool_size * 2:
+                url = pending.pop()
+                running[executor.submit(discover_page, url, robot_parser, anchor_text)] = url
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = running.pop(future)
+                links = future.result()
+                if links is None:
+                    continue
+                write_url(writer, file, url)
+                pages += 1
+                new_links = []
+                for target, text in links:
+                    if urlparse(target).scheme not in ("http", "https"):
+                        continue
+                    edge_writer.writerow([url, target, text] if anchor_text else [url, target])
+                    edges += 1
+                    if is_valid(target, base_domain) and not is_crawler_trap(target):
+                        new_links.append(target)
+                prefetch_hosts(new_links)
+                for target in new_links:
+                    pending.push(target)
+                if pages % 100 == 0:
+                    log_event(logging.INFO, "discovery_progress",
+                              f"[+] Fetched {pages} pages, {edges} links, {len(pending)} URLs queued",
+                              pages=pages, edges=edges, queued=len(pending))
+    pending.report("Discovery")
+    pending.close()
+    return pages, edges, pending.stats["enqueued"]
+
+def discovery_main():
+    print("=== URL Discovery (link graph only) ===")
+    base_url = input("URL: ").strip()
+    if not base_url:
+        print("Error: No URL provided")
+        return
+    if not urlparse(base_url).scheme:
+        base_url = "https://" + base_url
+    domain = urlparse(base_url).netloc
+    
+    workers_input = input("Number of parallel workers (1-50, default: 10): ").strip()
+    try:
+        max_workers = max(1, min(50, int(workers_input)))
+    except ValueError:
+        max_workers = 10
+    ask_adaptive_concurrency(max_workers)
+    anchor_input = input("Include anchor text in the edge list? (y/n, default: n): ").strip().lower()
+    anchor_text = anchor_input == 'y'
+    
+    site_folder = os.path.join("output", generate_filename(base_url, include_timestamp=False))
+    base_filename = generate_filename(base_url) + "_discovery"
+    reset_crawl_state()
+    start_dns_cache()
+    try:
+        robot_parser = init_robot_parser(base_url)
+        csv_file, writer, csv_path = init_csv_writer(base_filename, site_folder)
+        edge_header = ["source", "target", "anchor_text"] if anchor_text else ["source", "target"]
+        edge_file, edge_writer, edge_path = init_csv_writer(f"{base_filename}_edges", site_folder, edge_header)
+        start_event_log(site_folder)
+    
+        start_time = time.time()
+        try:
+            seeds = fetch_sitemap_locs(base_url) or []
+        except (requests.exceptions.RequestException, SkippedContentError):
+            seeds = []
+        print(f"[+] Starting discovery from {base_url} ({len(seeds)} sitemap URLs as extra seeds)...")
+        pages, edges, urls = crawl_discovery(base_url, domain, writer, csv_file, edge_writer, robot_parser,
+                                             max_workers, seeds, anchor_text)
+        elapsed = time.time() - start_time
+    
+        csv_file.close()
+        edge_file.close()
+        save_dead_letters(site_folder, base_filename)
+        flush_outputs()
+    finally:
+        stop_dns_cache()
+    print(f"\n[✓] Discovery finished in {elapsed:.2f} seconds ({pages / max(elapsed, 0.001):.1f} pages/s)")
+    print(f"    - Pages fetched: {pages}")
+    print(f"    - URLs discovered: {urls}")
+    print(f"    - Links recorded: {edges}")
+    print(f"CSV saved to: {csv_path}")
+    print(f"Edge list saved to: {edge_path}")
+    print_crawl_stats()
+
 def crawl_single_url(url_data):
     """Process a single URL for parallel crawling"""
     url, base_domain, robot_parser, json_path, media_folder, download_media_flag = url_data
@@ -631,11 +3682,22 @@ def crawl_single_url(url_data):
             return None
     
     if not can_fetch(robot_parser, norm_url):
-        print(f"[!] Disallowed by robots.txt: {norm_url}")
+        log_event(logging.DEBUG, "robots_disallowed", f"[!] Disallowed by robots.txt: {norm_url}", url=norm_url)
         return None
     
+    # Don't tie up a worker on a host that is currently failing; the caller requeues it later
+    if circuit_breaker.is_open(urlparse(norm_url).netloc):
+        return {"url": norm_url, "new_links": [], "deferred": True}
+    
+    # Pages not due for recrawl are not fetched, but their known links are still followed
+    if not recrawl_due(norm_url):
+        with lock:
+            visited_urls.add(norm_url)
+            new_links = [link for link in stored_outlinks(norm_url) if link not in visited_urls]
+        return {"url": norm_url, "new_links": new_links}
+    
     try:
-        res = requests.get(norm_url, timeout=25, headers={
+        res = fetch_html(norm_url, timeout=25, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
@@ -650,40 +3712,73 @@ def crawl_single_url(url_data):
         }, allow_redirects=True, verify=False)
         
         if res.status_code != 200:
-            print(f"[!] Parallel crawl failed with status {res.status_code}: {norm_url}")
+            log_event(logging.WARNING, "fetch_failed", f"[!] Parallel crawl failed with status {res.status_code}: {norm_url}",
+                      url=norm_url, status=res.status_code)
+            if res.status_code in RETRY_POLICY["retry_statuses"]:
+                record_dead_letter(norm_url, "parallel_static", f"HTTP {res.status_code}")
             return None
             
-        soup = BeautifulSoup(res.text, "html.parser")
-        metadata = extract_metadata(soup, norm_url, res.text, media_folder, download_media_flag)
+        soup = parse_html(res.content, res.encoding)
+        canonical_url = resolve_canonical(soup, norm_url, base_domain)
+        if not canonical_url:
+            return None
+        text = dedup_text(soup)
+        duplicate = duplicate_entry(norm_url, "parallel_static", text)
+        if duplicate:
+            data_entry = duplicate
+        else:
+            metadata = extract_metadata(soup, norm_url, page_source(res), media_folder, download_media_flag, text=text)
+            data_entry = {"url": norm_url, "source": "parallel_static"}
+            if canonical_url != norm_url:
+                data_entry["canonical_url"] = canonical_url
+            data_entry.update(metadata)
+            attach_stream_probes(data_entry)
         
         # Thread-safe addition to visited URLs
         with lock:
             visited_urls.add(norm_url)
         
-        data_entry = {"url": norm_url, "source": "parallel_static"}
-        data_entry.update(metadata)
         append_json(json_path, data_entry)
         
-        print(f"[✓] Parallel crawl completed: {norm_url}")
+        log_event(logging.INFO, "page_saved", f"[✓] Parallel crawl completed: {norm_url}",
+                  url=norm_url, source="parallel_static")
         
         # Extract new links
         new_links = []
+        if duplicate and not DEDUP_SETTINGS["expand_duplicate_links"]:
+            return {"url": norm_url, "new_links": new_links}
+        links = []
         for tag in soup.find_all("a", href=True):
             link = urljoin(norm_url, tag["href"])
             link_norm = normalize_url(link)
-            if is_valid(link_norm, base_domain):
+            if is_valid(link_norm, base_domain) and not is_crawler_trap(link_norm):
+                links.append(link_norm)
                 with lock:
                     if link_norm not in visited_urls:
                         new_links.append(link_norm)
+        record_outlinks(norm_url, links)
         
         return {"url": norm_url, "new_links": new_links}
         
+    except HostUnavailableError:
+        return {"url": norm_url, "new_links": [], "deferred": True}
+    except SkippedContentError as e:
+        log_event(logging.INFO, "fetch_skipped",
+                  f"[!] Skipping {e.reason} content ({e.content_type or 'unknown type'}): {norm_url}",
+                  url=norm_url, reason=e.reason, content_type=e.content_type)
+        with lock:
+            visited_urls.add(norm_url)
     except requests.exceptions.ConnectionError as e:
-        print(f"[!] Connection error at {norm_url}: Network/server issue")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Connection error at {norm_url}: Network/server issue",
+                  url=norm_url, error="connection")
+        record_dead_letter(norm_url, "parallel_static", e)
     except requests.exceptions.Timeout as e:
-        print(f"[!] Timeout error at {norm_url}: Server too slow")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Timeout error at {norm_url}: Server too slow",
+                  url=norm_url, error="timeout")
+        record_dead_letter(norm_url, "parallel_static", e)
     except Exception as e:
-        print(f"[!] Parallel crawl error at {norm_url}: {str(e)[:100]}")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Parallel crawl error at {norm_url}: {str(e)[:100]}",
+                  url=norm_url, error=str(e)[:200])
     
     return None
 
@@ -691,52 +3786,140 @@ def crawl_static_parallel(url, base_domain, writer, file, robot_parser, json_pat
     """Parallel static crawling with threading"""
     print(f"[+] Starting parallel static crawl with {max_workers} workers...")
     
-    urls_to_crawl = Queue()
-    urls_to_crawl.put(url)
+    urls_to_crawl = Frontier()
+    urls_to_crawl.push(normalize_url(url))
     
     total_crawled = 0
-    batch_size = max_workers * 2  # Process URLs in batches
+    pool_size = worker_pool_size(max_workers)
+    deferred = []  # URLs whose host circuit was open when their turn came
+    deferral_counts = {}
+    window = 0  # Pages finished since the last fixed politeness pause
     
-    while not urls_to_crawl.empty():
-        # Prepare batch of URLs
-        current_batch = []
-        batch_count = 0
-        
-        while not urls_to_crawl.empty() and batch_count < batch_size:
-            current_url = urls_to_crawl.get()
-            current_batch.append((
-                current_url, base_domain, robot_parser, json_path, 
-                media_folder, download_media_flag
-            ))
-            batch_count += 1
-        
-        if not current_batch:
-            break
+    # One pool for the whole crawl, kept fed from the frontier instead of waiting for whole batches
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        running = {}
+        while len(urls_to_crawl) or running or deferred:
+            if not len(urls_to_crawl) and not running:
+                # Only deferred URLs are left: wait for the earliest circuit to allow a probe
+                wait_time = min(circuit_breaker.retry_at(urlparse(u).netloc) for u in deferred) - time.time()
+                if wait_time > 0:
+                    log_event(logging.INFO, "deferred_wait",
+                              f"[+] Waiting {wait_time:.0f}s for unhealthy hosts "
+                              f"before retrying {len(deferred)} deferred URLs...",
+                              seconds=round(wait_time, 1), urls=len(deferred))
+                    time.sleep(wait_time)
+                for deferred_url in deferred:
+                    urls_to_crawl.push(deferred_url, force=True)
+                deferred = []
             
-        print(f"[+] Processing batch of {len(current_batch)} URLs...")
-        
-        # Process batch in parallel
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(crawl_single_url, url_data): url_data[0] 
-                           for url_data in current_batch}
+            while len(urls_to_crawl) and len(running) < pool_size * 2:
+                current_url = urls_to_crawl.pop()
+                url_data = (current_url, base_domain, robot_parser, json_path, media_folder, download_media_flag)
+                running[executor.submit(crawl_single_url, url_data)] = current_url
             
-            for future in as_completed(future_to_url):
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
                 result = future.result()
-                if result:
+                if result and result.get("deferred"):
+                    count = deferral_counts.get(result["url"], 0) + 1
+                    deferral_counts[result["url"]] = count
+                    if count > RETRY_POLICY["max_deferrals"]:
+                        record_dead_letter(result["url"], "parallel_static", "Host unavailable (circuit open)")
+                    else:
+                        deferred.append(result["url"])
+                elif result:
                     # Write URL to CSV (thread-safe)
                     write_url(writer, file, result["url"])
                     total_crawled += 1
                     
                     # Add new discovered links to queue
+                    prefetch_hosts(result["new_links"])
                     for new_link in result["new_links"]:
-                        urls_to_crawl.put(new_link)
-        
-        print(f"[✓] Batch completed. Total crawled: {total_crawled}")
-        
-        # Small delay to prevent overwhelming the server
-        time.sleep(1)
+                        urls_to_crawl.push(new_link)
+                    if total_crawled % 100 == 0:
+                        log_event(logging.INFO, "crawl_progress",
+                                  f"[+] Parallel crawl: {total_crawled} pages crawled, {len(urls_to_crawl)} queued",
+                                  crawled=total_crawled, queued=len(urls_to_crawl))
+            if not CONCURRENCY_SETTINGS["adaptive"]:
+                # Without the per-host controller, keep the fixed pause the batched crawl used
+                window += len(done)
+                if window >= pool_size * 2:
+                    time.sleep(CONCURRENCY_SETTINGS["batch_delay"])
+                    window = 0
     
-    print(f"[✓] Parallel static crawl completed. Total URLs crawled: {total_crawled}")
+    urls_to_crawl.report("Parallel crawl")
+    urls_to_crawl.close()
+    log_event(logging.INFO, "crawl_done", f"[✓] Parallel static crawl completed. Total URLs crawled: {total_crawled}",
+              crawled=total_crawled)
+
+def retry_dead_letters(base_domain, writer, file, robot_parser, json_path, media_folder=None, download_media_flag=False):
+    """Give every dead-lettered page one more attempt; URLs that fail again stay on the list"""
+    with lock:
+        entries = [e for e in dead_letters if e["source"] in ("sitemap", "static", "parallel_static")]
+        dead_letters[:] = [e for e in dead_letters if e not in entries]
+    if not entries:
+        return 0
+    print(f"[+] Retrying {len(entries)} failed URLs...")
+    circuit_breaker.reset()
+    recovered = 0
+    for entry in entries:
+        with lock:
+            visited_urls.discard(entry["url"])
+        result = crawl_single_url((entry["url"], base_domain, robot_parser, json_path, media_folder, download_media_flag))
+        if result and not result.get("deferred"):
+            write_url(writer, file, result["url"])
+            recovered += 1
+        elif result:
+            record_dead_letter(entry["url"], entry["source"], "Host unavailable (circuit open)")
+    print(f"[✓] Recovered {recovered}/{len(entries)} URLs on retry")
+    return recovered
+
+MEDIA_SOURCES = ("image", "video")
+
+def retry_dead_letter_file(filepath, download_media_flag=False):
+    """Replay a saved _dead_letters.jsonl: pages are crawled again and media downloads retried.
+    Results go to <name>_retry.csv/.json next to it; URLs that fail again get a new dead-letter file."""
+    entries = load_dead_letters(filepath)
+    if not entries:
+        print(f"[!] No failed URLs in {filepath}")
+        return 0
+    folder = os.path.dirname(filepath) or "."
+    base_filename = os.path.basename(filepath)
+    if base_filename.endswith("_dead_letters.jsonl"):
+        base_filename = base_filename[:-len("_dead_letters.jsonl")]
+    base_filename += "_retry"
+    reset_crawl_state()
+    csv_file, writer, csv_path = init_csv_writer(base_filename, folder)
+    json_path = init_json_file(base_filename, folder)
+    media_folder = folder if download_media_flag else None
+    start_dns_cache()
+    recovered = 0
+    try:
+        pages = {}
+        for entry in entries:
+            if entry["source"] in MEDIA_SOURCES:
+                print(f"[+] Retrying {entry['source']} download: {entry['url']}")
+                if download_media(entry["url"], folder, entry["source"]):
+                    recovered += 1
+            else:
+                pages.setdefault(urlparse(entry["url"]).netloc, []).append(entry)
+        # retry_dead_letters works on one site at a time, with that site's robots.txt
+        for host, host_entries in pages.items():
+            with lock:
+                dead_letters.extend(host_entries)
+            robot_parser = init_robot_parser(host_entries[0]["url"])
+            recovered += retry_dead_letters(host, writer, csv_file, robot_parser, json_path, media_folder,
+                                            download_media_flag)
+        save_dead_letters(folder, base_filename)
+    finally:
+        csv_file.close()
+        flush_outputs()
+        stop_dns_cache()
+    print(f"[✓] Recovered {recovered}/{len(entries)} failed URLs")
+    print(f"CSV saved to: {csv_path}")
+    print(f"JSON saved to: {json_path}")
+    return recovered
 
 def batch_process_urls(input_file="input_urls.txt", max_workers=5):
     """Process multiple URLs from a file in parallel"""
@@ -766,59 +3949,99 @@ def batch_process_urls(input_file="input_urls.txt", max_workers=5):
     except:
         pass
     
-    print(f"[+] Processing {len(urls)} URLs with {max_workers} parallel workers")
+    ask_adaptive_concurrency(max_workers)
+    ask_extractors()
+    ask_output_options()
+    ask_stream_probes()
     
-    # Process each URL
-    for i, url in enumerate(urls, 1):
-        print(f"\n[+] Processing URL {i}/{len(urls)}: {url}")
+    print(f"[+] Processing {len(urls)} URLs with {max_workers} parallel workers")
+    start_dns_cache()
+    try:
+        # Process each URL
+        for i, url in enumerate(urls, 1):
+            print(f"\n[+] Processing URL {i}/{len(urls)}: {url}")
         
-        try:
-            # Add https if no scheme provided
-            if not urlparse(url).scheme:
-                url = "https://" + url
+            try:
+                # Add https if no scheme provided
+                if not urlparse(url).scheme:
+                    url = "https://" + url
             
-            domain = urlparse(url).netloc
-            base_filename = generate_filename(url)
-            output_folder = os.path.join("batch_output", base_filename)
-            os.makedirs(output_folder, exist_ok=True)
+                domain = urlparse(url).netloc
+                base_filename = generate_filename(url)
+                output_folder = os.path.join("batch_output", base_filename)
+                os.makedirs(output_folder, exist_ok=True)
             
-            media_folder = output_folder if download_media_flag else None
+                media_folder = output_folder if download_media_flag else None
             
-            # Initialize files and parsers
-            robot_parser = init_robot_parser(url)
-            csv_file, writer, csv_path = init_csv_writer(base_filename, output_folder)
-            json_path = init_json_file(base_filename, output_folder)
+                # Initialize files and parsers
+                robot_parser = init_robot_parser(url)
+                csv_file, writer, csv_path = init_csv_writer(base_filename, output_folder)
+                json_path = init_json_file(base_filename, output_folder)
             
-            # Clear visited URLs for each new site
-            global visited_urls
-            visited_urls.clear()
+                # Clear visited URLs and trap counters for each new site
+                reset_crawl_state()
+                start_warc_output(os.path.join(output_folder, "warc"), base_filename)
+                start_search_index(output_folder)
+                start_event_log(output_folder)
             
-            start_time = time.time()
+                start_time = time.time()
             
-            # Quick parallel crawl
-            sitemap_urls = extract_sitemap(url, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
-            crawl_static_parallel(url, domain, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag, max_workers)
+                # Quick parallel crawl
+                sitemap_urls = extract_sitemap(url, writer, csv_file, robot_parser, json_path, media_folder,
+                                               download_media_flag)
+                crawl_static_parallel(url, domain, writer, csv_file, robot_parser, json_path, media_folder,
+                                      download_media_flag, max_workers)
+                save_dead_letters(output_folder, base_filename)
             
-            elapsed = time.time() - start_time
-            print(f"[✓] Completed {url} in {elapsed:.2f} seconds ({len(visited_urls)} URLs)")
+                elapsed = time.time() - start_time
+                flush_event_log()
+                print(f"[✓] Completed {url} in {elapsed:.2f} seconds ({len(visited_urls)} URLs)")
+                print_dedup_report()
+                print_concurrency_report()
             
-            csv_file.close()
+                csv_file.close()
+                close_warc_output()
+                close_search_index()
             
-        except Exception as e:
-            print(f"[!] Error processing {url}: {str(e)[:100]}")
-            continue
+            except Exception as e:
+                print(f"[!] Error processing {url}: {str(e)[:100]}")
+                continue
     
+        flush_outputs()
+    finally:
+        stop_dns_cache()
+    print_crawl_stats()
     print(f"\n[✓] Batch processing completed for {len(urls)} URLs")
 
 def crawl_static(url, base_domain, writer, file, robot_parser, json_path, media_folder=None, download_media_flag=False):
-    norm_url = normalize_url(url)
+    """Sequential static crawl, driven by a frontier instead of recursion so deep sites can't
+    hit the recursion limit"""
+    frontier = Frontier()
+    frontier.push(normalize_url(url))
+    while len(frontier):
+        norm_url = frontier.pop()
+        links = crawl_static_page(norm_url, base_domain, writer, file, robot_parser, json_path, media_folder,
+                                  download_media_flag)
+        prefetch_hosts(links)
+        for link_norm in links:
+            frontier.push(link_norm)
+    frontier.report("Static crawl")
+    frontier.close()
+
+def crawl_static_page(norm_url, base_domain, writer, file, robot_parser, json_path,
+                      media_folder=None, download_media_flag=False):
+    """Fetch and record one page of the sequential crawl; returns the links to follow"""
     if norm_url in visited_urls:
-        return
+        return []
     if not can_fetch(robot_parser, norm_url):
-        print(f"[!] Disallowed by robots.txt: {norm_url}")
-        return
+        log_event(logging.DEBUG, "robots_disallowed", f"[!] Disallowed by robots.txt: {norm_url}", url=norm_url)
+        return []
+    # Like the parallel crawl: a page that isn't due is still recorded, and its known links followed
+    if not recrawl_due(norm_url):
+        write_url(writer, file, norm_url)
+        return stored_outlinks(norm_url)
     try:
-        res = requests.get(norm_url, timeout=25, headers={
+        res = fetch_html(norm_url, timeout=25, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
@@ -833,31 +4056,60 @@ def crawl_static(url, base_domain, writer, file, robot_parser, json_path, media_
         }, allow_redirects=True, verify=False)
         
         if res.status_code != 200:
-            print(f"[!] Static crawl failed with status {res.status_code}: {norm_url}")
-            return
-        soup = BeautifulSoup(res.text, "html.parser")
-        metadata = extract_metadata(soup, norm_url, media_folder, download_media_flag)
-        write_url(writer, file, norm_url)
-        
-        data_entry = {"url": norm_url, "source": "static"}
-        data_entry.update(metadata)
-        append_json(json_path, data_entry)
+            log_event(logging.WARNING, "fetch_failed", f"[!] Static crawl failed with status {res.status_code}: {norm_url}",
+                      url=norm_url, status=res.status_code)
+            if res.status_code in RETRY_POLICY["retry_statuses"]:
+                record_dead_letter(norm_url, "static", f"HTTP {res.status_code}")
+            return []
+        soup = parse_html(res.content, res.encoding)
+        canonical_url = resolve_canonical(soup, norm_url, base_domain)
+        if not canonical_url:
+            return []
+        text = dedup_text(soup)
+        duplicate = duplicate_entry(norm_url, "static", text)
+        if duplicate:
+            write_url(writer, file, norm_url)
+            append_json(json_path, duplicate)
+            if not DEDUP_SETTINGS["expand_duplicate_links"]:
+                return []
+        else:
+            metadata = extract_metadata(soup, norm_url, page_source(res), media_folder, download_media_flag, text=text)
+            write_url(writer, file, norm_url)
+            
+            data_entry = {"url": norm_url, "source": "static"}
+            if canonical_url != norm_url:
+                data_entry["canonical_url"] = canonical_url
+            data_entry.update(metadata)
+            attach_stream_probes(data_entry)
+            append_json(json_path, data_entry)
         
-        for tag in soup.find_all("a", href=True):
-            link = urljoin(norm_url, tag["href"])
-            link_norm = normalize_url(link)
-            if is_valid(link_norm, base_domain) and link_norm not in visited_urls:
-                crawl_static(link_norm, base_domain, writer, file, robot_parser, json_path, media_folder, download_media_flag)
+        links = [normalize_url(urljoin(norm_url, tag["href"])) for tag in soup.find_all("a", href=True)]
+        links = [link for link in links if is_valid(link, base_domain) and not is_crawler_trap(link)]
+        record_outlinks(norm_url, links)
+        return links
+    except SkippedContentError as e:
+        log_event(logging.INFO, "fetch_skipped",
+                  f"[!] Skipping {e.reason} content ({e.content_type or 'unknown type'}): {norm_url}",
+                  url=norm_url, reason=e.reason, content_type=e.content_type)
+        with lock:
+            visited_urls.add(norm_url)
     except requests.exceptions.ConnectionError as e:
-        print(f"[!] Connection error at {norm_url}: Network/server issue")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Connection error at {norm_url}: Network/server issue",
+                  url=norm_url, error="connection")
+        record_dead_letter(norm_url, "static", e)
     except requests.exceptions.Timeout as e:
-        print(f"[!] Timeout error at {norm_url}: Server too slow")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Timeout error at {norm_url}: Server too slow",
+                  url=norm_url, error="timeout")
+        record_dead_letter(norm_url, "static", e)
     except Exception as e:
-        print(f"[!] Static crawl error at {norm_url}: {str(e)[:100]}")
+        log_event(logging.WARNING, "fetch_failed", f"[!] Static crawl error at {norm_url}: {str(e)[:100]}",
+                  url=norm_url, error=str(e)[:200])
+    return []
 
 def crawl_dynamic(start_url, base_domain, writer, file, robot_parser, json_path, headless=True, media_folder=None, download_media_flag=False):
     print("[+] Crawling dynamic pages (JavaScript)...")
-    to_visit = [normalize_url(start_url)]
+    to_visit = Frontier()
+    to_visit.push(normalize_url(start_url))
     with sync_playwright() as p:
         # Launch browser with better options for streaming sites
         browser = p.chromium.launch(
@@ -899,12 +4151,12 @@ def crawl_dynamic(start_url, base_domain, writer, file, robot_parser, json_path,
         
         page.on("request", handle_request)
         
-        while to_visit:
+        while len(to_visit):
             url = to_visit.pop()
             if url in visited_urls:
                 continue
             if not can_fetch(robot_parser, url):
-                print(f"[!] Disallowed by robots.txt: {url}")
+                log_event(logging.DEBUG, "robots_disallowed", f"[!] Disallowed by robots.txt: {url}", url=url)
                 continue
             try:
                 # Clear previous streaming requests
@@ -935,32 +4187,53 @@ def crawl_dynamic(start_url, base_domain, writer, file, robot_parser, json_path,
                             continue
                 
                 except Exception as e:
-                    print(f"[!] Error clicking streaming links: {e}")
-                
-                html = page.content()
-                soup = BeautifulSoup(html, "html.parser")
-                metadata = extract_metadata(soup, url, html, media_folder, download_media_flag)
-                
-                # Add network-captured streaming URLs
-                if streaming_requests:
-                    if "network_streams" not in metadata:
-                        metadata["network_streams"] = []
-                    metadata["network_streams"].extend(streaming_requests)
+                    log_event(logging.WARNING, "stream_click_failed", f"[!] Error clicking streaming links: {e}",
+                              url=url, error=str(e)[:200])
                 
-                write_url(writer, file, url)
+                dom = evaluate_page(page)
+                html = page.content() if browser_needs_html() else ""
+                if html:
+                    archive_snapshot(url, html)
+                canonical_url = resolve_canonical(None, url, base_domain, dom["canonical"])
+                if not canonical_url:
+                    continue
+                duplicate = duplicate_entry(url, "dynamic", dom["text"])
+                if duplicate:
+                    write_url(writer, file, url)
+                    append_json(json_path, duplicate)
+                    if not DEDUP_SETTINGS["expand_duplicate_links"]:
+                        continue
+                    metadata = None
+                else:
+                    metadata = extract_browser_metadata(dom, url, html, media_folder, download_media_flag)
                 
-                data_entry = {"url": url, "source": "dynamic"}
-                data_entry.update(metadata)
-                append_json(json_path, data_entry)
+                if metadata is not None:
+                    # Add network-captured streaming URLs
+                    if streaming_requests:
+                        if "network_streams" not in metadata:
+                            metadata["network_streams"] = []
+                        metadata["network_streams"].extend(streaming_requests)
+                    
+                    write_url(writer, file, url)
+                    
+                    data_entry = {"url": url, "source": "dynamic"}
+                    if canonical_url != url:
+                        data_entry["canonical_url"] = canonical_url
+                    data_entry.update(metadata)
+                    attach_stream_probes(data_entry)
+                    append_json(json_path, data_entry)
                 
-                for tag in soup.find_all("a", href=True):
-                    link = urljoin(url, tag["href"])
-                    link_norm = normalize_url(link)
-                    if is_valid(link_norm, base_domain) and link_norm not in visited_urls:
-                        to_visit.append(link_norm)
+                links = [normalize_url(urljoin(url, link["href"])) for link in dom["links"]]
+                links = [link for link in links if is_valid(link, base_domain) and not is_crawler_trap(link)]
+                prefetch_hosts(links)
+                for link_norm in links:
+                    to_visit.push(link_norm)
             except Exception as e:
-                print(f"[!] Dynamic crawl error at {url}: {e}")
+                log_event(logging.WARNING, "fetch_failed", f"[!] Dynamic crawl error at {url}: {e}",
+                          url=url, error=str(e)[:200])
         browser.close()
+    to_visit.report("Dynamic crawl")
+    to_visit.close()
     print(f"[✓] {len(visited_urls)} total unique URLs found.")
 
 def main():
@@ -1000,11 +4273,18 @@ def main():
         except:
             max_workers = 5
         print(f"[+] Using {max_workers} parallel workers")
+        ask_adaptive_concurrency(max_workers)
+    else:
+        CONCURRENCY_SETTINGS["adaptive"] = False
     
     # Ask user for media download option
     download_media_input = input("Download images and videos? (y/n, default: n): ").strip().lower()
     download_media_flag = download_media_input == 'y'
     
+    ask_extractors()
+    ask_output_options()
+    ask_stream_probes()
+    
     # Create main folder for this URL's content
     site_folder = os.path.join("output", generate_filename(base_url, include_timestamp=False))
     os.makedirs(site_folder, exist_ok=True)
@@ -1014,50 +4294,79 @@ def main():
     if media_folder:
         os.makedirs(media_folder, exist_ok=True)
     
+    # Previous crawls of this site leave a history that lets us skip unchanged pages
+    known_urls = load_crawl_state(site_folder)
+    RECRAWL_SETTINGS["track"] = True
+    RECRAWL_SETTINGS["enabled"] = False
+    if known_urls:
+        recrawl_input = input(f"Found history for {known_urls} URLs. "
+                              "Only fetch new pages and pages due for recrawl? (y/n, default: y): ").strip().lower()
+        RECRAWL_SETTINGS["enabled"] = recrawl_input != 'n'
+    
     # Initialize files and parsers
-    robot_parser = init_robot_parser(base_url)
-    csv_file, writer, csv_path = init_csv_writer(base_filename, site_folder)
-    json_path = init_json_file(base_filename, site_folder)
+    start_dns_cache()
+    try:
+        robot_parser = init_robot_parser(base_url)
+        csv_file, writer, csv_path = init_csv_writer(base_filename, site_folder)
+        json_path = init_json_file(base_filename, site_folder)
+        start_warc_output(os.path.join(site_folder, "warc"), base_filename)
+        start_search_index(site_folder)
+        start_event_log(site_folder)
     
-    print(f"[+] All content will be saved to: {site_folder}")
-    if media_folder:
-        print(f"[+] Media files will be saved to: {media_folder}")
+        print(f"[+] All content will be saved to: {site_folder}")
+        if media_folder:
+            print(f"[+] Media files will be saved to: {media_folder}")
     
-    # Extract sitemap URLs with full content (now parallel)
-    start_time = time.time()
-    sitemap_urls = extract_sitemap(base_url, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
-    sitemap_time = time.time() - start_time
-    print(f"[✓] Sitemap processing completed in {sitemap_time:.2f} seconds")
+        # Extract sitemap URLs with full content (now parallel)
+        start_time = time.time()
+        sitemap_urls = extract_sitemap(base_url, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
+        sitemap_time = time.time() - start_time
+        flush_event_log()
+        print(f"[✓] Sitemap processing completed in {sitemap_time:.2f} seconds")
 
-    # Static crawl (parallel or sequential based on user choice)
-    start_time = time.time()
-    if use_parallel:
-        print(f"[+] Starting parallel static crawl with {max_workers} workers...")
-        crawl_static_parallel(base_url, domain, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag, max_workers)
-    else:
-        print("[+] Starting sequential static crawl...")
-        crawl_static(base_url, domain, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
-    static_time = time.time() - start_time
-    print(f"[✓] Static crawl completed in {static_time:.2f} seconds")
+        # Static crawl (parallel or sequential based on user choice)
+        start_time = time.time()
+        if use_parallel:
+            crawl_static_parallel(base_url, domain, writer, csv_file, robot_parser, json_path, media_folder,
+                                  download_media_flag, max_workers)
+        else:
+            print("[+] Starting sequential static crawl...")
+            crawl_static(base_url, domain, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
+        if dead_letters:
+            retry_input = input(f"Retry {len(dead_letters)} failed URLs now? (y/n, default: y): ").strip().lower()
+            if retry_input != 'n':
+                retry_dead_letters(domain, writer, csv_file, robot_parser, json_path, media_folder, download_media_flag)
+        static_time = time.time() - start_time
+        flush_event_log()
+        print(f"[✓] Static crawl completed in {static_time:.2f} seconds")
 
-    # Dynamic crawl
-    start_time = time.time()
-    print("[+] Starting dynamic crawl...")
-    crawl_dynamic(base_url, domain, writer, csv_file, robot_parser, json_path, headless, media_folder, download_media_flag)
-    dynamic_time = time.time() - start_time
-    print(f"[✓] Dynamic crawl completed in {dynamic_time:.2f} seconds")
-
-    total_time = sitemap_time + static_time + dynamic_time
-    print(f"\n[✓] Crawl finished in {total_time:.2f} seconds total.")
-    print(f"    - Sitemap: {sitemap_time:.2f}s")
-    print(f"    - Static: {static_time:.2f}s") 
-    print(f"    - Dynamic: {dynamic_time:.2f}s")
-    print(f"CSV saved to: {csv_path}")
-    print(f"JSON saved to: {json_path}")
-    print(f"Total unique URLs found: {len(visited_urls)}")
+        # Dynamic crawl
+        start_time = time.time()
+        print("[+] Starting dynamic crawl...")
+        crawl_dynamic(base_url, domain, writer, csv_file, robot_parser, json_path, headless, media_folder, download_media_flag)
+        dynamic_time = time.time() - start_time
+        flush_event_log()
+        print(f"[✓] Dynamic crawl completed in {dynamic_time:.2f} seconds")
+
+        total_time = sitemap_time + static_time + dynamic_time
+        print(f"\n[✓] Crawl finished in {total_time:.2f} seconds total.")
+        print(f"    - Sitemap: {sitemap_time:.2f}s")
+        print(f"    - Static: {static_time:.2f}s") 
+        print(f"    - Dynamic: {dynamic_time:.2f}s")
+        print(f"CSV saved to: {csv_path}")
+        print(f"JSON saved to: {json_path}")
+        print(f"Total unique URLs found: {len(visited_urls)}")
+        print_dedup_report()
+        print_concurrency_report()
+        print_crawl_stats()
     
+        save_dead_letters(site_folder, base_filename)
+        save_crawl_state(site_folder)
+        csv_file.close()
+        flush_outputs()
+    finally:
+        stop_dns_cache()
     print(f"\n[✓] All files have been saved to: {site_folder}")
-    csv_file.close()
 
 def crawl_single_page(url, download_media_flag=False):
     """Crawl only a single page without following links"""
@@ -1084,8 +4393,9 @@ def crawl_single_page(url, download_media_flag=False):
     json_path = init_json_file(base_filename, site_folder)
     
     try:
+        start_dns_cache()
         print("[+] Fetching page content...")
-        response = requests.get(url, timeout=20, headers={
+        response = fetch_html(url, timeout=20, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
@@ -1093,36 +4403,445 @@ def crawl_single_page(url, download_media_flag=False):
         }, verify=False)
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
-            metadata = extract_metadata(soup, url, response.text, media_folder, download_media_flag)
+            soup = parse_html(response.content, response.encoding)
+            metadata = extract_metadata(soup, url, page_source(response), media_folder, download_media_flag)
             
             write_url(writer, csv_file, url)
             data_entry = {"url": url, "source": "single_page"}
             data_entry.update(metadata)
+            attach_stream_probes(data_entry)
             append_json(json_path, data_entry)
             
+            flush_event_log()
             print(f"\n[✓] Page crawled successfully")
             print(f"[✓] Files saved to: {site_folder}")
             if media_folder:
                 print(f"[✓] Media saved to: {media_folder}")
         else:
+            flush_event_log()
             print(f"[!] Failed to fetch page: HTTP {response.status_code}")
         
     except Exception as e:
         print(f"[!] Error crawling page: {str(e)[:100]}")
     finally:
         csv_file.close()
+        flush_outputs()
+        stop_dns_cache()
+
+def find_output_files(folder, patterns):
+    matches = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            # The event log is JSON Lines too, but never holds crawl results
+            if name == LOG_SETTINGS["event_file"]:
+                continue
+            if any(fnmatch(name, pattern) for pattern in patterns):
+                matches.append(os.path.join(root, name))
+    return sorted(matches)
+
+def collect_reprocess_tasks(folder):
+    """List (kind, location, url) tasks for every archived page and saved HTML file in folder"""
+    tasks = []
+    archived_urls = set()
+    # WARC archives: use the CDX index for offsets so workers can read records independently
+    for cdx_path in find_output_files(folder, ["*.cdx"]):
+        warc_folder = os.path.dirname(cdx_path)
+        with open(cdx_path, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 11 or fields[0] == "CDX" or not fields[3].startswith("text/html"):
+                    continue
+                tasks.append(("warc", (os.path.join(warc_folder, fields[10]), int(fields[9])), fields[2]))
+                archived_urls.add(normalize_url(fields[2]))
+    indexed = {location[0] for kind, location, _ in tasks}
+    # Archives without an index: scan for offsets only, the workers read the bodies
+    for warc_path in find_output_files(folder, ["*.warc.gz", "*.warc"]):
+        if warc_path in indexed:
+            continue
+        for offset, record in scan_warc_records(warc_path):
+            if record["type"] in ("response", "resource") and record["url"]:
+                content_type = record["http_headers"].get("content-type", "")
+                if content_type.startswith("text/html") and (record["status"] in (None, 200)):
+                    tasks.append(("warc", (warc_path, offset), record["url"]))
+                    archived_urls.add(normalize_url(record["url"]))
+    
+    # Saved HTML artifacts: recover page URLs from the result files of the original crawl
+    artifact_urls = {}
+    for result_path in find_output_files(folder, ["*.json", "*.jsonl", "*.jsonl.gz", "*.jsonl.zst"]):
+        try:
+            for record in read_crawl_records(result_path):
+                if isinstance(record, dict) and record.get("url"):
+                    artifact_urls.setdefault(page_artifact_name(record["url"]), record["url"])
+        except (ValueError, OSError):
+            continue
+    for html_path in find_output_files(folder, ["*.html", "*.html.gz", "*.html.zst"]):
+        if os.path.basename(os.path.dirname(html_path)) != "html":
+            continue
+        name = os.path.basename(html_path).split(".html")[0]
+        url = artifact_urls.get(name) or Path(os.path.abspath(html_path)).as_uri()
+        if normalize_url(url) not in archived_urls:
+            tasks.append(("file", html_path, url))
+    return tasks
+
+def reprocess_task(task):
+    """Process-pool worker: run extract_metadata on one stored page without any network I/O"""
+    kind, location, url, extractors = task
+    try:
+        if kind == "warc":
+            record = read_warc_record_at(*location)
+            body, content_type = record["body"], record["http_headers"].get("content-type", "")
+        else:
+            with open_crawl_output(location, "rb") as f:
+                body, content_type = f.read(), ""
+        encoding, _ = detect_encoding(body, content_type)
+        soup = parse_html(body, encoding)
+        data_entry = {"url": url, "source": "reprocessed"}
+        data_entry.update(extract_metadata(soup, url, "", None, False, extractors))
+        return data_entry
+    except Exception as e:
+        return {"url": url, "source": "reprocessed", "error": str(e)[:100]}
+
+def reprocess_output(folder, output_path=None, workers=None):
+    """Re-run extraction over a previous crawl's archives and saved HTML using all cores"""
+    # Artifacts already exist and media must not be downloaded again
+    extractors = [name for name in ACTIVE_EXTRACTORS if name != "artifacts"]
+    tasks = collect_reprocess_tasks(folder)
+    if not tasks:
+        print(f"[!] No archived pages or saved HTML found in {folder}")
+        return None
+    output_path = output_path or compressed_path(os.path.join(
+        folder, f"reprocessed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"))
+    workers = workers or os.cpu_count() or 1
+    print(f"[+] Re-extracting {len(tasks)} pages with {workers} processes...")
+    
+    start_time = time.time()
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = ((kind, location, url, extractors) for kind, location, url in tasks)
+        for data_entry in executor.map(reprocess_task, jobs, chunksize=16):
+            append_json(output_path, data_entry)
+            count += 1
+            if count % 1000 == 0:
+                print(f"[+] {count}/{len(tasks)} pages re-extracted")
+    flush_outputs()
+    elapsed = time.time() - start_time
+    print(f"[✓] Re-extracted {count} pages in {elapsed:.2f} seconds ({count / max(elapsed, 0.001):.0f} pages/s)")
+    print(f"[✓] Results saved to: {output_path}")
+    return output_path
+
+# Sharded crawling: URLs are partitioned by host hash across worker processes on one
+# host (or several invocations on it) sharing the frontier database
+SHARD_SETTINGS = {
+    "poll_interval": 2.0,  # Seconds an idle shard waits before polling the frontier again
+    "claim_timeout": 300.0  # Claimed URLs not finished within this time are handed out again
+}
+
+def shard_for_url(url, num_shards):
+    """Stable shard number for a URL, derived from a hash of its host"""
+    return zlib.crc32((urlparse(url).hostname or "").encode("utf-8")) % num_shards
+
+class SqliteFrontierStore:
+    """Shared crawl frontier in SQLite: URLs are inserted once (global dedup), partitioned by
+    host-hash shard and claimed in batches by the shard workers. Single host only: WAL mode
+    relies on shared memory, so every shard process must run on the machine that holds the
+    database file, on a local filesystem (not NFS/SMB)."""
+
+    def __init__(self, path, num_shards):
+        self.path = path
+        self.num_shards = num_shards
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS frontier (
+            url TEXT PRIMARY KEY, shard INTEGER NOT NULL, state TEXT NOT NULL DEFAULT 'pending',
+            claimed_at REAL, not_before REAL NOT NULL DEFAULT 0)""")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")]
+        if "not_before" not in columns:  # Frontier files from before deferrals were tracked
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN not_before REAL NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_shard_state ON frontier (shard, state)")
+
+    def add_urls(self, urls):
+        rows = [(url, shard_for_url(url, self.num_shards)) for url in urls]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO frontier (url, shard) VALUES (?, ?)", rows)
+
+    def claim(self, shard, limit):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                urls = [row[0] for row in self.conn.execute(
+                    "SELECT url FROM frontier WHERE shard = ? AND state = 'pending' AND not_before <= ? LIMIT ?",
+                    (shard, time.time(), limit))]
+                self.conn.executemany("UPDATE frontier SET state = 'claimed', claimed_at = ? WHERE url = ?",
+                                      [(time.time(), url) for url in urls])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return urls
+
+    def mark(self, urls, state):
+        with self.lock:
+            self.conn.executemany("UPDATE frontier SET state = ? WHERE url = ?", [(state, url) for url in urls])
+
+    def defer(self, retry_times):
+        """Put URLs back as pending, but not claimable before their retry time ({url: timestamp})"""
+        with self.lock:
+            self.conn.executemany("UPDATE frontier SET state = 'pending', not_before = ? WHERE url = ?",
+                                  [(retry_at, url) for url, retry_at in retry_times.items()])
+
+    def release_stale(self, timeout):
+        # Give URLs claimed by a crashed worker back to their shard
+        with self.lock:
+            self.conn.execute("UPDATE frontier SET state = 'pending' WHERE state = 'claimed' AND claimed_at < ?",
+                              (time.time() - timeout,))
+
+    def unfinished_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM frontier WHERE state IN ('pending', 'claimed')").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def scope_for(url, seed_domains):
+    host = urlparse(url).hostname
+    for domain in seed_domains:
+        if host_in_scope(host, domain):
+            return domain
+    return None
+
+# Settings a spawned shard process needs (forked processes inherit them anyway). They are
+# updated in place, since objects like circuit_breaker hold a reference to their dict.
+SHARD_SHARED_SETTINGS = {
+    "canonical": CANONICAL_RULES, "scope": SCOPE_RULES, "traps": TRAP_RULES, "dedup": DEDUP_SETTINGS,
+    "dns": DNS_SETTINGS, "concurrency": CONCURRENCY_SETTINGS, "retry": RETRY_POLICY, "content_limits": CONTENT_LIMITS,
+    "recrawl": RECRAWL_SETTINGS, "decoding": DECODING_SETTINGS, "output": OUTPUT_SETTINGS, "warc": WARC_SETTINGS,
+    "stream_probes": STREAM_PROBE_SETTINGS, "search": SEARCH_SETTINGS, "log": LOG_SETTINGS,
+    "durability": DURABILITY_SETTINGS, "shard": SHARD_SETTINGS
+}
+
+def settings_snapshot():
+    snapshot = {name: copy.deepcopy(settings) for name, settings in SHARD_SHARED_SETTINGS.items()}
+    snapshot["extractors"] = list(ACTIVE_EXTRACTORS)
+    # Shards never save a crawl state file, so keeping fetch history would only cost memory
+    snapshot["recrawl"]["track"] = False
+    return snapshot
+
+def apply_settings(snapshot):
+    global ACTIVE_EXTRACTORS
+    ACTIVE_EXTRACTORS = list(snapshot["extractors"])
+    for name, settings in SHARD_SHARED_SETTINGS.items():
+        settings.update(snapshot[name])
+    apply_log_levels()
+
+def run_shard(shard_id, num_shards, store_path, seed_domains, output_folder, settings, max_workers=5,
+              download_media_flag=False):
+    """Crawl every URL belonging to one shard until the whole shared frontier is finished"""
+    apply_settings(settings)
+    reset_crawl_state()
+    store = SqliteFrontierStore(store_path, num_shards)
+    shard_folder = os.path.join(output_folder, f"shard_{shard_id:03d}")
+    base_filename = f"shard_{shard_id:03d}"
+    csv_file, writer, csv_path = init_csv_writer(base_filename, shard_folder)
+    json_path = init_json_file(base_filename, shard_folder)
+    media_folder = shard_folder
+    start_warc_output(os.path.join(shard_folder, "warc"), base_filename)
+    start_search_index(shard_folder)
+    start_event_log(shard_folder)
+    start_dns_cache()
+    try:
+        robot_parsers = {}
+        pool_size = worker_pool_size(max_workers)
+        crawled = 0
+        idle_since = None
+        deferral_counts = {}
+        print(f"[+] Shard {shard_id}/{num_shards} started (pid {os.getpid()})")
+    
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            while True:
+                urls = store.claim(shard_id, pool_size * 2)
+                if not urls:
+                    # Other shards may still discover URLs for this one; stop once nothing is unfinished
+                    if store.unfinished_count() == 0:
+                        break
+                    idle_since = idle_since or time.time()
+                    if time.time() - idle_since > SHARD_SETTINGS["claim_timeout"]:
+                        store.release_stale(SHARD_SETTINGS["claim_timeout"])
+                        idle_since = None
+                    time.sleep(SHARD_SETTINGS["poll_interval"])
+                    continue
+                idle_since = None
+            
+                batch = []
+                for url in urls:
+                    base_domain = scope_for(url, seed_domains)
+                    if base_domain not in robot_parsers:
+                        robot_parsers[base_domain] = init_robot_parser(f"{urlparse(url).scheme}://{urlparse(url).netloc}")
+                    batch.append((url, base_domain, robot_parsers[base_domain], json_path, media_folder, download_media_flag))
+            
+                done, deferred, discovered = [], {}, []
+                for result in executor.map(crawl_single_url, batch):
+                    if result and result.get("deferred"):
+                        count = deferral_counts.get(result["url"], 0) + 1
+                        deferral_counts[result["url"]] = count
+                        if count > RETRY_POLICY["max_deferrals"]:
+                            record_dead_letter(result["url"], "parallel_static", "Host unavailable (circuit open)")
+                        else:
+                            # Not claimable again until its host's circuit lets a probe through
+                            deferred[result["url"]] = circuit_breaker.retry_at(urlparse(result["url"]).netloc)
+                        continue
+                    if result:
+                        write_url(writer, csv_file, result["url"])
+                        crawled += 1
+                        discovered.extend(result["new_links"])
+                done = [url for url in urls if url not in deferred]
+                # Cross-shard links are routed simply by inserting them; their shard claims them
+                store.add_urls(discovered)
+                prefetch_hosts(discovered)
+                store.mark(done, "done")
+                store.defer(deferred)
+    
+        csv_file.close()
+        save_dead_letters(shard_folder, base_filename)
+        flush_outputs()
+    finally:
+        stop_dns_cache()
+    store.close()
+    flush_event_log()
+    print(f"[✓] Shard {shard_id} finished: {crawled} pages")
+    return crawled
+
+def merge_shard_outputs(output_folder, name="merged"):
+    """Combine the per-shard CSV, results and dead letters into single files"""
+    shard_folders = sorted(glob.glob(os.path.join(output_folder, "shard_*")))
+    seen = set()
+    csv_file, writer, csv_path = init_csv_writer(name, output_folder)
+    # Merged results are streamed as JSON Lines rather than rewriting one growing array
+    json_path = compressed_path(os.path.join(output_folder, f"{name}.jsonl"))
+    if os.path.exists(json_path):
+        os.unlink(json_path)
+    records = 0
+    dead_letter_path = os.path.join(output_folder, f"{name}_dead_letters.jsonl")
+    with open(dead_letter_path, "w", encoding="utf-8") as dead_letter_file:
+        for shard_folder in shard_folders:
+            for path in find_output_files(shard_folder, ["*.csv", "*.csv.gz", "*.csv.zst"]):
+                with open_crawl_output(path) as f:
+                    for row in list(csv.reader(f))[1:]:
+                        if row and row[0] not in seen:
+                            seen.add(row[0])
+                            writer.writerow(row)
+            for path in find_output_files(shard_folder, ["*.json", "*.jsonl", "*.jsonl.gz", "*.jsonl.zst"]):
+                if path.endswith("_dead_letters.jsonl"):
+                    with open(path, "r", encoding="utf-8") as f:
+                        dead_letter_file.write(f.read())
+                    continue
+                for record in read_crawl_records(path):
+                    append_json(json_path, record)
+                    records += 1
+    csv_file.close()
+    flush_outputs()
+    if os.path.getsize(dead_letter_path) == 0:
+        os.unlink(dead_letter_path)
+    print(f"[✓] Merged {len(shard_folders)} shards: {len(seen)} URLs, {records} records")
+    print(f"CSV saved to: {csv_path}")
+    print(f"JSON saved to: {json_path}")
+    return csv_path, json_path
+
+def sharded_crawl(seed_urls, num_shards, store_path, output_folder, local_shards=None, max_workers=5,
+                  download_media_flag=False):
+    """Run shard workers as local processes; further invocations on the same host can run
+    the remaining shards against the same frontier database"""
+    seed_urls = [url if urlparse(url).scheme else "https://" + url for url in seed_urls]
+    seed_domains = [urlparse(url).netloc for url in seed_urls]
+    store = SqliteFrontierStore(store_path, num_shards)
+    store.add_urls([normalize_url(url) for url in seed_urls])
+    store.close()
+    local_shards = list(range(num_shards)) if local_shards is None else local_shards
+    print(f"[+] Running shards {local_shards} of {num_shards} (frontier: {store_path})")
+    
+    start_time = time.time()
+    settings = settings_snapshot()
+    processes = []
+    for shard_id in local_shards:
+        process = multiprocessing.Process(target=run_shard, args=(
+            shard_id, num_shards, store_path, seed_domains, output_folder, settings, max_workers, download_media_flag))
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+    print(f"[✓] Local shards finished in {time.time() - start_time:.2f} seconds")
+    return merge_shard_outputs(output_folder)
+
+def sharded_crawl_prompt():
+    print("=== Sharded Crawl ===")
+    seeds_input = input("Seed URLs (comma-separated) or path to a URL file: ").strip()
+    if os.path.exists(seeds_input):
+        with open(seeds_input, 'r', encoding='utf-8') as f:
+            seed_urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        seed_urls = [url.strip() for url in seeds_input.split(",") if url.strip()]
+    if not seed_urls:
+        print("Error: No URL provided")
+        return
+    try:
+        num_shards = max(1, int(input(f"Number of shards (default: {os.cpu_count() or 1}): ").strip()))
+    except ValueError:
+        num_shards = os.cpu_count() or 1
+    output_folder = os.path.join("output", "sharded_" + generate_filename(seed_urls[0], include_timestamp=False))
+    store_path = input(f"Frontier database (default: {output_folder}/frontier.db): ").strip()
+    store_path = store_path or os.path.join(output_folder, "frontier.db")
+    shards_input = input("Shard ids to run in this process group (comma-separated, default: all): ").strip()
+    local_shards = [int(s) for s in shards_input.split(",") if s.strip().isdigit()] if shards_input else None
+    ask_extractors()
+    ask_output_options()
+    ask_stream_probes()
+    sharded_crawl(seed_urls, num_shards, store_path, output_folder, local_shards)
 
 if __name__ == "__main__":
     print("=== Advanced Website Crawler ===")
     print("1. Single URL crawling (whole site)")
     print("2. Batch URL processing from file")
     print("3. Single page crawling (no link following)")
+    print("4. Convert JSON/JSONL crawl output to Parquet")
+    print("5. Re-extract metadata offline from a previous output folder")
+    print("6. Sharded crawl across local processes")
+    print("7. Discover URLs and link graph only (fast, no content extraction)")
+    print("8. Search a crawl's full-text index")
+    print("9. Retry failed URLs from a saved dead-letter file")
     
-    choice = input("Select option (1, 2, or 3, default: 1): ").strip()
+    choice = input("Select option (1-9, default: 1): ").strip()
     
     if choice == "2":
         batch_process_urls()
+    elif choice == "4":
+        input_path = input("Path to JSON/JSONL output file: ").strip()
+        if input_path and os.path.exists(input_path):
+            convert_to_parquet(input_path)
+        else:
+            print("Error: File not found")
+    elif choice == "5":
+        folder = input("Output folder to reprocess: ").strip()
+        if folder and os.path.isdir(folder):
+            ask_extractors()
+            reprocess_output(folder)
+        else:
+            print("Error: Folder not found")
+    elif choice == "6":
+        sharded_crawl_prompt()
+    elif choice == "7":
+        discovery_main()
+    elif choice == "8":
+        search_prompt()
+    elif choice == "9":
+        dead_letter_path = input("Path to a _dead_letters.jsonl file: ").strip()
+        if dead_letter_path and os.path.exists(dead_letter_path):
+            media_choice = input("Download images and videos of recovered pages? (y/n, default: n): ").strip().lower()
+            retry_dead_letter_file(dead_letter_path, media_choice == 'y')
+        else:
+            print("Error: File not found")
     elif choice == "3":
         url = input("Enter the URL to crawl: ").strip()
         if url:
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import CrawlAnything  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_crawl_state():
+    CrawlAnything.reset_crawl_state()
+    yield
+    CrawlAnything.reset_crawl_state()
@@ -0,0 +1,58 @@
+from bs4 import BeautifulSoup
+
+import CrawlAnything as ca
+
+# A page and the facts BROWSER_EXTRACT_SCRIPT reports for it
+PAGE = """<html><head><title> Rendered page </title><meta name="description" content=" Rendered description ">
+</head><body><h1>Main <em>heading</em></h1><h2>Sub</h2>
+<p>A paragraph that is long enough to keep.</p><p>Too short</p>
+<img src="/a.png" alt=" A " width="10"><video controls><source src="/v.mp4"></video>
+<iframe src="https://player.example.com/embed/1" title="Player"></iframe>
+<div data-src="/clip.webm"></div></body></html>"""
+
+DOM = {
+    "title": " Rendered page ",
+    "meta_description": " Rendered description ",
+    "canonical": None,
+    "text": "Rendered page\nMain\nheading\nSub\nA paragraph that is long enough to keep.\nToo short",
+    "headings": {"h1": ["Mainheading"], "h2": ["Sub"], "h3": []},
+    "paragraphs": ["A paragraph that is long enough to keep.", "Too short"],
+    "images": [{"src": "/a.png", "alt": " A ", "width": "10", "height": None}],
+    "videos": [{"src": "/v.mp4", "width": None, "height": None, "controls": True, "autoplay": False}],
+    "iframes": [{"src": "https://player.example.com/embed/1", "width": None, "height": None, "title": "Player"}],
+    "links": [],
+    "navigation": [],
+    "data_src": [{"url": "/clip.webm", "element": "div"}],
+    "streams": {},
+    "script_videos": [],
+}
+
+NAMES = ["title", "meta_description", "headings", "paragraphs", "images", "videos", "streaming_links",
+         "embedded_videos"]
+
+
+def test_browser_extractors_match_soup_extractors():
+    url = "https://example.com/page"
+    from_dom = ca.extract_browser_metadata(DOM, url, extractors=NAMES)
+    from_soup = ca.extract_metadata(BeautifulSoup(PAGE, "html.parser"), url, extractors=NAMES)
+    assert from_dom == from_soup
+    assert from_dom["title"] == "Rendered page"
+    assert from_dom["videos"][0]["url"] == "https://example.com/v.mp4"
+
+
+def test_extractors_without_browser_version_use_the_html(monkeypatch):
+    def word_count(soup, context):
+        return {"words": len(soup.find_all("p"))}
+
+    monkeypatch.setattr(ca, "EXTRACTORS", dict(ca.EXTRACTORS, word_count=word_count))
+    metadata = ca.extract_browser_metadata(DOM, "https://example.com/page", PAGE, extractors=["title", "word_count"])
+    assert metadata == {"title": "Rendered page", "words": 2}
+    assert ca.extract_browser_metadata(DOM, "https://example.com/page", extractors=["word_count"]) == {}
+
+
+def test_serialized_html_only_needed_when_required(monkeypatch):
+    monkeypatch.setitem(ca.WARC_SETTINGS, "enabled", False)
+    assert not ca.browser_needs_html(["title", "headings"])
+    assert ca.browser_needs_html(["artifacts"])
+    monkeypatch.setitem(ca.WARC_SETTINGS, "enabled", True)
+    assert ca.browser_needs_html(["title"])
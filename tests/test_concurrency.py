@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+import CrawlAnything as ca
+
+
+@pytest.fixture
+def controller():
+    settings = dict(ca.CONCURRENCY_SETTINGS, initial_limit=4, min_limit=1, max_limit=6, target_latency=1.0)
+    return ca.HostConcurrencyController(settings)
+
+
+def finish(controller, host, **outcome):
+    controller.acquire(host)
+    controller.release(host, **outcome)
+
+
+def test_limit_grows_after_a_window_of_fast_responses(controller):
+    for _ in range(4):
+        finish(controller, "a.example", latency=0.1, status=200)
+    assert controller.report()["a.example"]["limit"] == 5
+
+
+def test_slow_responses_do_not_grow_the_limit(controller):
+    for _ in range(10):
+        finish(controller, "a.example", latency=5.0, status=200)
+    assert controller.report()["a.example"]["limit"] == 4
+
+
+def test_errors_cut_the_limit_once_per_round_trip(controller):
+    finish(controller, "a.example", status=503)
+    finish(controller, "a.example", status=503)
+    report = controller.report()["a.example"]
+    assert report["limit"] == 2 and report["errors"] == 2
+
+
+def test_limit_is_bounded(controller):
+    for _ in range(100):
+        finish(controller, "a.example", latency=0.1, status=200)
+    assert controller.report()["a.example"]["limit"] == 6
+    state = controller.hosts["a.example"]
+    for _ in range(5):
+        state["last_decrease"] = 0.0
+        finish(controller, "a.example", failed=True)
+    assert controller.report()["a.example"]["limit"] == 1
+
+
+def test_retry_after_blocks_the_host(controller):
+    finish(controller, "a.example", status=429, retry_after=120)
+    assert controller.hosts["a.example"]["blocked_until"] == pytest.approx(time.time() + 120, abs=1)
+    assert controller.hosts.get("b.example") is None  # Other hosts are unaffected
+
+
+@pytest.mark.parametrize("value, expected", [("120", 120.0), ("-5", 0.0), ("", None), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert ca.parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert ca.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+def test_parallel_crawl_pauses_only_without_adaptive_concurrency(monkeypatch, adaptive):
+    links = {"https://example.com/": [f"https://example.com/{i}" for i in range(9)]}
+    pauses = []
+    monkeypatch.setitem(ca.CONCURRENCY_SETTINGS, "adaptive", adaptive)
+    monkeypatch.setitem(ca.CONCURRENCY_SETTINGS, "batch_delay", 0.25)
+    monkeypatch.setattr(ca, "crawl_single_url", lambda data: {"url": data[0], "new_links": links.get(data[0], [])})
+    monkeypatch.setattr(ca, "write_url", lambda writer, file, url: None)
+    monkeypatch.setattr(ca.time, "sleep", pauses.append)
+    ca.crawl_static_parallel("https://example.com/", "example.com", None, None, None, None, max_workers=2)
+    if adaptive:
+        assert pauses == []
+    else:
+        assert pauses and set(pauses) == {0.25}
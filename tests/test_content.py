@@ -0,0 +1,89 @@
+import io
+
+import pytest
+import requests
+
+import CrawlAnything as ca
+
+
+class Body(io.BytesIO):
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def make_response(body, content_type, content_length=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = "https://example.com/page"
+    response.raw = Body(body)
+    response.headers["Content-Type"] = content_type
+    if content_length is not None:
+        response.headers["Content-Length"] = str(content_length)
+    return response
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    def serve(response):
+        monkeypatch.setattr(ca, "fetch_page", lambda url, **kwargs: response)
+        return response
+    return serve
+
+
+def test_content_limit_lookup():
+    assert ca.content_limit("text/html") == ca.CONTENT_LIMITS["text/html"]
+    assert ca.content_limit("image/png") == ca.CONTENT_LIMITS["image/*"]
+    assert ca.content_limit("application/zip") == ca.CONTENT_LIMITS["default"]
+
+
+@pytest.mark.parametrize("head, expected", [
+    (b"  <!DOCTYPE html><html>", True), (b"<html lang=en>", True), (b"<?xml version='1.0'?><html>", True),
+    (b"%PDF-1.7", False), (b'{"json": true}', False),
+])
+def test_looks_like_html(head, expected):
+    assert ca.looks_like_html(head) is expected
+
+
+def test_html_is_read_and_decoded(serve):
+    serve(make_response("<html><p>café</p></html>".encode("utf-8"), "text/html; charset=utf-8"))
+    response = ca.fetch_html("https://example.com/page")
+    assert response.content == "<html><p>café</p></html>".encode("utf-8")
+    assert response.encoding == "utf-8"
+
+
+def test_non_html_is_skipped_before_reading(serve):
+    response = serve(make_response(b"%PDF-1.7 ...", "application/pdf"))
+    with pytest.raises(ca.SkippedContentError) as error:
+        ca.fetch_html("https://example.com/file.pdf")
+    assert error.value.reason == "non-HTML" and error.value.content_type == "application/pdf"
+    assert response.raw.bytes_read == 0
+
+
+def test_declared_oversize_is_skipped_before_reading(serve, monkeypatch):
+    monkeypatch.setitem(ca.CONTENT_LIMITS, "text/html", 10)
+    response = serve(make_response(b"<html>" + b"x" * 100, "text/html", content_length=106))
+    with pytest.raises(ca.SkippedContentError) as error:
+        ca.fetch_html("https://example.com/page")
+    assert error.value.reason == "oversized"
+    assert response.raw.bytes_read == 0
+    assert ca.crawl_stats["bytes_avoided"] == 106
+
+
+def test_streamed_oversize_is_aborted(serve, monkeypatch):
+    monkeypatch.setitem(ca.CONTENT_LIMITS, "text/html", 10)
+    serve(make_response(b"<html>" + b"x" * 100, "text/html"))
+    with pytest.raises(ca.SkippedContentError) as error:
+        ca.fetch_html("https://example.com/page")
+    assert error.value.reason == "oversized"
+
+
+def test_mislabelled_types_are_sniffed(serve):
+    serve(make_response(b"<!doctype html><p>hi</p>", "text/plain"))
+    assert ca.fetch_html("https://example.com/page").status_code == 200
+    serve(make_response(b"\x89PNG\r\n\x1a\n", "application/octet-stream"))
+    with pytest.raises(ca.SkippedContentError):
+        ca.fetch_html("https://example.com/image")
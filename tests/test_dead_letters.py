@@ -0,0 +1,35 @@
+import json
+
+import CrawlAnything as ca
+
+
+def test_dead_letters_round_trip(tmp_path):
+    ca.record_dead_letter("https://example.com/a", "static", "HTTP 503")
+    path = ca.save_dead_letters(str(tmp_path), "site")
+    entries = ca.load_dead_letters(path)
+    assert [(e["url"], e["source"], e["error"]) for e in entries] == [("https://example.com/a", "static", "HTTP 503")]
+
+
+def test_retry_dead_letter_file_replays_pages_and_keeps_failures(tmp_path, monkeypatch):
+    entries = [
+        {"url": "https://example.com/ok", "source": "static", "error": "timeout"},
+        {"url": "https://example.com/down", "source": "parallel_static", "error": "HTTP 503"},
+        {"url": "https://example.com/link", "source": "discovery", "error": "timeout"},
+    ]
+    path = tmp_path / "site_dead_letters.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
+
+    def fake_crawl(url_data):
+        url = url_data[0]
+        if url.endswith("/ok"):
+            return {"url": url}
+        ca.record_dead_letter(url, "parallel_static", "HTTP 503")
+        return None
+
+    monkeypatch.setattr(ca, "crawl_single_url", fake_crawl)
+    monkeypatch.setattr(ca, "init_robot_parser", lambda url: None)
+
+    assert ca.retry_dead_letter_file(str(path)) == 1
+    assert (tmp_path / "site_retry.csv").read_text(encoding="utf-8").splitlines() == ["URL", "https://example.com/ok"]
+    remaining = ca.load_dead_letters(str(tmp_path / "site_retry_dead_letters.jsonl"))
+    assert sorted(e["url"] for e in remaining) == ["https://example.com/down", "https://example.com/link"]
@@ -0,0 +1,54 @@
+import hashlib
+import random
+from collections import Counter
+
+import CrawlAnything as ca
+
+
+def reference_simhash(text):
+    tokens = text.lower().split()
+    shingles = Counter(" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2))
+    weights = [0] * 64
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def words(count, seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "crawl", "page", "text"]) + str(rng.randint(0, 50))
+                    for _ in range(count))
+
+
+def test_simhash_matches_per_bit_reference():
+    for seed in range(5):
+        text = words(200, seed)
+        assert ca.simhash(text) == reference_simhash(text)
+
+
+def test_simhash_skips_short_texts():
+    assert ca.simhash("too few words here") is None
+
+
+def test_near_duplicates_are_detected_and_distinct_pages_are_not():
+    base = words(300, 1)
+    assert ca.duplicate_entry("https://example.com/a", "static", base) is None
+    duplicate = ca.duplicate_entry("https://example.com/b", "static", base + " footer")
+    assert duplicate["duplicate_of"] == "https://example.com/a"
+    assert ca.duplicate_entry("https://example.com/c", "static", words(300, 2)) is None
+
+
+def test_dedup_disabled_skips_text_extraction(monkeypatch):
+    monkeypatch.setitem(ca.DEDUP_SETTINGS, "enabled", False)
+    assert ca.dedup_text(None) is None
+    assert ca.duplicate_entry("https://example.com/a", "static", None) is None
+
+
+def test_extract_metadata_reuses_dedup_text(monkeypatch):
+    monkeypatch.setitem(ca.SEARCH_SETTINGS, "enabled", True)
+    soup = ca.BeautifulSoup("<html><title>T</title><body><p>visible</p></body></html>", "html.parser")
+    metadata = ca.extract_metadata(soup, "https://example.com/", extractors=["title"], text="already extracted")
+    assert metadata[ca.SEARCH_TEXT_KEY] == "already extracted"
+    assert ca.extract_metadata(soup, "https://example.com/", extractors=["title"])[ca.SEARCH_TEXT_KEY] == "T\nvisible"
@@ -0,0 +1,111 @@
+import socket
+
+import pytest
+
+import CrawlAnything as ca
+
+
+class FakeResolver:
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def resolve(self, host):
+        self.calls.append(host)
+        answer = self.answers[host]
+        if answer is None:
+            raise socket.gaierror(socket.EAI_NONAME, host)
+        return answer
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    resolver = FakeResolver({"example.com": (["93.184.216.34", "2606:2800:220:1::"], 600),
+                             "missing.example": None})
+    dns_cache = ca.DnsCache(resolver)
+    monkeypatch.setattr(ca, "dns_cache", dns_cache)
+    yield dns_cache
+    dns_cache.close()
+
+
+@pytest.fixture
+def system_calls(monkeypatch):
+    calls = []
+
+    def fake_system(host, port, family=0, type=0, proto=0, flags=0):
+        calls.append((host, port, family, type, proto, flags))
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("10.0.0.1", port or 0))]
+
+    monkeypatch.setattr(ca, "_system_getaddrinfo", fake_system)
+    return calls
+
+
+def test_is_ip_address():
+    assert ca.is_ip_address("127.0.0.1")
+    assert ca.is_ip_address("[::1]")
+    assert not ca.is_ip_address("example.com")
+
+
+def test_lookup_is_cached(cache):
+    assert cache.lookup("Example.com") == ["93.184.216.34", "2606:2800:220:1::"]
+    cache.lookup("example.com")
+    assert cache.resolver.calls == ["example.com"]
+
+
+def test_failed_lookup_is_cached(cache):
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.lookup("missing.example")
+    assert cache.resolver.calls == ["missing.example"]
+
+
+def test_expired_entry_is_resolved_again(cache):
+    cache.lookup("example.com")
+    expires_at, addresses = cache.entries["example.com"]
+    cache.entries["example.com"] = (0, addresses)
+    cache.lookup("example.com")
+    assert cache.resolver.calls == ["example.com", "example.com"]
+
+
+def test_getaddrinfo_answers_plain_tcp_lookups_from_cache(cache, system_calls):
+    results = ca.cached_getaddrinfo("example.com", 443, socket.AF_INET)
+    assert results == [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("93.184.216.34", 443))]
+    results = ca.cached_getaddrinfo("example.com", 80, 0, socket.SOCK_STREAM)
+    assert [info[0] for info in results] == [socket.AF_INET, socket.AF_INET6]
+    assert system_calls == []
+
+
+@pytest.mark.parametrize("port, kwargs", [
+    (443, {"flags": socket.AI_CANONNAME}),
+    (53, {"type": socket.SOCK_DGRAM}),
+    (53, {"proto": socket.IPPROTO_UDP}),
+    ("https", {}),
+])
+def test_getaddrinfo_passes_other_lookups_through(cache, system_calls, port, kwargs):
+    ca.cached_getaddrinfo("example.com", port, **kwargs)
+    assert len(system_calls) == 1
+    assert cache.resolver.calls == []
+
+
+def test_stop_restores_system_getaddrinfo(monkeypatch):
+    monkeypatch.setitem(ca.DNS_SETTINGS, "enabled", True)
+    monkeypatch.setattr(ca, "aiodns", None)
+    ca.start_dns_cache()
+    try:
+        assert socket.getaddrinfo is ca.cached_getaddrinfo
+    finally:
+        ca.stop_dns_cache()
+    assert socket.getaddrinfo is ca._system_getaddrinfo
+    assert ca.dns_cache is None
+
+
+def test_static_crawl_prefetches_queued_links(monkeypatch):
+    pages = {"https://example.com/": ["https://example.com/a", "https://example.com/b"]}
+    prefetched = []
+    monkeypatch.setattr(ca, "crawl_static_page", lambda url, *args: pages.get(url, []))
+    monkeypatch.setattr(ca, "prefetch_hosts", lambda urls: prefetched.extend(urls))
+    ca.crawl_static("https://example.com/", "example.com", None, None, None, None)
+    assert prefetched == ["https://example.com/a", "https://example.com/b"]
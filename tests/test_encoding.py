@@ -0,0 +1,60 @@
+import codecs
+
+import pytest
+import requests
+
+import CrawlAnything as ca
+
+
+def make_response(body, content_type="text/html", encoding=None):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Content-Type"] = content_type
+    response.encoding = encoding
+    return response
+
+
+def test_bom_wins_over_declared_charsets():
+    body = codecs.BOM_UTF8 + '<meta charset="latin-1"><p>café</p>'.encode("utf-8")
+    assert ca.detect_encoding(body, "text/html; charset=windows-1252") == ("utf-8-sig", "bom")
+
+
+def test_header_charset_is_trusted():
+    assert ca.detect_encoding(b"<p>hi</p>", 'text/html; charset="ISO-8859-1"') == ("iso8859-1", "header")
+
+
+def test_meta_charset_used_without_header():
+    body = b'<html><head><meta charset="windows-1251"></head><body>\xcf\xf0\xe8</body></html>'
+    assert ca.detect_encoding(body, "text/html") == ("cp1251", "meta")
+
+
+def test_unknown_charset_falls_through():
+    body = b'<meta charset="no-such-charset"><p>plain</p>'
+    encoding, source = ca.detect_encoding(body, "text/html; charset=bogus")
+    assert source in ("detected", "default")
+    assert encoding == "utf-8"
+
+
+def test_default_without_detector(monkeypatch):
+    monkeypatch.setattr(ca, "charset_detector", None)
+    assert ca.detect_encoding(b"<p>plain</p>") == ("utf-8", "default")
+
+
+def test_decode_body_uses_detected_encoding():
+    text, encoding = ca.decode_body("<p>café</p>".encode("latin-1"), "text/html; charset=latin-1")
+    assert (text, encoding) == ("<p>café</p>", "iso8859-1")
+
+
+def test_page_source_decodes_with_chosen_encoding(monkeypatch):
+    monkeypatch.setattr(ca, "ACTIVE_EXTRACTORS", ["artifacts"])
+    response = make_response("<p>При</p>".encode("cp1251"), encoding="cp1251")
+    assert ca.page_source(response) == "<p>При</p>"
+    response = make_response("<p>café</p>".encode("latin-1"), "text/html; charset=latin-1")
+    assert ca.page_source(response) == "<p>café</p>"
+
+
+@pytest.mark.parametrize("extractors", [[], ["basic"]])
+def test_page_source_skipped_without_artifacts(monkeypatch, extractors):
+    monkeypatch.setattr(ca, "ACTIVE_EXTRACTORS", extractors)
+    assert ca.page_source(make_response(b"<p>x</p>", encoding="utf-8")) == ""
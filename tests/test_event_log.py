@@ -0,0 +1,87 @@
+import json
+import logging
+import os
+
+import pytest
+
+import CrawlAnything as ca
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ca.os, "fsync", lambda fd: calls.append(fd))
+    return calls
+
+
+def test_record_policy_syncs_every_write(monkeypatch, tmp_path, fsyncs):
+    monkeypatch.setitem(ca.DURABILITY_SETTINGS, "policy", "record")
+    with open(tmp_path / "out.csv", "w") as f:
+        for _ in range(3):
+            f.write("row\n")
+            ca.sync_output(f)
+    assert len(fsyncs) == 3
+
+
+def test_periodic_policy_waits_for_the_interval(monkeypatch, tmp_path, fsyncs):
+    monkeypatch.setitem(ca.DURABILITY_SETTINGS, "policy", "periodic")
+    monkeypatch.setitem(ca.DURABILITY_SETTINGS, "interval", 5.0)
+    clock = [100.0]
+    monkeypatch.setattr(ca.time, "monotonic", lambda: clock[0])
+    path = str(tmp_path / "out.csv")
+    with open(path, "w") as f:
+        ca.sync_output(f)  # First write only starts the clock
+        clock[0] += 4.0
+        ca.sync_output(f)
+        assert fsyncs == []
+        clock[0] += 2.0
+        ca.sync_output(f)
+        assert len(fsyncs) == 1
+    ca.sync_closed(path)
+    assert len(fsyncs) == 2
+    assert path not in ca.synced_at
+
+
+def test_none_policy_never_syncs(monkeypatch, tmp_path, fsyncs):
+    monkeypatch.setitem(ca.DURABILITY_SETTINGS, "policy", "none")
+    path = str(tmp_path / "out.csv")
+    with open(path, "w") as f:
+        ca.sync_output(f)
+    ca.sync_closed(path)
+    assert fsyncs == []
+
+
+def test_events_are_written_as_json_lines(monkeypatch, tmp_path):
+    monkeypatch.setitem(ca.LOG_SETTINGS, "event_log", True)
+    ca.start_event_log(str(tmp_path))
+    try:
+        ca.log_event(logging.DEBUG, "url_saved", "[✓] Saved URL: https://example.com/", url="https://example.com/")
+        ca.log_event(logging.WARNING, "fetch_failed", "[!] Timeout", url="https://example.com/x", error="timeout")
+    finally:
+        ca.close_event_log()
+    with open(os.path.join(str(tmp_path), ca.LOG_SETTINGS["event_file"]), encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    assert [(e["event"], e["level"]) for e in events] == [("url_saved", "DEBUG"), ("fetch_failed", "WARNING")]
+    assert events[0]["message"] == "[✓] Saved URL: https://example.com/"
+    assert events[1]["error"] == "timeout" and events[1]["url"] == "https://example.com/x"
+
+
+def test_debug_events_are_dropped_without_an_event_log(monkeypatch):
+    monkeypatch.setitem(ca.LOG_SETTINGS, "console_level", "INFO")
+    ca.close_event_log()
+    assert not ca.logger.isEnabledFor(logging.DEBUG)
+    assert ca.logger.isEnabledFor(logging.INFO)
+
+
+def test_worker_writes_fsync_outside_the_global_lock(monkeypatch, tmp_path):
+    held = []
+    monkeypatch.setattr(ca.os, "fsync", lambda fd: held.append(ca.lock.locked()))
+    monkeypatch.setitem(ca.DURABILITY_SETTINGS, "policy", "record")
+    csv_file, writer, _ = ca.init_csv_writer("site", str(tmp_path))
+    json_path = ca.init_json_file("site", str(tmp_path))
+    try:
+        ca.write_url(writer, csv_file, "https://example.com/a")
+        ca.append_json(json_path, {"url": "https://example.com/a"})
+    finally:
+        csv_file.close()
+    assert held == [False, False]
@@ -0,0 +1,56 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import CrawlAnything as ca
+
+PAGE = """<html><head><title>Example page</title><meta name="description" content="About things"></head>
+<body><h1>Main</h1><h2>Sub</h2><p>The first paragraph of the page.</p><p>Short.</p>
+<img src="/a.png" alt="A"><script>var hidden = 1;</script></body></html>"""
+
+
+def soup():
+    return BeautifulSoup(PAGE, "html.parser")
+
+
+@pytest.fixture(autouse=True)
+def restore_extractors(monkeypatch):
+    monkeypatch.setattr(ca, "ACTIVE_EXTRACTORS", list(ca.ACTIVE_EXTRACTORS))
+
+
+def test_select_profiles_and_lists():
+    assert ca.select_extractors("basic") == ca.EXTRACTOR_PROFILES["basic"]
+    assert ca.select_extractors(" title, images ") == ["title", "images"]
+    assert ca.ACTIVE_EXTRACTORS == ["title", "images"]
+    assert ca.select_extractors("") == ca.EXTRACTOR_PROFILES["full"]
+
+
+def test_unknown_extractor_falls_back_to_full():
+    assert ca.select_extractors("title,nope") == ca.EXTRACTOR_PROFILES["full"]
+
+
+def test_only_selected_fields_are_extracted():
+    ca.select_extractors("basic")
+    metadata = ca.extract_metadata(soup(), "https://example.com/page")
+    assert metadata["title"] == "Example page"
+    assert metadata["meta_description"] == "About things"
+    assert metadata["h1_headings"] == ["Main"] and metadata["h2_headings"] == ["Sub"]
+    assert "paragraphs" not in metadata and "images" not in metadata
+
+
+def test_explicit_extractors_and_media_urls():
+    metadata = ca.extract_metadata(soup(), "https://example.com/dir/page", extractors=["paragraphs", "images"])
+    assert metadata["paragraphs"] == ["The first paragraph of the page."]
+    assert [image["url"] for image in metadata["images"]] == ["https://example.com/a.png"]
+    assert metadata["images"][0]["alt"] == "A"
+
+
+def test_custom_extractor_shares_page_text(monkeypatch):
+    monkeypatch.setattr(ca, "EXTRACTORS", dict(ca.EXTRACTORS))
+
+    @ca.register_extractor("word_count")
+    def word_count(page, context):
+        return {"word_count": len(ca.page_text(page, context).split())}
+
+    metadata = ca.extract_metadata(soup(), "https://example.com/", extractors=["word_count"], text="one two three")
+    assert metadata == {"word_count": 3}
+    assert ca.select_extractors("title,word_count") == ["title", "word_count"]
@@ -0,0 +1,45 @@
+import CrawlAnything as ca
+
+
+def drain(frontier):
+    urls = []
+    while True:
+        url = frontier.pop()
+        if url is None:
+            return urls
+        urls.append(url)
+
+
+def test_fifo_order_and_enqueue_dedup():
+    frontier = ca.Frontier()
+    assert frontier.push("https://example.com/a")
+    assert frontier.push("https://example.com/b")
+    assert not frontier.push("https://example.com/a")
+    assert len(frontier) == 2
+    assert drain(frontier) == ["https://example.com/a", "https://example.com/b"]
+    assert not frontier.push("https://example.com/a")  # Still seen after it was popped
+    assert frontier.stats["duplicates_suppressed"] == 2
+
+
+def test_visited_urls_are_not_enqueued():
+    ca.visited_urls.add("https://example.com/done")
+    frontier = ca.Frontier()
+    assert not frontier.push("https://example.com/done")
+    assert frontier.push("https://example.com/done", force=True)
+    assert drain(frontier) == ["https://example.com/done"]
+
+
+def test_spill_keeps_fifo_order(monkeypatch):
+    monkeypatch.setitem(ca.FRONTIER_SETTINGS, "refill", 3)
+    frontier = ca.Frontier(max_memory=2)
+    urls = [f"https://example.com/{i}" for i in range(10)]
+    for url in urls[:6]:
+        frontier.push(url)
+    assert frontier.stats["spilled"] == 4
+    assert len(frontier) == 6
+    popped = [frontier.pop() for _ in range(3)]
+    for url in urls[6:]:
+        frontier.push(url)
+    assert popped + drain(frontier) == urls
+    assert len(frontier) == 0
+    frontier.close()
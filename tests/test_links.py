@@ -0,0 +1,54 @@
+import pytest
+
+import CrawlAnything as ca
+
+PAGE = (b'<html><body>'
+        b'<a href="/about">About <b>us</b></a>'
+        b"<a class='x' href='https://example.com/b?x=1&amp;y=2'>B</a>"
+        b'<a href=plain.html>Plain</a>'
+        b'<a name="anchor-only">no href</a>'
+        b'<a href="#top">Top</a><a href="mailto:me@example.com">Mail</a><a href="javascript:void(0)">JS</a>'
+        b'<a href="caf\xc3\xa9.html">Caf\xc3\xa9</a>'
+        b'</body></html>')
+
+EXPECTED_HREFS = ["/about", "https://example.com/b?x=1&y=2", "plain.html", "#top", "mailto:me@example.com",
+                  "javascript:void(0)", "café.html"]
+
+ITERATORS = [ca.iter_hrefs_regex]
+if ca.etree is not None:
+    ITERATORS.append(ca.iter_hrefs_lxml)
+
+
+@pytest.mark.parametrize("iterator", ITERATORS)
+def test_iter_hrefs(iterator):
+    assert [href for href, _ in iterator(PAGE, "utf-8")] == EXPECTED_HREFS
+    texts = [text for _, text in iterator(PAGE, "utf-8", anchor_text=True)]
+    assert texts[:3] == ["About us", "B", "Plain"]
+    assert texts[-1] == "Café"
+
+
+@pytest.mark.parametrize("iterator", ITERATORS)
+def test_iter_hrefs_without_anchor_text(iterator):
+    assert all(text is None for _, text in iterator(PAGE, "utf-8"))
+
+
+@pytest.mark.parametrize("use_lxml", [False, True])
+def test_extract_links_fast(monkeypatch, use_lxml):
+    if use_lxml and ca.etree is None:
+        pytest.skip("lxml is not installed")
+    if not use_lxml:
+        monkeypatch.setattr(ca, "etree", None)
+    links = ca.extract_links_fast(PAGE, "https://example.com/dir/page.html")
+    assert [url for url, _ in links] == [
+        ca.normalize_url("https://example.com/about"),
+        ca.normalize_url("https://example.com/b?x=1&y=2"),
+        ca.normalize_url("https://example.com/dir/plain.html"),
+        ca.normalize_url("https://example.com/dir/café.html"),
+    ]
+
+
+def test_feed_boundaries_do_not_split_links(monkeypatch):
+    if ca.etree is None:
+        pytest.skip("lxml is not installed")
+    monkeypatch.setitem(ca.DISCOVERY_SETTINGS, "feed_size", 7)
+    assert [href for href, _ in ca.iter_hrefs_lxml(PAGE, "utf-8")] == EXPECTED_HREFS
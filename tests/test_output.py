@@ -0,0 +1,43 @@
+import csv
+import json
+
+import pytest
+
+import CrawlAnything as ca
+
+COMPRESSIONS = [None, "gzip"]
+if ca.zstandard is not None:
+    COMPRESSIONS.append("zstd")
+
+
+@pytest.fixture(params=COMPRESSIONS)
+def compression(request, monkeypatch):
+    monkeypatch.setitem(ca.OUTPUT_SETTINGS, "compression", request.param)
+    yield request.param
+    ca.flush_outputs()
+
+
+def test_csv_and_json_outputs_round_trip(compression, tmp_path):
+    folder = str(tmp_path)
+    csv_file, writer, csv_path = ca.init_csv_writer("site", folder)
+    json_path = ca.init_json_file("site", folder)
+    records = [{"url": f"https://example.com/{i}", "title": f"Page {i}"} for i in range(3)]
+    for record in records:
+        ca.write_url(writer, csv_file, record["url"])
+        ca.append_json(json_path, dict(record))
+    csv_file.close()
+    ca.flush_outputs()
+
+    suffix = ca.COMPRESSION_SUFFIXES.get(compression, "")
+    assert csv_path.endswith(".csv" + suffix) and json_path.endswith(suffix)
+    assert list(ca.read_crawl_records(json_path)) == records
+    with ca.open_crawl_output(csv_path) as f:
+        rows = list(csv.reader(f))
+    assert rows == [["URL"]] + [[record["url"]] for record in records]
+
+
+def test_plain_json_array_is_readable(tmp_path):
+    path = str(tmp_path / "old.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"url": "https://example.com/"}], f, indent=2)
+    assert list(ca.read_crawl_records(path)) == [{"url": "https://example.com/"}]
@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+import CrawlAnything as ca
+
+
+def test_parquet_conversion(tmp_path):
+    pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "site.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"url": "https://example.com/", "images": [{"url": "a.png", "alt": "A"}], "custom": 1}) + "\n")
+    output = ca.convert_to_parquet(path)
+    assert os.path.basename(output) == "site.parquet"
+    row = pq.read_table(output).to_pylist()[0]
+    assert row["url"] == "https://example.com/"
+    assert row["images"][0]["alt"] == "A"
+    assert json.loads(row["extra"]) == {"custom": 1}
+
+
+def test_record_to_row_keeps_unknown_fields_in_extra():
+    pytest.importorskip("pyarrow")
+    schema = ca.crawl_record_schema()
+    row = ca.record_to_row({"url": "https://example.com/", "videos": [{"url": "v.mp4", "controls": "true"}],
+                            "h1_headings": "not a list", "custom": {"a": 1}}, schema)
+    assert row["videos"] == [{"url": "v.mp4", "width": None, "height": None, "controls": True,
+                              "autoplay": None, "downloaded_path": None}]
+    assert row["h1_headings"] is None
+    assert json.loads(row["extra"]) == {"custom": {"a": 1}}
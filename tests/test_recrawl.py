@@ -0,0 +1,71 @@
+import math
+import time
+
+import pytest
+
+import CrawlAnything as ca
+
+
+@pytest.fixture
+def tracking(monkeypatch):
+    monkeypatch.setitem(ca.RECRAWL_SETTINGS, "track", True)
+    monkeypatch.setitem(ca.RECRAWL_SETTINGS, "enabled", True)
+
+
+def test_revisit_interval_uses_change_rate_estimator():
+    entry = {"checks": 10, "changes": 5, "observed": 10 * 3600}
+    rate = -math.log((10 - 5 + 0.5) / (10 + 0.5)) / 3600
+    assert ca.revisit_interval(entry) == pytest.approx(1 / rate)
+
+
+def test_revisit_interval_falls_back_to_changefreq_and_bounds():
+    assert ca.revisit_interval({"changefreq": "weekly"}) == 7 * 86400
+    assert ca.revisit_interval({"changefreq": "always"}) == ca.RECRAWL_SETTINGS["min_interval"]
+    assert ca.revisit_interval({"changefreq": "never"}) == ca.RECRAWL_SETTINGS["max_interval"]
+    assert ca.revisit_interval({}) == ca.RECRAWL_SETTINGS["default_interval"]
+
+
+def test_history_is_not_kept_unless_tracking():
+    ca.record_fetch("https://example.com/", b"body")
+    ca.record_outlinks("https://example.com/", ["https://example.com/a"])
+    ca.note_sitemap_entry("https://example.com/", "2024-01-01", "daily")
+    assert ca.crawl_state == {}
+
+
+def test_recrawl_due_follows_history(tracking):
+    url = "https://example.com/page"
+    assert ca.recrawl_due(url)
+    ca.record_fetch(url, b"<p>a</p>")
+    assert not ca.recrawl_due(url)
+    ca.crawl_state[url]["last_fetch"] -= 2 * 86400
+    assert ca.recrawl_due(url)
+    ca.note_sitemap_entry(url, "2999-01-01T00:00:00Z")
+    ca.crawl_state[url]["last_fetch"] = time.time()
+    assert ca.recrawl_due(url)
+
+
+def test_record_fetch_ignores_whitespace_churn(tracking):
+    url = "https://example.com/page"
+    ca.record_fetch(url, b"<p>a</p>\n")
+    ca.record_fetch(url, b"<p>a</p>   \n\n")
+    ca.record_fetch(url, b"<p>b</p>")
+    assert ca.crawl_state[url]["checks"] == 2
+    assert ca.crawl_state[url]["changes"] == 1
+
+
+def test_state_round_trip(tmp_path, tracking):
+    ca.record_outlinks("https://example.com/", ["https://example.com/b", "https://example.com/a", "https://example.com/a"])
+    ca.save_crawl_state(str(tmp_path))
+    assert ca.load_crawl_state(str(tmp_path)) == 1
+    assert ca.stored_outlinks("https://example.com/") == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_sequential_crawl_records_pages_that_are_not_due(tracking, monkeypatch):
+    url = "https://example.com/page"
+    ca.record_fetch(url, b"x")
+    ca.record_outlinks(url, ["https://example.com/next"])
+    written = []
+    monkeypatch.setattr(ca, "write_url", lambda writer, file, u: written.append(u))
+    links = ca.crawl_static_page(url, "example.com", None, None, None, None)
+    assert links == ["https://example.com/next"]
+    assert written == [url]
@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+
+import CrawlAnything as ca
+
+PAGE = "<html><head><title>{}</title></head><body><h1>{}</h1></body></html>"
+
+
+def make_crawl_folder(root):
+    warc = ca.WarcWriter(os.path.join(root, "warc"), "site", max_file_size=1024 * 1024)
+    warc.archive_snapshot("https://example.com/archived", PAGE.format("Archived", "From WARC"))
+    warc.close()
+    html_folder = os.path.join(root, "html")
+    os.makedirs(html_folder)
+    with open(os.path.join(html_folder, "docs_intro.html"), "w", encoding="utf-8") as f:
+        f.write(PAGE.format("Intro", "From file"))
+    with open(os.path.join(root, "site.jsonl"), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"url": "https://example.com/docs/intro", "title": "Intro"}) + "\n")
+
+
+def test_collect_tasks_from_warc_index_and_artifacts(tmp_path):
+    root = str(tmp_path)
+    make_crawl_folder(root)
+    tasks = sorted(ca.collect_reprocess_tasks(root), key=lambda task: task[0])
+    assert [(kind, url) for kind, _, url in tasks] == [
+        ("file", "https://example.com/docs/intro"), ("warc", "https://example.com/archived")]
+
+
+def test_reprocess_task_extracts_without_network(tmp_path):
+    root = str(tmp_path)
+    make_crawl_folder(root)
+    records = {task[2]: ca.reprocess_task(task + (["title", "headings"],)) for task in ca.collect_reprocess_tasks(root)}
+    assert records["https://example.com/archived"]["h1_headings"] == ["From WARC"]
+    assert records["https://example.com/docs/intro"]["title"] == "Intro"
+    assert all(record["source"] == "reprocessed" for record in records.values())
+
+
+def test_reprocess_output_writes_one_record_per_page(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    make_crawl_folder(root)
+    monkeypatch.setattr(ca, "ACTIVE_EXTRACTORS", ["title"])
+    output = ca.reprocess_output(root, os.path.join(root, "out.jsonl"), workers=1)
+    records = list(ca.read_crawl_records(output))
+    assert sorted(record["title"] for record in records) == ["Archived", "Intro"]
+
+
+def test_warc_without_index_yields_offset_tasks(tmp_path):
+    root = str(tmp_path)
+    make_crawl_folder(root)
+    os.remove(os.path.join(root, "warc", "site.cdx"))
+    tasks = [task for task in ca.collect_reprocess_tasks(root) if task[0] == "warc"]
+    assert [(location[0].endswith(".warc.gz"), url) for _, location, url in tasks] == [
+        (True, "https://example.com/archived")]
+    record = ca.reprocess_task(tasks[0] + (["headings"],))
+    assert record["h1_headings"] == ["From WARC"]
+
+
+def test_plain_warc_is_scanned_by_offset(tmp_path):
+    root = str(tmp_path)
+    make_crawl_folder(root)
+    warc_folder = os.path.join(root, "warc")
+    os.remove(os.path.join(warc_folder, "site.cdx"))
+    for name in os.listdir(warc_folder):
+        path = os.path.join(warc_folder, name)
+        with gzip.open(path, "rb") as src, open(path[:-len(".gz")], "wb") as dst:
+            dst.write(src.read())
+        os.remove(path)
+    offsets = [offset for offset, _ in ca.scan_warc_records(path[:-len(".gz")], head_size=16)]
+    assert len(offsets) > 1 and offsets[0] == 0
+    tasks = [task for task in ca.collect_reprocess_tasks(root) if task[0] == "warc"]
+    assert len(tasks) == 1
+    assert ca.reprocess_task(tasks[0] + (["title"],))["title"] == "Archived"
@@ -0,0 +1,104 @@
+import pytest
+import requests
+
+import CrawlAnything as ca
+
+
+@pytest.fixture
+def breaker():
+    return ca.CircuitBreaker(dict(ca.RETRY_POLICY, breaker_threshold=3, breaker_cooldown=60.0))
+
+
+def open_circuit(breaker, host):
+    for _ in range(3):
+        breaker.record_failure(host)
+
+
+def test_circuit_opens_after_consecutive_failures(breaker):
+    breaker.record_failure("a.example")
+    breaker.record_failure("a.example")
+    breaker.record_success("a.example")
+    breaker.record_failure("a.example")
+    assert breaker.allow("a.example")
+    open_circuit(breaker, "a.example")
+    assert breaker.is_open("a.example")
+    assert not breaker.allow("a.example")
+    assert breaker.allow("b.example")
+
+
+def test_half_open_lets_one_probe_through(breaker):
+    open_circuit(breaker, "a.example")
+    breaker.hosts["a.example"]["opened_at"] -= 61
+    assert breaker.allow("a.example")
+    assert not breaker.allow("a.example")
+    breaker.record_failure("a.example")  # A failed probe opens the circuit again
+    assert not breaker.allow("a.example")
+    breaker.hosts["a.example"]["opened_at"] -= 61
+    assert breaker.allow("a.example")
+    breaker.record_success("a.example")
+    assert breaker.allow("a.example") and not breaker.is_open("a.example")
+
+
+def test_backoff_delay_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(ca.random, "uniform", lambda low, high: high)
+    assert ca.backoff_delay(0) == ca.RETRY_POLICY["base_delay"]
+    assert ca.backoff_delay(2) == ca.RETRY_POLICY["base_delay"] * 4
+    assert ca.backoff_delay(20) == ca.RETRY_POLICY["max_delay"]
+    monkeypatch.setattr(ca.random, "uniform", lambda low, high: low)
+    assert ca.backoff_delay(1, retry_after=7.0) == 7.0
+
+
+def make_response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content, response._content_consumed = b"", True
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    monkeypatch.setattr(ca, "circuit_breaker", ca.CircuitBreaker(ca.RETRY_POLICY))
+    monkeypatch.setattr(ca.time, "sleep", lambda seconds: None)
+    outcomes = []
+
+    def fake_fetch_once(url, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(ca, "fetch_once", fake_fetch_once)
+    return outcomes
+
+
+def test_fetch_page_retries_transient_failures(fetches):
+    fetches.extend([requests.exceptions.Timeout(), make_response(503), make_response(200)])
+    assert ca.fetch_page("https://a.example/").status_code == 200
+    assert fetches == []
+
+
+def test_fetch_page_gives_up_after_max_attempts(fetches):
+    fetches.extend([make_response(503)] * ca.RETRY_POLICY["max_attempts"])
+    assert ca.fetch_page("https://a.example/").status_code == 503
+    fetches.extend([requests.exceptions.ConnectionError()] * ca.RETRY_POLICY["max_attempts"])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        ca.fetch_page("https://a.example/")
+
+
+def test_fetch_page_returns_long_retry_after_immediately(fetches):
+    fetches.extend([make_response(429, {"Retry-After": "3600"}), make_response(200)])
+    assert ca.fetch_page("https://a.example/").status_code == 429
+    assert len(fetches) == 1
+
+
+def test_non_transient_error_ends_the_half_open_probe(fetches):
+    breaker = ca.circuit_breaker
+    for _ in range(ca.RETRY_POLICY["breaker_threshold"]):
+        breaker.record_failure("a.example")
+    breaker.hosts["a.example"]["opened_at"] -= ca.RETRY_POLICY["breaker_cooldown"] + 1
+    fetches.extend([requests.exceptions.TooManyRedirects(), make_response(200)])
+    with pytest.raises(requests.exceptions.TooManyRedirects):
+        ca.fetch_page("https://a.example/")
+    assert ca.fetch_page("https://a.example/").status_code == 200
+    assert not breaker.is_open("a.example")
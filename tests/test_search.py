@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+import CrawlAnything as ca
+
+
+def has_fts5():
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+needs_fts5 = pytest.mark.skipif(not has_fts5(), reason="SQLite was built without FTS5")
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    monkeypatch.setitem(ca.SEARCH_SETTINGS, "enabled", True)
+    ca.start_search_index(str(tmp_path))
+    yield str(tmp_path / ca.SEARCH_SETTINGS["index_file"])
+    ca.close_search_index()
+
+
+def page(url, title, body, paragraphs=()):
+    return {"url": url, "title": title, "h1_headings": [title], "paragraphs": list(paragraphs)}, body
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("crawler trap", '"crawler" "trap"'),
+    ("craw*", '"craw"*'),
+    ('say "hi', '"say" """hi"'),
+    ("*", ""),
+])
+def test_fts_query_quotes_words(query, expected):
+    assert ca.fts_query(query) == expected
+
+
+@needs_fts5
+def test_records_are_searchable_and_ranked(index):
+    ca.index_record(*page("https://example.com/hls", "Streaming with HLS", "playlists and segments"))
+    ca.index_record(*page("https://example.com/faq", "FAQ", "we also mention streaming once"))
+    ca.close_search_index()
+    results = ca.search_index(index, "streaming")
+    assert [result["url"] for result in results] == ["https://example.com/hls", "https://example.com/faq"]
+    assert "[Streaming]" in results[0]["snippet"]
+
+
+@needs_fts5
+def test_recrawl_replaces_the_document(index):
+    ca.index_record(*page("https://example.com/a", "Old title", "original wording"))
+    ca.index_record(*page("https://example.com/a", "New title", "rewritten wording"))
+    ca.close_search_index()
+    assert ca.search_index(index, "original") == []
+    results = ca.search_index(index, "rewritten")
+    assert [(result["url"], result["title"]) for result in results] == [("https://example.com/a", "New title")]
+
+
+@needs_fts5
+def test_invalid_fts_syntax_falls_back_to_words(index):
+    ca.index_record(*page("https://example.com/c", "C++ tips", "templates in c++ code"))
+    ca.close_search_index()
+    assert [result["url"] for result in ca.search_index(index, "c++ (templates")] == ["https://example.com/c"]
+
+
+@needs_fts5
+def test_search_text_is_indexed_but_not_saved(index, tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    ca.append_json(path, {"url": "https://example.com/d", "title": "D", ca.SEARCH_TEXT_KEY: "hidden body words"})
+    ca.flush_outputs()
+    with open(path, encoding="utf-8") as f:
+        assert ca.SEARCH_TEXT_KEY not in f.read()
+    assert [result["url"] for result in ca.search_index(index, "hidden")] == ["https://example.com/d"]
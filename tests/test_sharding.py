@@ -0,0 +1,95 @@
+import json
+import pickle
+import time
+
+import CrawlAnything as ca
+
+
+def test_shard_for_url_is_stable_per_host():
+    shards = {ca.shard_for_url(f"https://example.com/page{i}", 4) for i in range(20)}
+    assert len(shards) == 1
+    assert 0 <= shards.pop() < 4
+
+
+def test_frontier_store_dedups_claims_and_releases(tmp_path):
+    store = ca.SqliteFrontierStore(str(tmp_path / "frontier.db"), 1)
+    try:
+        store.add_urls(["https://example.com/a", "https://example.com/b"])
+        store.add_urls(["https://example.com/a"])
+        assert store.unfinished_count() == 2
+        claimed = store.claim(0, 10)
+        assert sorted(claimed) == ["https://example.com/a", "https://example.com/b"]
+        assert store.claim(0, 10) == []
+        store.mark(claimed[:1], "done")
+        store.release_stale(-1)
+        assert store.claim(0, 10) == claimed[1:]
+        assert store.unfinished_count() == 1
+    finally:
+        store.close()
+
+
+def test_merge_shard_outputs_dedups_urls_and_skips_event_logs(tmp_path):
+    for shard, urls in enumerate([["https://a.com/1", "https://a.com/2"], ["https://a.com/2", "https://b.com/1"]]):
+        folder = tmp_path / f"shard_{shard:03d}"
+        folder.mkdir()
+        (folder / f"shard_{shard:03d}.csv").write_text("URL\n" + "".join(u + "\n" for u in urls), encoding="utf-8")
+        (folder / f"shard_{shard:03d}.json").write_text(json.dumps([{"url": u} for u in urls]), encoding="utf-8")
+        (folder / "events.jsonl").write_text(json.dumps({"event": "page_saved", "url": urls[0]}) + "\n", encoding="utf-8")
+    csv_path, json_path = ca.merge_shard_outputs(str(tmp_path))
+    with open(csv_path, encoding="utf-8") as f:
+        assert f.read().split() == ["URL", "https://a.com/1", "https://a.com/2", "https://b.com/1"]
+    assert len(list(ca.read_crawl_records(json_path))) == 4
+
+
+def test_deferred_urls_wait_for_their_retry_time(tmp_path):
+    store = ca.SqliteFrontierStore(str(tmp_path / "frontier.db"), 1)
+    try:
+        store.add_urls(["https://example.com/a"])
+        url = store.claim(0, 10)[0]
+        store.defer({url: time.time() + 60})
+        assert store.claim(0, 10) == []
+        assert store.unfinished_count() == 1
+        store.defer({url: time.time() - 1})
+        assert store.claim(0, 10) == [url]
+    finally:
+        store.close()
+
+
+def test_shard_dead_letters_urls_deferred_too_often(tmp_path, monkeypatch):
+    attempts = []
+
+    def always_deferred(url_data):
+        attempts.append(url_data[0])
+        return {"url": url_data[0], "new_links": [], "deferred": True}
+
+    monkeypatch.setattr(ca, "crawl_single_url", always_deferred)
+    monkeypatch.setattr(ca.circuit_breaker, "retry_at", lambda host: time.time())
+    monkeypatch.setattr(ca, "init_robot_parser", lambda url: None)
+    monkeypatch.setitem(ca.SHARD_SETTINGS, "poll_interval", 0.01)
+    monkeypatch.setitem(ca.DNS_SETTINGS, "enabled", False)
+    store_path = str(tmp_path / "frontier.db")
+    store = ca.SqliteFrontierStore(store_path, 1)
+    store.add_urls(["https://example.com/a"])
+    store.close()
+    ca.run_shard(0, 1, store_path, ["example.com"], str(tmp_path), ca.settings_snapshot())
+    assert len(attempts) == ca.RETRY_POLICY["max_deferrals"] + 1
+    with open(tmp_path / "shard_000" / "shard_000_dead_letters.jsonl", encoding="utf-8") as f:
+        assert json.loads(f.readline())["url"] == "https://example.com/a"
+
+
+def test_settings_snapshot_round_trips_user_settings(monkeypatch):
+    monkeypatch.setitem(ca.RETRY_POLICY, "max_attempts", 7)
+    monkeypatch.setitem(ca.CONTENT_LIMITS, "text/html", 1234)
+    monkeypatch.setitem(ca.DNS_SETTINGS, "enabled", False)
+    monkeypatch.setitem(ca.RECRAWL_SETTINGS, "enabled", True)
+    monkeypatch.setitem(ca.RECRAWL_SETTINGS, "track", True)
+    snapshot = pickle.loads(pickle.dumps(ca.settings_snapshot()))
+    monkeypatch.setitem(ca.RETRY_POLICY, "max_attempts", 3)
+    monkeypatch.setitem(ca.CONTENT_LIMITS, "text/html", 1)
+    monkeypatch.setitem(ca.DNS_SETTINGS, "enabled", True)
+    monkeypatch.setitem(ca.RECRAWL_SETTINGS, "enabled", False)
+    ca.apply_settings(snapshot)
+    assert ca.RETRY_POLICY["max_attempts"] == 7 and ca.circuit_breaker.settings["max_attempts"] == 7
+    assert ca.CONTENT_LIMITS["text/html"] == 1234
+    assert ca.DNS_SETTINGS["enabled"] is False
+    assert ca.RECRAWL_SETTINGS["enabled"] is True and ca.RECRAWL_SETTINGS["track"] is False
@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import CrawlAnything as ca
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=1280000,RESOLUTION=1280x720,CODECS="avc1.4d401f,mp4a.40.2"
+hd/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=640000,RESOLUTION=640x360
+sd/index.m3u8
+"""
+
+MEDIA = """#EXTM3U
+#EXT-X-TARGETDURATION:10
+#EXTINF:9.5,
+seg0.ts
+#EXTINF:10.0,
+seg1.ts
+#EXT-X-ENDLIST
+"""
+
+MPD = b"""<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT1M30.5S">
+  <BaseURL>media/</BaseURL>
+  <Period>
+    <AdaptationSet mimeType="video/mp4" codecs="avc1.64001f">
+      <SegmentTemplate initialization="$RepresentationID$/init.mp4" media="$RepresentationID$/$Number$.m4s"/>
+      <Representation id="720p" bandwidth="2000000" width="1280" height="720"/>
+    </AdaptationSet>
+    <AdaptationSet mimeType="audio/mp4">
+      <Representation id="audio" bandwidth="128000" codecs="mp4a.40.2">
+        <BaseURL>audio.mp4</BaseURL>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>"""
+
+
+def test_parse_hls_master():
+    playlist = ca.parse_hls(MASTER, "https://cdn.example.com/live/master.m3u8")
+    assert playlist["type"] == "master"
+    assert playlist["variants"] == [
+        {"bandwidth": 1280000, "resolution": "1280x720", "codecs": "avc1.4d401f,mp4a.40.2",
+         "url": "https://cdn.example.com/live/hd/index.m3u8"},
+        {"bandwidth": 640000, "resolution": "640x360", "codecs": None,
+         "url": "https://cdn.example.com/live/sd/index.m3u8"},
+    ]
+
+
+def test_parse_hls_media():
+    playlist = ca.parse_hls(MEDIA, "https://cdn.example.com/vod/index.m3u8")
+    assert playlist == {
+        "type": "media", "live": False, "target_duration": "10", "duration": 19.5,
+        "segments": ["https://cdn.example.com/vod/seg0.ts", "https://cdn.example.com/vod/seg1.ts"],
+    }
+    live = ca.parse_hls(MEDIA.replace("#EXT-X-ENDLIST\n", ""), "https://cdn.example.com/vod/index.m3u8")
+    assert live["live"] is True and live["duration"] is None
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("PT1M30.5S", 90.5), ("PT2H", 7200.0), ("P1DT1S", 86401.0), ("", None), ("10 minutes", None),
+])
+def test_parse_iso_duration(value, seconds):
+    assert ca.parse_iso_duration(value) == seconds
+
+
+def test_parse_dash():
+    manifest = ca.parse_dash(MPD, "https://cdn.example.com/vod/manifest.mpd")
+    assert manifest["live"] is False
+    assert manifest["duration"] == 90.5
+    assert manifest["representations"] == [
+        {"bandwidth": 2000000, "resolution": "1280x720", "codecs": "avc1.64001f", "mime_type": "video/mp4"},
+        {"bandwidth": 128000, "resolution": None, "codecs": "mp4a.40.2", "mime_type": "audio/mp4"},
+    ]
+    assert manifest["segments"] == ["https://cdn.example.com/vod/media/720p/init.mp4",
+                                    "https://cdn.example.com/vod/media/audio.mp4"]
+
+
+def test_manifest_urls_are_unique_and_unescaped():
+    record = {
+        "live_streams": [{"type": "hls", "url": "https://cdn.example.com/a.m3u8?x=1&amp;y=2"}],
+        "network_streams": [{"url": "https://cdn.example.com/a.m3u8?x=1&y=2"}, {"url": "https://cdn.example.com/b.mpd"}],
+        "videos": [{"url": "https://cdn.example.com/c.mp4"}],
+    }
+    assert ca.manifest_urls(record) == ["https://cdn.example.com/a.m3u8?x=1&y=2", "https://cdn.example.com/b.mpd"]
+
+
+def test_records_are_not_probed_when_saved(monkeypatch, tmp_path):
+    monkeypatch.setitem(ca.STREAM_PROBE_SETTINGS, "enabled", True)
+    monkeypatch.setattr(ca, "get_stream_prober", lambda: pytest.fail("append_json must not probe"))
+    path = str(tmp_path / "out.jsonl")
+    ca.append_json(path, {"url": "https://example.com/", "live_streams": [{"url": "https://cdn.example.com/a.m3u8"}]})
+    ca.flush_outputs()
+
+
+def test_already_probed_records_are_skipped(monkeypatch):
+    monkeypatch.setitem(ca.STREAM_PROBE_SETTINGS, "enabled", True)
+    monkeypatch.setattr(ca, "get_stream_prober", lambda: pytest.fail("record was probed again"))
+    record = {"live_streams": [{"url": "https://cdn.example.com/a.m3u8"}], "stream_probes": []}
+    ca.attach_stream_probes(record)
+    assert record["stream_probes"] == []
+
+
+def test_stream_probes_have_typed_parquet_columns():
+    pa = pytest.importorskip("pyarrow")
+    schema = ca.crawl_record_schema()
+    record = {
+        "url": "https://example.com/", "type": "resource", "content_type": "application/pdf",
+        "stream_probes": [{
+            "url": "https://cdn.example.com/a.mpd", "ok": True, "status": 200, "format": "dash", "live": False,
+            "duration": 90.5, "variants": [{"bandwidth": 2000000, "resolution": "1280x720"}],
+            "segments": {"checked": 2, "reachable": 2},
+        }],
+    }
+    row = ca.record_to_row(record, schema)
+    assert row["extra"] is None
+    table = pa.Table.from_pylist([row], schema=schema)
+    probe = table.column("stream_probes")[0][0].as_py()
+    assert probe["duration"] == 90.5 and probe["status"] == 200
+    assert probe["variants"][0]["bandwidth"] == 2000000
+    assert probe["segments"] == {"checked": 2, "reachable": 2}
+    assert table.column("content_type")[0].as_py() == "application/pdf"
+
+
+class FakeProber:
+    def __init__(self, futures):
+        self.futures = futures
+
+    def probe(self, url):
+        return self.futures[url]
+
+
+def test_page_waits_once_and_records_unfinished_probes_as_pending(monkeypatch):
+    done, slow, failed = Future(), Future(), Future()
+    done.set_result({"url": "https://cdn.example.com/a.m3u8", "ok": True})
+    failed.set_exception(ValueError("bad manifest"))
+    monkeypatch.setitem(ca.STREAM_PROBE_SETTINGS, "enabled", True)
+    monkeypatch.setitem(ca.STREAM_PROBE_SETTINGS, "page_wait", 0.05)
+    monkeypatch.setattr(ca, "get_stream_prober", lambda: FakeProber({
+        "https://cdn.example.com/a.m3u8": done, "https://cdn.example.com/b.m3u8": slow,
+        "https://cdn.example.com/c.mpd": failed}))
+    record = {"live_streams": [{"url": url} for url in
+                               ("https://cdn.example.com/a.m3u8", "https://cdn.example.com/b.m3u8",
+                                "https://cdn.example.com/c.mpd")]}
+    start = time.time()
+    ca.attach_stream_probes(record)
+    assert time.time() - start < 1
+    assert record["stream_probes"] == [
+        {"url": "https://cdn.example.com/a.m3u8", "ok": True},
+        {"url": "https://cdn.example.com/b.m3u8", "pending": True},
+        {"url": "https://cdn.example.com/c.mpd", "ok": False, "error": "bad manifest"},
+    ]
+
+
+def test_probe_that_finishes_immediately_does_not_deadlock(monkeypatch):
+    def finished(coroutine, loop):
+        coroutine.close()
+        future = Future()
+        future.set_result({"url": "https://cdn.example.com/a.m3u8", "ok": True})
+        return future
+
+    prober = ca.StreamProber()
+    try:
+        monkeypatch.setattr(ca.asyncio, "run_coroutine_threadsafe", finished)
+        result = []
+        worker = threading.Thread(target=lambda: result.append(prober.probe("https://cdn.example.com/a.m3u8")))
+        worker.start()
+        worker.join(timeout=5)
+        assert not worker.is_alive(), "probe() deadlocked"
+        assert result[0].result()["ok"] is True
+        assert prober.inflight == {} and "https://cdn.example.com/a.m3u8" in prober.cache
+    finally:
+        monkeypatch.undo()
+        prober.close()
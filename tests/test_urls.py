@@ -0,0 +1,42 @@
+import CrawlAnything as ca
+
+
+def test_normalize_url_drops_tracking_params_and_default_port():
+    url = "HTTP://Example.com:80/a/b/?utm_source=x&id=2&fbclid=y&a=1"
+    assert ca.normalize_url(url) == "http://example.com/a/b?a=1&id=2"
+
+
+def test_normalize_url_strips_session_path_params():
+    assert ca.normalize_url("https://example.com/page;jsessionid=ABC123") == "https://example.com/page"
+
+
+def test_scope_matches_exact_host_and_subdomains():
+    assert ca.is_valid("https://www.example.com/x", "example.com")
+    assert ca.is_valid("https://blog.example.com/x", "example.com")
+    assert not ca.is_valid("https://notexample.com/x", "example.com")
+    assert not ca.is_valid("ftp://example.com/x", "example.com")
+
+
+def test_url_pattern_counts_variable_segments():
+    pattern, variables = ca.url_pattern("https://example.com/2024/01/31/post?b=1&a=2")
+    assert pattern == "example.com/{n}/{n}/{n}/post?a&b"
+    assert variables == 3
+
+
+def test_trap_rules_depth_and_repeats():
+    assert ca.is_crawler_trap("https://example.com/" + "/".join(f"d{i}" for i in range(20))) == "path depth"
+    assert ca.is_crawler_trap("https://example.com/a/a/a/a/b") == "repeated path segments"
+    assert ca.is_crawler_trap("https://example.com/a/b") is None
+
+
+def test_pattern_cap_ignores_plain_numeric_ids(monkeypatch):
+    monkeypatch.setitem(ca.TRAP_RULES, "max_urls_per_pattern", 3)
+    assert all(ca.is_crawler_trap(f"https://example.com/news/{i}") is None for i in range(10))
+
+
+def test_pattern_cap_applies_to_calendar_patterns(monkeypatch):
+    monkeypatch.setitem(ca.TRAP_RULES, "max_urls_per_pattern", 3)
+    verdicts = [ca.is_crawler_trap(f"https://example.com/cal/2024/{m}/{d}") for m in (1, 2) for d in (1, 2)]
+    assert verdicts == [None, None, None, "URL pattern limit"]
+    # A URL already counted keeps its verdict instead of being counted again
+    assert ca.is_crawler_trap("https://example.com/cal/2024/1/1") is None
@@ -0,0 +1,77 @@
+import gzip
+import os
+
+import requests
+
+import CrawlAnything as ca
+
+
+def make_response(url, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = url
+    response._content = body
+    response.headers.update({"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"})
+    response.request = requests.Request("GET", url, headers={"User-Agent": "test"}).prepare()
+    return response
+
+
+def test_surt_url():
+    assert ca.surt_url("https://www.Example.com/Path/Page?b=2&a=1") == "com,example)/path/page?b=2&a=1"
+    assert ca.surt_url("http://example.com") == "com,example)/"
+    assert ca.surt_url("http://127.0.0.1:8080/x") == "127.0.0.1)/x"
+
+
+def test_build_warc_record_headers():
+    record = ca.build_warc_record("resource", "https://example.com/", b"<p>hi</p>", "text/html")
+    head, _, rest = record.partition(b"\r\n\r\n")
+    assert head.startswith(b"WARC/1.1\r\nWARC-Type: resource\r\n")
+    assert b"Content-Length: 9" in head
+    assert ca.warc_digest(b"<p>hi</p>").encode() in head
+    assert rest == b"<p>hi</p>\r\n\r\n"
+
+
+def test_writer_round_trip_and_cdx_offsets(tmp_path):
+    folder = str(tmp_path)
+    writer = ca.WarcWriter(folder, "crawl", max_file_size=1024 * 1024)
+    writer.archive_response(make_response("https://example.com/a", b"<p>A</p>"), b"<p>A</p>")
+    writer.archive_snapshot("https://example.com/b", "<p>B</p>")
+    writer.close()
+
+    warc_files = [name for name in os.listdir(folder) if name.endswith(".warc.gz")]
+    assert len(warc_files) == 1
+    path = os.path.join(folder, warc_files[0])
+    records = list(ca.iter_warc_records(path))
+    assert [record["type"] for record in records] == ["warcinfo", "response", "request", "resource"]
+    response = records[1]
+    assert response["status"] == 200 and response["body"] == b"<p>A</p>"
+    # The body is stored decoded, so the original Content-Encoding is kept under another name
+    assert "content-encoding" not in response["http_headers"]
+    assert response["http_headers"]["x-archive-orig-content-encoding"] == "gzip"
+    assert records[2]["warc_headers"]["WARC-Concurrent-To"] == response["warc_headers"]["WARC-Record-ID"]
+
+    with open(os.path.join(folder, "crawl.cdx"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == " CDX N b a m s k r M S V g"
+    entries = [line.split(" ") for line in lines[1:]]
+    assert [(entry[0], entry[3], entry[4]) for entry in entries] == [
+        ("com,example)/a", "text/html", "200"), ("com,example)/b", "text/html", "-")]
+    for entry, expected in zip(entries, (b"<p>A</p>", b"<p>B</p>")):
+        assert entry[10] == warc_files[0]
+        record = ca.read_warc_record_at(path, int(entry[9]))
+        assert record["body"] == expected
+        assert entry[5] == ca.warc_digest(expected).split(":", 1)[1]
+
+
+def test_writer_rotates_files(tmp_path):
+    folder = str(tmp_path)
+    writer = ca.WarcWriter(folder, "crawl", max_file_size=1)
+    for i in range(3):
+        writer.archive_snapshot(f"https://example.com/{i}", "<p>x</p>")
+    writer.close()
+    warc_files = sorted(name for name in os.listdir(folder) if name.endswith(".warc.gz"))
+    assert len(warc_files) == 3
+    for name in warc_files:
+        with gzip.open(os.path.join(folder, name)) as f:
+            assert f.readline() == b"WARC/1.1\r\n"